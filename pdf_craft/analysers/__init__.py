@@ -1 +1,3 @@
-from .analyser import analyse
\ No newline at end of file
+from .analyser import analyse
+from .utils import Durability
+from .sequence import ParagraphsCacheStats, paragraphs_cache_stats, set_paragraphs_cache_max_bytes
\ No newline at end of file
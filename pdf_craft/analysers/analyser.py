@@ -1,6 +1,7 @@
 from os import PathLike
 from pathlib import Path
-from typing import Optional, Dict, Any
+from threading import Thread
+from typing import Callable, Optional, Dict, Any
 
 from ..llm import LLM
 from ..pdf import PDFPageExtractor
@@ -12,6 +13,7 @@ from .contents import extract_contents
 from .chapter import generate_chapters
 from .reference import generate_chapters_with_footnotes
 from .output import output
+from .utils import Durability, PageFeed
 
 
 def analyse(
@@ -22,9 +24,18 @@ def analyse(
     output_path: PathLike,
     correction: bool = False,
     translation_config: Optional[Dict[str, Any]] = None,
+    max_concurrency: int = 1,
+    ocr_processes: int = 1,
+    durability: Durability = Durability.BATCH,
+    packed_paragraphs: bool = False,
+    window_tokens: int | None = None,
+    context_tokens: int | None = None,
+    pipelined: bool = False,
+    correction_skip_threshold: float | None = None,
+    correction_edits: bool = False,
+    bisect_after: int | None = None,
   ) -> None:
 
-  max_data_tokens = 4096
   analysing_dir_path = Path(analysing_dir_path)
   ocr_path = analysing_dir_path / "ocr"
   assets_path = analysing_dir_path / "assets"
@@ -34,76 +45,149 @@ def analyse(
   chapter_path = analysing_dir_path / "chapter"
   reference_path = analysing_dir_path / "reference"
 
-  # 显示翻译模式信息（如果启用）
-  if translation_config and translation_config.get("enabled"):
-    mode_desc = {
-      "replace": "单语替换",
-      "dual": "双语对照",
-      "separate": "分离输出"
-    }
-    mode = translation_config.get("mode", "replace")
-    print(f"✓ 翻译模式已激活 - 目标语言: {translation_config.get('target_language', 'zh-CN')}, 模式: {mode_desc.get(mode, mode)}")
-    print("📝 注意：翻译将在章节生成阶段进行，以确保格式兼容性")
-
-  generate_ocr_pages(
-    extractor=pdf_page_extractor,
-    pdf_path=Path(pdf_path),
-    ocr_path=ocr_path,
-    assets_path=assets_path,
-  )
-  extract_sequences(
-    llm=llm,
-    workspace=sequence_path,
-    ocr_path=ocr_path,
-    max_data_tokens=max_data_tokens,
-  )
-  sequence_output_path = sequence_path / "output"
-
-  if correction:
-    sequence_output_path = correct(
+  # 各阶段切分请求时计数过的 token 数，重新运行时可以复用
+  with llm.tokens_cache(analysing_dir_path / "tokens.sqlite3"):
+    # 显示翻译模式信息（如果启用）
+    if translation_config and translation_config.get("enabled"):
+      mode_desc = {
+        "replace": "单语替换",
+        "dual": "双语对照",
+        "separate": "分离输出"
+      }
+      mode = translation_config.get("mode", "replace")
+      print(f"✓ 翻译模式已激活 - 目标语言: {translation_config.get('target_language', 'zh-CN')}, 模式: {mode_desc.get(mode, mode)}")
+      print("📝 注意：翻译将在章节生成阶段进行，以确保格式兼容性")
+
+    def ocr(feed: PageFeed | None) -> None:
+      generate_ocr_pages(
+        extractor=pdf_page_extractor,
+        pdf_path=Path(pdf_path),
+        ocr_path=ocr_path,
+        assets_path=assets_path,
+        processes=ocr_processes,
+        durability=durability,
+        feed=feed,
+      )
+
+    def sequence(feed: PageFeed | None) -> None:
+      extract_sequences(
+        llm=llm,
+        workspace=sequence_path,
+        ocr_path=ocr_path,
+        max_data_tokens=_data_tokens(llm, window_tokens, context_tokens, "sequence"),
+        max_concurrency=max_concurrency,
+        durability=durability,
+        packed_paragraphs=packed_paragraphs,
+        ocr_feed=feed,
+        bisect_after=bisect_after,
+      )
+
+    if pipelined:
+      _run_pipelined(ocr, sequence)
+    else:
+      ocr(None)
+      sequence(None)
+    sequence_output_path = sequence_path / "output"
+
+    if correction:
+      sequence_output_path = correct(
+        llm=llm,
+        workspace=correction_path,
+        text_path=sequence_output_path / "text",
+        footnote_path=sequence_output_path / "footnote",
+        max_data_tokens=_data_tokens(llm, window_tokens, context_tokens, "correction"),
+        max_concurrency=max_concurrency,
+        durability=durability,
+        packed_paragraphs=packed_paragraphs,
+        skip_threshold=correction_skip_threshold,
+        edits=correction_edits,
+        bisect_after=bisect_after,
+      )
+
+    contents = extract_contents(
       llm=llm,
-      workspace=correction_path,
-      text_path=sequence_output_path / "text",
-      footnote_path=sequence_output_path / "footnote",
-      max_data_tokens=max_data_tokens,
+      workspace=contents_path,
+      sequence_path=sequence_output_path / "text",
+      max_data_tokens=_data_tokens(llm, window_tokens, context_tokens, "contents/identifier"),
+      durability=durability,
     )
 
-  contents = extract_contents(
-    llm=llm,
-    workspace=contents_path,
-    sequence_path=sequence_output_path / "text",
-    max_data_tokens=max_data_tokens,
-  )
-
-  # 只在章节生成阶段启用翻译包装器
-  chapter_llm = llm
-  if translation_config and translation_config.get("enabled"):
-    chapter_llm = _create_translation_llm_wrapper(llm, translation_config)
-    print("🔄 在章节生成阶段启用翻译功能...")
-
-  chapter_output_path, contents = generate_chapters(
-    llm=chapter_llm,
-    contents=contents,
-    sequence_path=sequence_output_path / "text",
-    workspace_path=chapter_path,
-    max_request_tokens=max_data_tokens,
-  )
-  footnote_sequence_path = sequence_output_path / "footnote"
-
-  if footnote_sequence_path.exists():
-    chapter_output_path = generate_chapters_with_footnotes(
-      chapter_path=chapter_output_path,
-      footnote_sequence_path=footnote_sequence_path,
-      workspace_path=reference_path,
+    # 只在章节生成阶段启用翻译包装器
+    chapter_llm = llm
+    if translation_config and translation_config.get("enabled"):
+      chapter_llm = _create_translation_llm_wrapper(llm, translation_config)
+      print("🔄 在章节生成阶段启用翻译功能...")
+
+    chapter_output_path, contents = generate_chapters(
+      llm=chapter_llm,
+      contents=contents,
+      sequence_path=sequence_output_path / "text",
+      workspace_path=chapter_path,
+      max_request_tokens=_data_tokens(llm, window_tokens, context_tokens, "contents/mapper"),
+      max_concurrency=max_concurrency,
+      durability=durability,
+      bisect_after=bisect_after,
+    )
+    footnote_sequence_path = sequence_output_path / "footnote"
+
+    if footnote_sequence_path.exists():
+      chapter_output_path = generate_chapters_with_footnotes(
+        chapter_path=chapter_output_path,
+        footnote_sequence_path=footnote_sequence_path,
+        workspace_path=reference_path,
+        durability=durability,
+      )
+
+    output(
+      contents=contents,
+      output_path=Path(output_path),
+      chapter_output_path=chapter_output_path,
+      assets_path=assets_path,
     )
 
-  output(
-    contents=contents,
-    output_path=Path(output_path),
-    chapter_output_path=chapter_output_path,
-    assets_path=assets_path,
-  )
-
+# OCR runs in the current thread (its models may not be moved to another one), and sequence
+# extraction reads its pages in another thread, so that the time of OCR and LLM requests overlaps.
+# if sequence extraction fails, OCR is cancelled at its next page, rather than running to the end.
+def _run_pipelined(ocr: Callable[[PageFeed], None], sequence: Callable[[PageFeed], None]) -> None:
+  feed = PageFeed()
+  sequence_errors: list[BaseException] = []
+
+  def run_sequence() -> None:
+    try:
+      sequence(feed)
+    except BaseException as err: # pylint: disable=broad-exception-caught
+      sequence_errors.append(err)
+      feed.close(err)
+
+  thread = Thread(target=run_sequence, name="sequence-pipeline")
+  thread.start()
+  try:
+    ocr(feed)
+  except BaseException as err:
+    feed.finish(err)
+    thread.join()
+    if sequence_errors and err.__cause__ is sequence_errors[0]:
+      raise sequence_errors[0] from None # OCR is cancelled by it
+    raise err
+
+  feed.finish()
+  thread.join()
+  if sequence_errors:
+    raise sequence_errors[0]
+
+_DEFAULT_DATA_TOKENS = 4096
+_MIN_DATA_TOKENS = 512
+
+# tokens of data in each request. within the context window of the model, half of what the prompt
+# of the stage leaves is for the data, and the other half for the response.
+def _data_tokens(llm: LLM, window_tokens: int | None, context_tokens: int | None, template_name: str) -> int:
+  if context_tokens is None:
+    return window_tokens or _DEFAULT_DATA_TOKENS
+  prompt_tokens = llm.prompt_tokens_count(template_name, {})
+  data_tokens = max((context_tokens - prompt_tokens) // 2, _MIN_DATA_TOKENS)
+  if window_tokens is not None:
+    data_tokens = min(data_tokens, window_tokens)
+  return data_tokens
 
 class _TranslationLLMWrapper:
   """LLM 包装器，在原有功能基础上添加翻译功能"""
@@ -1,4 +1,4 @@
-from typing import Generator
+from typing import Generator, Sequence
 from pathlib import Path
 from xml.etree.ElementTree import Element
 
@@ -7,7 +7,7 @@ from ...xml import encode_friendly
 from ..data import Layout, LayoutKind
 from ..sequence import read_paragraphs
 from ..contents import Contents, Chapter
-from ..utils import remove_file, Context, Partition
+from ..utils import remove_file, run_partition_tasks, count_tokens_in_batches, plan_chunks, bisect_request, Context, Partition, PartitionTask
 from .common import State
 from .fragment import Fragment, FragmentRequest
 
@@ -18,6 +18,8 @@ def map_contents(
       contents: Contents,
       sequence_path: Path,
       map_path: Path,
+      max_concurrency: int = 1,
+      bisect_after: int | None = None,
     ) -> None:
 
   mapper = _ContentsMapper(
@@ -26,11 +28,16 @@ def map_contents(
     contents=contents,
     sequence_path=sequence_path,
     map_path=map_path,
+    max_concurrency=max_concurrency,
+    bisect_after=bisect_after,
   )
   mapper.do()
 
 _MAX_ABSTRACT_CONTENT_TOKENS = 150
 
+# patches (with their page indexes) and (headline id, chapter id) pairs matched from a response
+_Mapped = tuple[list[tuple[int, Element]], list[tuple[str, int]]]
+
 class _ContentsMapper:
   def __init__(
         self,
@@ -39,6 +46,8 @@ class _ContentsMapper:
         contents: Contents,
         sequence_path: Path,
         map_path: Path,
+        max_concurrency: int,
+        bisect_after: int | None,
       ) -> None:
 
     self._ctx: Context[State] = context
@@ -46,6 +55,8 @@ class _ContentsMapper:
     self._contents: Contents = contents
     self._sequence_path: Path = sequence_path
     self._map_path: Path = map_path
+    self._max_concurrency: int = max_concurrency
+    self._bisect_after: int | None = bisect_after
 
   def do(self):
     contents_tokens_count = self._llm.count_tokens_count(
@@ -60,62 +71,80 @@ class _ContentsMapper:
       ),
     )
     with partition:
-      for task in partition.pop_tasks():
-        with task:
-          request = task.payload
-          request_xml = request.complete_to_xml()
-          request_xml.insert(0, self._get_contents_xml())
-          resp_xml = self._llm.request_xml(
-            template_name="contents/mapper",
-            user_data=request_xml,
-            params={
-              "fragments_count": request.fragments_count,
-            },
-          )
-          page_indexes_set: set[int] = set()
-          map_element = Element("map")
-          patch_element = Element("patch")
-
-          for page_index, sub_patch_element in request.generate_patch_xmls(resp_xml):
-            page_indexes_set.add(page_index)
-            patch_element.append(sub_patch_element)
-
-          for headline_id, chapter_id in request.generate_matched_mapper(resp_xml):
-            mapper = Element("mapper")
-            map_element.append(mapper)
-            mapper.set("headline-id", headline_id)
-            mapper.set("chapter-id", str(chapter_id))
-
-          page_indexes = sorted(list(page_indexes_set))
-          map_element.set("page_indexes", ",".join(map(str, page_indexes)))
-          if len(patch_element) > 0:
-            map_element.append(patch_element)
-
-          file_name = f"pages_{request.begin_page_index}_{request.end_page_index}.xml"
-          file_path = self._map_path / file_name
-          self._ctx.write_xml_file(file_path, map_element)
+      run_partition_tasks(
+        partition=partition,
+        handle=self._handle_task,
+        max_concurrency=self._max_concurrency,
+      )
+
+  def _handle_task(self, task: PartitionTask[tuple[int], State, FragmentRequest]) -> None:
+    request = task.payload
+    patches, matched_mapper = bisect_request(
+      items=request.fragments,
+      request=lambda fragments, retry_times, _: self._map_fragments(fragments, retry_times),
+      merge=lambda mapped_list: (
+        [patch for patches, _ in mapped_list for patch in patches],
+        [pair for _, pairs in mapped_list for pair in pairs],
+      ),
+      bisect_after=self._bisect_after,
+    )
+    page_indexes_set: set[int] = set()
+    map_element = Element("map")
+    patch_element = Element("patch")
+
+    for page_index, sub_patch_element in patches:
+      page_indexes_set.add(page_index)
+      patch_element.append(sub_patch_element)
+
+    for headline_id, chapter_id in matched_mapper:
+      mapper = Element("mapper")
+      map_element.append(mapper)
+      mapper.set("headline-id", headline_id)
+      mapper.set("chapter-id", str(chapter_id))
+
+    page_indexes = sorted(list(page_indexes_set))
+    map_element.set("page_indexes", ",".join(map(str, page_indexes)))
+    if len(patch_element) > 0:
+      map_element.append(patch_element)
+
+    file_name = f"pages_{request.begin_page_index}_{request.end_page_index}.xml"
+    file_path = self._map_path / file_name
+    self._ctx.write_xml_file(file_path, map_element)
+
+  def _map_fragments(self, fragments: Sequence[Fragment], retry_times: int | None) -> _Mapped:
+    request = FragmentRequest()
+    for fragment in fragments:
+      request.append(fragment)
+    request_xml = request.complete_to_xml()
+    request_xml.insert(0, self._get_contents_xml())
+    resp_xml = self._llm.request_xml(
+      template_name="contents/mapper",
+      user_data=request_xml,
+      params={
+        "fragments_count": request.fragments_count,
+      },
+      retry_times=retry_times,
+    )
+    return (
+      list(request.generate_patch_xmls(resp_xml)),
+      list(request.generate_matched_mapper(resp_xml)),
+    )
 
   def _gen_request(self, contents_tokens_count: int) -> Generator[tuple[int, int, FragmentRequest], None, None]:
-    request = FragmentRequest()
-    request_tokens = 0
     max_request_tokens = self._ctx.state["max_request_tokens"]
     max_request_tokens = max(
       max_request_tokens - contents_tokens_count,
       int(max_request_tokens * 0.25),
     )
-    for fragment in self._read_fragment():
-      id = 1 # only for calculate tokens. won't be used in request
-      request_text = encode_friendly(fragment.to_request_xml(id))
-      tokens = len(self._llm.encode_tokens(request_text))
-      if request_tokens > 0 and request_tokens + tokens > max_request_tokens:
-        yield request.begin_page_index, request.end_page_index, request
-        request = FragmentRequest()
-        request_tokens = 0
-
-      request_tokens += tokens
-      request.append(fragment)
-
-    if request_tokens > 0:
+    fragments_with_tokens = count_tokens_in_batches(
+      llm=self._llm,
+      items=self._read_fragment(),
+      to_text=lambda fragment: encode_friendly(fragment.to_request_xml(1)), # id is only for calculate tokens
+    )
+    for chunk in plan_chunks(fragments_with_tokens, max_request_tokens):
+      request = FragmentRequest()
+      for fragment in chunk:
+        request.append(fragment)
       yield request.begin_page_index, request.end_page_index, request
 
   def _read_fragment(self) -> Generator[Fragment, None, None]:
@@ -136,17 +165,18 @@ class _ContentsMapper:
 
       elif fragment is not None and layout.kind == LayoutKind.TEXT:
         for line in layout.lines:
-          tokens = self._llm.encode_tokens(line.text)
-          next_tokens_count = fragment_tokens_count + len(tokens)
+          tokens_count = self._llm.count_tokens_count(line.text)
+          next_tokens_count = fragment_tokens_count + tokens_count
           if next_tokens_count <= _MAX_ABSTRACT_CONTENT_TOKENS:
             fragment.append_abstract_line(
               parent_layout=layout,
               text=line.text,
             )
-            fragment_tokens_count += len(tokens)
+            fragment_tokens_count += tokens_count
           else:
+            # only the line to cut off is encoded
             can_added_tokens_count = next_tokens_count - _MAX_ABSTRACT_CONTENT_TOKENS
-            tokens = tokens[:can_added_tokens_count]
+            tokens = self._llm.encode_tokens(line.text)[:can_added_tokens_count]
             fragment.append_abstract_line(
               parent_layout=layout,
               text=self._llm.decode_tokens(tokens) + "...",
@@ -159,6 +159,10 @@ class FragmentRequest:
   def __init__(self):
     self._fragments: list[Fragment] = []
 
+  @property
+  def fragments(self) -> list[Fragment]:
+    return self._fragments
+
   @property
   def fragments_count(self) -> int:
     return len(self._fragments)
@@ -4,7 +4,7 @@ from shutil import rmtree
 
 from ...llm import LLM
 from ..contents import Contents, Chapter
-from ..utils import xml_files, Context
+from ..utils import xml_files, Context, Durability
 from .common import State, Phase
 from .contents_mapper import map_contents
 from .patcher import read_paragraphs, read_paragraphs_with_patches
@@ -16,6 +16,9 @@ def generate_chapters(
       sequence_path: Path,
       workspace_path: Path,
       max_request_tokens: int,
+      max_concurrency: int = 1,
+      durability: Durability = Durability.BATCH,
+      bisect_after: int | None = None,
     ) -> tuple[Path, Contents | None]:
 
   map_path: Path = workspace_path / "map"
@@ -25,7 +28,7 @@ def generate_chapters(
     "has_contents": False,
     "max_request_tokens": max_request_tokens,
     "completed_ranges": [],
-  })
+  }, durability=durability)
   if context.state["phase"] == Phase.MAPPER:
     has_contents = False
     if contents is not None:
@@ -36,6 +39,8 @@ def generate_chapters(
         contents=contents,
         sequence_path=sequence_path,
         map_path=map_path,
+        max_concurrency=max_concurrency,
+        bisect_after=bisect_after,
       )
 
     context.state = {
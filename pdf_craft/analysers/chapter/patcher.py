@@ -4,27 +4,19 @@ from typing import Generator, Iterator
 from xml.etree.ElementTree import Element
 
 from ..contents import Contents, Chapter
-from ..sequence import decode_paragraph
-from ..data import Paragraph
+from ..sequence import read_paragraphs as read_sequence_paragraphs, decode_layout
+from ..data import Paragraph, Layout, ASSET_LAYOUT_KINDS
 from ..utils import xml_files, read_xml_file, XML_Info
 
 
+# paragraphs are read by `read_sequence_paragraphs()`, whose decoded results are cached and shared with other stages
 def read_paragraphs(paragraph_path: Path) -> Generator[Paragraph, None, None]:
-  for file_path, _, page_index, order_index in xml_files(paragraph_path):
-    raw_root = read_xml_file(file_path)
-    root = Element(raw_root.tag, attrib=raw_root.attrib)
-    for layout in raw_root:
-      if layout.get("id", None) is None:
-        continue
-      if _is_invalid_layout_element(layout):
-        continue
-      root.append(layout)
-
-    yield decode_paragraph(
-      element=root,
-      page_index=page_index,
-      order_index=order_index,
-    )
+  for paragraph in read_sequence_paragraphs(paragraph_path):
+    paragraph.layouts = [
+      layout for layout in paragraph.layouts
+      if not _is_invalid_layout(layout)
+    ]
+    yield paragraph
 
 def read_paragraphs_with_patches(
       paragraph_path: Path,
@@ -37,51 +29,52 @@ def read_paragraphs_with_patches(
     map_path=map_path,
     no_matched_chapters=dict((c.id, c) for c in contents),
   )
-  for file_path, _, page_index, order_index in xml_files(paragraph_path):
-    if page_index in contents_page_indexes:
+  for paragraph in read_sequence_paragraphs(paragraph_path):
+    if paragraph.page_index in contents_page_indexes:
       continue # skip contents
 
-    raw_root = read_xml_file(file_path)
-    root = Element(raw_root.tag, attrib=raw_root.attrib)
+    page_index = paragraph.page_index
+    order_index = paragraph.order_index
+    layouts: list[Layout] = []
     root_chapter: Chapter | None = None
 
-    for raw_layout in raw_root:
-      id = raw_layout.get("id", None)
-      if id is None:
-        continue
-
-      page_index, _ = id.split("/", maxsplit=1)
-      page_index = int(page_index)
+    for raw_layout in paragraph.layouts:
+      id = raw_layout.id
+      page_index = raw_layout.page_index
       patch = reader.read(page_index)
 
       chapter: Chapter | None = None
-      layout: Element = raw_layout
+      layout: Layout | None = raw_layout
       if patch is not None:
         chapter = patch.headline2chapter.get(id, None)
-        layout = patch.layout_xmls_patches.get(id, raw_layout)
+        layout_xml = patch.layout_xmls_patches.get(id, None)
+        if layout_xml is not None:
+          layout = None if _is_invalid_layout_element(layout_xml) else decode_layout(layout_xml)
 
       if chapter is not None:
         root_chapter = chapter
 
-      if _is_invalid_layout_element(layout):
+      if layout is None or _is_invalid_layout(layout):
         continue # means it was removed
 
-      if root_chapter is not None and len(root) > 0:
+      if root_chapter is not None and len(layouts) > 0:
         # paragraph maybe splitted by a chapter headline
-        yield root_chapter, decode_paragraph(
-          element=root,
+        yield root_chapter, Paragraph(
+          type=paragraph.type,
           page_index=page_index,
           order_index=order_index,
+          layouts=layouts,
         )
-        root = Element(raw_root.tag, attrib=raw_root.attrib)
+        layouts = []
 
-      root.append(layout)
+      layouts.append(layout)
 
-    if len(root) > 0:
-      yield root_chapter, decode_paragraph(
-        element=root,
+    if len(layouts) > 0:
+      yield root_chapter, Paragraph(
+        type=paragraph.type,
         page_index=page_index,
         order_index=order_index,
+        layouts=layouts,
       )
 
 def _is_invalid_layout_element(layout: Element) -> bool:
@@ -91,6 +84,14 @@ def _is_invalid_layout_element(layout: Element) -> bool:
     return False
   return True
 
+# the same as `_is_invalid_layout_element()` for the decoded layout
+def _is_invalid_layout(layout: Layout) -> bool:
+  if len(layout.lines) > 0 or len(layout.caption.lines) > 0:
+    return False
+  if layout.kind in ASSET_LAYOUT_KINDS:
+    return False
+  return True
+
 @dataclass
 class _Patch:
   range: tuple[int, int]
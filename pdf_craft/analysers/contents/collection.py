@@ -119,7 +119,7 @@ class _Collector:
         yield_pages_count += 1
       else:
         page_element = page.xml()
-        page_tokens = len(self._llm.encode_tokens(encode(page_element)))
+        page_tokens = self._llm.count_tokens_count(encode(page_element))
         if unmatched_pages and unmatched_tokens + page_tokens > max_data_tokens:
           matched_pages, done = identify_matched_pages_and_check_done()
           yield from matched_pages
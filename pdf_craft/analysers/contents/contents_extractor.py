@@ -2,19 +2,26 @@ from pathlib import Path
 from xml.etree.ElementTree import Element
 
 from ...llm import LLM
-from ..utils import read_xml_file, Context
+from ..utils import read_xml_file, Context, Durability
 from .common import Phase, State
 from .type import Contents, Chapter
 from .collection import collect
 from .utils import normalize_layout_xml
 
 
-def extract_contents(llm: LLM, workspace: Path, sequence_path: Path, max_data_tokens: int) -> Contents | None:
+def extract_contents(
+      llm: LLM,
+      workspace: Path,
+      sequence_path: Path,
+      max_data_tokens: int,
+      durability: Durability = Durability.BATCH,
+    ) -> Contents | None:
+
   context: Context[State] = Context(workspace, lambda: {
     "phase": Phase.INIT,
     "page_indexes": [],
     "max_data_tokens": max_data_tokens,
-  })
+  }, durability=durability)
   if context.state["phase"] == Phase.NO_CONTENTS:
     return None
 
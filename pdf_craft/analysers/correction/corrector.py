@@ -7,82 +7,138 @@ from xml.etree.ElementTree import Element
 
 from ...llm import LLM
 from ...xml import encode_friendly
-from ..utils import Context, Partition
+from ..utils import run_partition_tasks, count_tokens_in_batches, plan_chunks, bisect_request, Context, Partition, PartitionTask
 from ..sequence import read_paragraphs
-from ..data import Paragraph, ParagraphType, AssetLayout, FormulaLayout
+from ..data import Paragraph, AssetLayout, FormulaLayout
 from .common import State
 from .repeater import repeat_correct
+from .gate import score_paragraphs
 from .paragraphs_reader import ParagraphsReader
 
 
+# request element and the paragraphs it was generated from
+_Request = tuple[Element, list[Paragraph]]
+
 class Corrector:
-  def __init__(self, llm: LLM, context: Context[State]):
+  def __init__(
+        self,
+        llm: LLM,
+        context: Context[State],
+        max_concurrency: int = 1,
+        skip_threshold: float | None = None,
+        edits: bool = False,
+        bisect_after: int | None = None,
+      ):
     self._llm: LLM = llm
     self._ctx: Context[State] = context
+    self._max_concurrency: int = max_concurrency
+    self._skip_threshold: float | None = skip_threshold # chunks scoring at least it are kept as they are
+    self._edits: bool = edits
+    self._bisect_after: int | None = bisect_after
 
   def do(self, from_path: Path, request_path: Path, is_footnote: bool):
     request_path.mkdir(parents=True, exist_ok=True)
-    reader = ParagraphsReader(from_path)
-    partition: Partition[tuple[int, int], State, Element] = Partition(
+    partition: Partition[tuple[int, int], State, _Request] = Partition(
       dimension=2,
       context=self._ctx,
       sequence=self._generate_request_xml(from_path),
       remove=lambda begin, end: shutil.rmtree(
         request_path / _file_name("steps", begin, end),
+        ignore_errors=True, # a skipped chunk has no steps
       ),
     )
     with partition:
-      for task in partition.pop_tasks():
-        with task:
-          begin = task.begin
-          end = task.end
-          request_element = task.payload
-          resp_element = repeat_correct(
-            llm=self._llm,
-            context=self._ctx,
-            save_path=request_path / _file_name("steps",begin, end),
-            raw_request=request_element,
-            is_footnote=is_footnote,
-          )
-          self._apply_updation(
-            reader=reader,
-            request_path=request_path,
-            request_element=request_element,
-            resp_element=resp_element,
-          )
-
-  def _generate_request_xml(self, from_path: Path):
-    max_data_tokens = self._ctx.state["max_data_tokens"]
-    request_element = Element("request")
-    request_begin: tuple[int, int] = (sys.maxsize, sys.maxsize)
-    request_end: tuple[int, int] = (-1, -1)
-    data_tokens: int = 0
-    last_type: ParagraphType | None = None
-
-    for paragraph in read_paragraphs(from_path):
-      layout_element = self._paragraph_to_layout_xml(paragraph)
-      tokens = self._llm.count_tokens_count(
-        text=encode_friendly(layout_element),
+      run_partition_tasks(
+        partition=partition,
+        handle=lambda task: self._handle_task(
+          task=task,
+          request_path=request_path,
+          is_footnote=is_footnote,
+        ),
+        max_concurrency=self._max_concurrency,
       )
-      if len(request_element) > 0 and (
-        data_tokens + tokens > max_data_tokens or
-        last_type != paragraph.type
-      ):
-        yield request_begin, request_end, request_element
-        request_element = Element("request")
-        data_tokens = 0
-        request_begin = (sys.maxsize, sys.maxsize)
-        request_end = (-1, -1)
-
-      paragraph_index = (paragraph.page_index, paragraph.order_index)
-      request_element.append(layout_element)
-      request_begin = min(request_begin, paragraph_index)
-      request_end = max(request_end, paragraph_index)
-      data_tokens += tokens
-      last_type = paragraph.type
-
-    if len(request_element) > 0:
-      yield request_begin, request_end, request_element
+
+  def _handle_task(
+        self,
+        task: PartitionTask[tuple[int, int], State, _Request],
+        request_path: Path,
+        is_footnote: bool,
+      ) -> None:
+
+    begin = task.begin
+    end = task.end
+    request_element, paragraphs = task.payload
+    resp_element: Element
+    if self._skip_threshold is not None and \
+       score_paragraphs(paragraphs) >= self._skip_threshold:
+      resp_element = request_element
+    else:
+      save_path = request_path / _file_name("steps",begin, end)
+      resp_element = bisect_request(
+        items=list(request_element),
+        request=lambda layouts, retry_times, halves: self._correct_layouts(
+          layouts=layouts,
+          save_path=save_path.joinpath(*(str(half) for half in halves)), # steps of halves are in sub-dirs
+          is_footnote=is_footnote,
+          retry_times=retry_times,
+        ),
+        merge=self._merge_requests,
+        bisect_after=self._bisect_after,
+      )
+    self._apply_updation(
+      reader=ParagraphsReader(paragraphs),
+      request_path=request_path,
+      request_element=request_element,
+      resp_element=resp_element,
+    )
+
+  def _correct_layouts(self, layouts: list[Element], save_path: Path, is_footnote: bool, retry_times: int | None) -> Element:
+    request_element = Element("request")
+    request_element.extend(layouts)
+    return repeat_correct(
+      llm=self._llm,
+      context=self._ctx,
+      save_path=save_path,
+      raw_request=request_element,
+      is_footnote=is_footnote,
+      edits=self._edits,
+      retry_times=retry_times,
+    )
+
+  def _merge_requests(self, request_elements: list[Element]) -> Element:
+    merged_element = Element("request")
+    for request_element in request_elements:
+      merged_element.extend(request_element)
+    return merged_element
+
+  def _generate_request_xml(self, from_path: Path) -> Generator[tuple[tuple[int, int], tuple[int, int], _Request], None, None]:
+    paragraphs_with_tokens = count_tokens_in_batches(
+      llm=self._llm,
+      items=(
+        (paragraph, self._paragraph_to_layout_xml(paragraph))
+        for paragraph in read_paragraphs(from_path)
+      ),
+      to_text=lambda item: encode_friendly(item[1]),
+    )
+    chunks = plan_chunks(
+      items=paragraphs_with_tokens,
+      max_weight=self._ctx.state["max_data_tokens"],
+      group=lambda item: item[0].type,
+    )
+    for chunk in chunks:
+      request_element = Element("request")
+      request_paragraphs: list[Paragraph] = []
+      request_begin: tuple[int, int] = (sys.maxsize, sys.maxsize)
+      request_end: tuple[int, int] = (-1, -1)
+
+      for paragraph, layout_element in chunk:
+        paragraph_index = (paragraph.page_index, paragraph.order_index)
+        request_element.append(layout_element)
+        request_paragraphs.append(paragraph)
+        request_begin = min(request_begin, paragraph_index)
+        request_end = max(request_end, paragraph_index)
+
+      yield request_begin, request_end, (request_element, request_paragraphs)
 
   def _paragraph_to_layout_xml(self, paragraph: Paragraph) -> tuple[int, Element]:
     layout_element: Element | None = None
@@ -3,18 +3,31 @@ import re
 from pathlib import Path
 from ...llm import LLM
 from ..sequence import decode_paragraph, ParagraphWriter
-from ..utils import read_xml_file, Context
+from ..utils import read_xml_file, Context, Durability
 from .common import State, Phase
 from .corrector import Corrector
 
 
-def correct(llm: LLM, workspace: Path, text_path: Path, footnote_path: Path, max_data_tokens: int) -> Path:
+def correct(
+      llm: LLM,
+      workspace: Path,
+      text_path: Path,
+      footnote_path: Path,
+      max_data_tokens: int,
+      max_concurrency: int = 1,
+      durability: Durability = Durability.BATCH,
+      packed_paragraphs: bool = False,
+      skip_threshold: float | None = None,
+      edits: bool = False,
+      bisect_after: int | None = None,
+    ) -> Path:
+
   context: Context[State] = Context(workspace, lambda: {
     "phase": Phase.Text.value,
     "max_data_tokens": max_data_tokens,
     "completed_ranges": [],
-  })
-  corrector = Corrector(llm, context)
+  }, durability=durability)
+  corrector = Corrector(llm, context, max_concurrency, skip_threshold, edits, bisect_after)
   output_path = workspace / "output"
   text_request_path = workspace / "text"
   footnote_request_path = workspace / "footnote"
@@ -51,12 +64,14 @@ def correct(llm: LLM, workspace: Path, text_path: Path, footnote_path: Path, max
         context=context,
         request_path=text_request_path,
         output_path=output_path / "text",
+        packed=packed_paragraphs,
       )
     if footnote_request_path.exists():
       _generate_paragraph_files(
         context=context,
         request_path=footnote_request_path,
         output_path=output_path / "footnote",
+        packed=packed_paragraphs,
       )
     context.state = {
       **context.state,
@@ -67,7 +82,7 @@ def correct(llm: LLM, workspace: Path, text_path: Path, footnote_path: Path, max
 _CHUNK_FILE_PATTERN = re.compile(r"^chunk(_\d+){4}\.xml$")
 _CHUNK_FILE_HEAD_AND_TAIL_PATTERN = re.compile(r"(^chunk_|\.xml$)")
 
-def _generate_paragraph_files(context: Context[State], request_path: Path, output_path: Path):
+def _generate_paragraph_files(context: Context[State], request_path: Path, output_path: Path, packed: bool):
   index_and_file_list: list[tuple[tuple[int, int], tuple[int, int], Path]] = []
   for file in request_path.iterdir():
     matches = re.match(_CHUNK_FILE_PATTERN, file.name)
@@ -79,12 +94,12 @@ def _generate_paragraph_files(context: Context[State], request_path: Path, outpu
     index2 = (indexes[2], indexes[3])
     index_and_file_list.append((index1, index2, file))
 
-  writer = ParagraphWriter(context, output_path)
-  for _, _, file in sorted(index_and_file_list, key=lambda x: x[0]):
-    for paragraph_element in read_xml_file(file):
-      paragraph = decode_paragraph(
-        element=paragraph_element,
-        page_index=int(paragraph_element.get("page-index", "-1")),
-        order_index=int(paragraph_element.get("order-index", "-1")),
-      )
-      writer.write(paragraph)
+  with ParagraphWriter(context, output_path, packed=packed) as writer:
+    for _, _, file in sorted(index_and_file_list, key=lambda x: x[0]):
+      for paragraph_element in read_xml_file(file):
+        paragraph = decode_paragraph(
+          element=paragraph_element,
+          page_index=int(paragraph_element.get("page-index", "-1")),
+          order_index=int(paragraph_element.get("order-index", "-1")),
+        )
+        writer.write(paragraph)
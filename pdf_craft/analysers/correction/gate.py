@@ -0,0 +1,54 @@
+import re
+
+from typing import Iterable
+from ..data import Paragraph, AssetLayout
+
+
+# defects that hardly appear in clean text: replacement chars, mojibake of UTF-8 read as Latin-1
+# ("Ã©", "â€™"), and stray control chars, private use chars or symbols OCR makes of specks
+_DEFECT_PATTERN = re.compile(
+  r"\ufffd|\u00c3[\u0080-\u00bf]|\u00c2[\u00a0-\u00bf]|\u00e2\u20ac"
+  r"|[\u0000-\u0008\u000b\u000c\u000e-\u001f\u007f-\u009f\ue000-\uf8ff\u00a4\u00a6\u00a8\u00ac\u00af]"
+)
+# defects that may also be written on purpose, such as "H2O" or "well- and ill-formed".
+# line end hyphens ("philo-" and "sophy" in the next line) and long words (in German, or technical text)
+# are normal in scanned books, so they are not counted at all.
+_MINOR_DEFECT_PATTERNS = (
+  re.compile(r"[a-z]\d+[a-z]"), # "l0ve"
+  re.compile(r"[^\W\d_]- +[a-z]"), # "exam- ple"
+)
+_MINOR_DEFECT_WEIGHT = 0.25
+
+# each defect takes this rate off the score, however long the text is, so that a few of them
+# in a long chunk still get it corrected
+_DEFECT_FACTOR = 0.9
+
+# scores how clean OCR text of paragraphs is, from 0.0 to 1.0: the mean confidence of lines (weighted by
+# their length), reduced by defects that correction would fix. a line without confidence scores 0.0,
+# as there is nothing to trust.
+def score_paragraphs(paragraphs: Iterable[Paragraph]) -> float:
+  confidence_sum: float = 0.0
+  length: int = 0
+  defects: float = 0.0
+
+  for paragraph in paragraphs:
+    for layout in paragraph.layouts:
+      if isinstance(layout, AssetLayout):
+        continue
+      for line in layout.lines:
+        text = line.text.strip()
+        if not text:
+          continue
+        if line.confidence is None:
+          return 0.0
+
+        confidence_sum += line.confidence * len(text)
+        length += len(text)
+        defects += len(_DEFECT_PATTERN.findall(text))
+        for pattern in _MINOR_DEFECT_PATTERNS:
+          defects += len(pattern.findall(text)) * _MINOR_DEFECT_WEIGHT
+
+  if length == 0:
+    return 1.0
+
+  return confidence_sum / length * _DEFECT_FACTOR ** defects
@@ -1,10 +1,8 @@
 import sys
 
-from pathlib import Path
-from typing import Generator
+from typing import Iterable, Iterator
 from dataclasses import dataclass
 
-from ..sequence import read_paragraphs
 from ..data import Paragraph
 
 
@@ -19,8 +17,8 @@ class _Buffer:
     return self.begin_layout_index <= layout_index <= self.end_layout_index
 
 class ParagraphsReader:
-  def __init__(self, from_path: Path):
-    self._gen: Generator[Paragraph, None, None] = read_paragraphs(from_path)
+  def __init__(self, paragraphs: Iterable[Paragraph]):
+    self._gen: Iterator[Paragraph] = iter(paragraphs)
     self._buffer: _Buffer | None = None
 
   def read(self, layout_index: tuple[int, int]) -> Paragraph | None:
@@ -17,6 +17,8 @@ def repeat_correct(
       save_path: Path,
       raw_request: Element,
       is_footnote: bool,
+      edits: bool = False,
+      retry_times: int | None = None,
     ) -> Element:
 
   save_path.mkdir(parents=True, exist_ok=True)
@@ -25,6 +27,8 @@ def repeat_correct(
     context=context,
     save_path=save_path,
     is_footnote=is_footnote,
+    edits=edits,
+    retry_times=retry_times,
   )
   return repeater.do(raw_request)
 
@@ -53,11 +57,15 @@ class _Repeater:
         context: Context[State],
         save_path: Path,
         is_footnote: bool,
+        edits: bool,
+        retry_times: int | None,
       ):
     self._llm: LLM = llm
     self._ctx: Context[State] = context
     self._save_path: Path = save_path
     self._is_footnote: bool = is_footnote
+    self._edits: bool = edits # only changed lines are responded, as <edit> elements
+    self._retry_times: int | None = retry_times
     self._quality: _Quality | None = None
     self._remain_steps: int = _BASIC_RETRY_TIMES
     self._next_index: int = 1
@@ -74,8 +82,11 @@ class _Repeater:
           params={
             "layouts_count": 4,
             "is_footnote": self._is_footnote,
+            "edits": self._edits,
             "marks": samples(NumberStyle.CIRCLED_NUMBER, 6),
           },
+          retry_times=self._retry_times,
+          attempt=self._next_index - 1,
         )
       except ValueError as e:
         print(f"❌ 校正阶段 XML 解析失败: {e}")
@@ -84,6 +95,8 @@ class _Repeater:
 
       quality = self._read_quality_from_element(resp_element)
       self._report_quality(quality)
+      if self._edits:
+        self._apply_edits(request_element, resp_element)
       updation_element = self._save_step_file(
         request_element=request_element,
         resp_element=resp_element,
@@ -134,6 +147,38 @@ class _Repeater:
 
     return resp_element
 
+  # edits are replaced by clones of their layouts with the lines edited, as if the layouts were responded
+  # as a whole. so that lines are never added or lost, an edit of a layout or line not requested is dropped.
+  def _apply_edits(self, request_element: Element, resp_element: Element) -> None:
+    request_layouts: dict[str, Element] = {}
+    for layout_element in request_element:
+      layout_id = layout_element.get("id", None)
+      if layout_id is not None:
+        request_layouts[layout_id] = layout_element
+
+    edited_layouts: dict[str, Element] = {}
+    edit_elements = [e for e in resp_element if e.tag == "edit"]
+
+    for edit_element in edit_elements:
+      resp_element.remove(edit_element)
+      layout_id = edit_element.get("layout", None)
+      line_id = edit_element.get("line", None)
+      request_layout_element = request_layouts.get(layout_id, None)
+      if request_layout_element is None or line_id is None:
+        continue
+
+      layout_element = edited_layouts.get(layout_id, None)
+      if layout_element is None:
+        layout_element = clone_xml(request_layout_element)
+      for line_element in layout_element:
+        if line_element.tag == "line" and line_element.get("id", None) == line_id:
+          line_element.text = edit_element.text or ""
+          edited_layouts[layout_id] = layout_element
+          break
+
+    for layout_id, layout_element in edited_layouts.items():
+      resp_element.append(layout_element)
+
   def _read_quality_from_element(self, element: Element) -> _Quality:
     quality: _Quality = _Quality.PERFECT
     overview_element = element.find("overview")
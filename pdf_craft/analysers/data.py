@@ -1,10 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import lru_cache
 from strenum import StrEnum
 from xml.etree.ElementTree import Element
 
 
-@dataclass
+# whole books are kept in memory as these objects, so that they are slotted to save the memory of __dict__
+
+@dataclass(slots=True)
 class Paragraph:
   type: ParagraphType
   page_index: int
@@ -24,7 +27,7 @@ class ParagraphType(StrEnum):
   REFERENCES = "references"
   COPYRIGHT = "copyright"
 
-@dataclass
+@dataclass(slots=True)
 class Layout:
   kind: LayoutKind
   page_index: int
@@ -45,21 +48,21 @@ class Layout:
       element.append(self.caption.to_xml())
     return element
 
-@dataclass
+@dataclass(slots=True)
 class AssetLayout(Layout):
   hash: bytes
 
   def to_xml(self) -> Element:
-    element = super().to_xml()
+    element = Layout.to_xml(self) # super() is broken by slots=True
     element.set("hash", self.hash.hex())
     return element
 
-@dataclass
+@dataclass(slots=True)
 class FormulaLayout(AssetLayout):
   latex: str
 
   def to_xml(self) -> Element:
-    element = super().to_xml()
+    element = AssetLayout.to_xml(self)
     if self.latex:
       latex_element = Element("latex")
       latex_element.text = self.latex
@@ -80,7 +83,7 @@ ASSET_LAYOUT_KINDS = (
   LayoutKind.FORMULA,
 )
 
-@dataclass
+@dataclass(slots=True)
 class Caption:
   lines: list[Line]
 
@@ -90,13 +93,19 @@ class Caption:
       element.append(line.to_xml())
     return element
 
-@dataclass
+@dataclass(slots=True)
 class Line:
   text: str
-  confidence: str
+  confidence: float | None
 
   def to_xml(self) -> Element:
     element = Element("line")
     element.text = self.text
-    element.set("confidence", str(object=self.confidence))
-    return element
\ No newline at end of file
+    if self.confidence is not None:
+      element.set("confidence", "{:.2f}".format(self.confidence))
+    return element
+
+# layouts of the same asset share one object of its hash
+@lru_cache(maxsize=4096)
+def decode_hash(hash_hex: str) -> bytes:
+  return bytes.fromhex(hash_hex)
\ No newline at end of file
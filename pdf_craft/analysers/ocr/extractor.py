@@ -24,20 +24,23 @@ from ...pdf import (
 def extract_ocr_page_xmls(
     extractor: PDFPageExtractor,
     pdf_path: Path,
-    expected_page_indexes: set[int],
+    page_indexes: Iterable[int],
     cover_path: Path,
     assets_dir_path: Path,
-  ) -> Generator[Element, None, None]:
+  ) -> Generator[tuple[int, Element], None, None]:
 
   with fitz.open(pdf_path) as pdf:
     for i, blocks, image in extractor.extract_enumerated_blocks_and_image(
       pdf=pdf,
-      page_indexes=(i for i in range(pdf.page_count) if i not in expected_page_indexes),
+      page_indexes=page_indexes,
     ):
       if i == 0:
         image.save(cover_path)
 
       page_xml = _transform_page_xml(blocks)
+      dpi = image.info.get("dpi", None)
+      if dpi is not None:
+        page_xml.set("dpi", str(round(dpi[0])))
       _migrate_expressions_and_save_images(
         root=page_xml,
         blocks=blocks,
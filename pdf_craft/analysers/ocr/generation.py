@@ -1,9 +1,12 @@
+import fitz
+
 from pathlib import Path
 from typing import TypedDict
 
 from ...pdf import PDFPageExtractor
-from ..utils import Context
+from ..utils import Context, Durability, PageFeed
 from .extractor import extract_ocr_page_xmls
+from .processes import extract_ocr_page_xmls_in_processes
 
 
 class _State(TypedDict):
@@ -15,35 +18,61 @@ def generate_ocr_pages(
       pdf_path: Path,
       ocr_path: Path,
       assets_path: Path,
+      processes: int = 1,
+      durability: Durability = Durability.BATCH,
+      feed: PageFeed | None = None,
     ) -> None:
 
   context: Context[_State] = Context(ocr_path, lambda: {
     "completed_scanning": False,
     "completed_pages": [],
-  })
+  }, durability=durability)
   if context.state["completed_scanning"]:
     return
 
   for path in (context.path, assets_path):
     path.mkdir(parents=True, exist_ok=True)
 
-  for page_index, page_xml in extract_ocr_page_xmls(
-    extractor=extractor,
-    pdf_path=pdf_path,
-    expected_page_indexes=set(context.state["completed_pages"]),
-    cover_path=assets_path / "cover.png",
-    assets_dir_path=assets_path,
-  ):
-    file_name = f"page_{page_index + 1}.xml"
-    file_path = context.path / file_name
-    context.write_xml_file(file_path, page_xml)
-    context.state = {
-      **context.state,
-      "completed_pages": sorted([
-        *context.state["completed_pages"],
-        page_index,
-      ]),
-    }
+  with fitz.open(pdf_path) as pdf:
+    pages_count = pdf.page_count
+
+  completed_pages = set(context.state["completed_pages"])
+  if feed is not None:
+    for page_index in sorted(completed_pages):
+      feed.put(page_index + 1)
+
+  page_indexes = [i for i in range(pages_count) if i not in completed_pages]
+
+  if processes > 1:
+    page_xmls = extract_ocr_page_xmls_in_processes(
+      extractor=extractor,
+      pdf_path=pdf_path,
+      page_indexes=page_indexes,
+      cover_path=assets_path / "cover.png",
+      assets_dir_path=assets_path,
+      processes=processes,
+    )
+  else:
+    page_xmls = extract_ocr_page_xmls(
+      extractor=extractor,
+      pdf_path=pdf_path,
+      page_indexes=page_indexes,
+      cover_path=assets_path / "cover.png",
+      assets_dir_path=assets_path,
+    )
+
+  try:
+    for page_index, page_xml in page_xmls:
+      file_name = f"page_{page_index + 1}.xml"
+      file_path = context.path / file_name
+      context.write_xml_file(file_path, page_xml)
+      context.append_state("completed_pages", page_index)
+      if feed is not None:
+        feed.put(page_index + 1)
+  finally:
+    # stops OCR processes at once if it's cancelled (such as by the feed)
+    page_xmls.close()
+
   context.state = {
     **context.state,
     "completed_pages": [],
@@ -0,0 +1,116 @@
+import traceback
+import multiprocessing
+
+from pathlib import Path
+from queue import Empty
+from typing import Generator
+from xml.etree.ElementTree import fromstring, tostring, Element
+
+from ...pdf import PDFPageExtractor
+from .extractor import extract_ocr_page_xmls
+
+
+_PAGE = "page"
+_DONE = "done"
+_ERROR = "error"
+
+# pages are split into contiguous shards, one per process. each process loads its own models and scans
+# a few pages around its shard (see `_MAX_VIEWED_PAGES` of `DocumentExtractor`) so that headers and
+# footers are detected the same way as scanning the whole document in one process.
+def extract_ocr_page_xmls_in_processes(
+    extractor: PDFPageExtractor,
+    pdf_path: Path,
+    page_indexes: list[int],
+    cover_path: Path,
+    assets_dir_path: Path,
+    processes: int,
+  ) -> Generator[tuple[int, Element], None, None]:
+
+  shards = _split_shards(page_indexes, processes)
+  if len(shards) == 0:
+    return
+
+  # fork is unsafe once the models have started threads in the parent
+  mp_context = multiprocessing.get_context("spawn")
+  queue = mp_context.Queue()
+  workers = [
+    mp_context.Process(
+      target=_extract_shard,
+      name=f"ocr-worker-{i}",
+      args=(extractor, pdf_path, shard, cover_path, assets_dir_path, queue),
+      daemon=True,
+    )
+    for i, shard in enumerate(shards)
+  ]
+  for worker in workers:
+    worker.start()
+
+  try:
+    running_count = len(workers)
+    while running_count > 0:
+      message: tuple | None = None
+      try:
+        message = queue.get(timeout=1.0)
+      except Empty:
+        pass
+
+      if message is None:
+        # a worker killed by the system cannot report its error
+        for worker in workers:
+          if not worker.is_alive() and worker.exitcode != 0:
+            raise RuntimeError(f"{worker.name} exited with code {worker.exitcode}")
+        continue
+
+      kind = message[0]
+      if kind == _PAGE:
+        _, page_index, page_xml = message
+        yield page_index, fromstring(page_xml)
+      elif kind == _DONE:
+        running_count -= 1
+      elif kind == _ERROR:
+        raise RuntimeError(f"failed to extract OCR pages in worker process:\n{message[1]}")
+
+    for worker in workers:
+      worker.join()
+
+  finally:
+    for worker in workers:
+      if worker.is_alive():
+        worker.terminate()
+        worker.join()
+    queue.close()
+
+def _split_shards(page_indexes: list[int], processes: int) -> list[list[int]]:
+  page_indexes = sorted(page_indexes)
+  processes = max(1, min(processes, len(page_indexes)))
+  shards: list[list[int]] = []
+  begin = 0
+  for i in range(processes):
+    end = (len(page_indexes) * (i + 1)) // processes
+    if end > begin:
+      shards.append(page_indexes[begin:end])
+    begin = end
+  return shards
+
+def _extract_shard(
+    extractor: PDFPageExtractor,
+    pdf_path: Path,
+    page_indexes: list[int],
+    cover_path: Path,
+    assets_dir_path: Path,
+    queue: multiprocessing.Queue,
+  ) -> None:
+
+  try:
+    for page_index, page_xml in extract_ocr_page_xmls(
+      extractor=extractor,
+      pdf_path=pdf_path,
+      page_indexes=page_indexes,
+      cover_path=cover_path,
+      assets_dir_path=assets_dir_path,
+    ):
+      queue.put((_PAGE, page_index, tostring(page_xml, encoding="unicode")))
+    queue.put((_DONE,))
+
+  except BaseException: # pylint: disable=broad-exception-caught
+    queue.put((_ERROR, traceback.format_exc()))
@@ -2,7 +2,7 @@ from pathlib import Path
 from typing import TypedDict
 from strenum import StrEnum
 
-from ..utils import Context
+from ..utils import Context, Durability
 from .footnote import append_footnote_for_chapters, generate_footnote_references
 
 
@@ -18,12 +18,13 @@ def generate_chapters_with_footnotes(
       chapter_path: Path,
       footnote_sequence_path: Path,
       workspace_path: Path,
+      durability: Durability = Durability.BATCH,
     ) -> Path:
 
   output_path = workspace_path / "output"
   context: Context[_State] = Context(workspace_path, lambda: {
     "phase": _Phase.GENERATE_FOOTNOTES.value,
-  })
+  }, durability=durability)
   if context.state["phase"] == _Phase.GENERATE_FOOTNOTES:
     generate_footnote_references(
       sequence_path=footnote_sequence_path,
@@ -1,2 +1,3 @@
 from .executor import extract_sequences
-from .operation import read_paragraphs, decode_paragraph, decode_layout, ParagraphWriter
\ No newline at end of file
+from .operation import read_paragraphs, decode_paragraph, decode_layout, ParagraphWriter
+from .cache import ParagraphsCacheStats, paragraphs_cache_stats, set_paragraphs_cache_max_bytes
\ No newline at end of file
@@ -0,0 +1,106 @@
+from threading import Lock
+from dataclasses import dataclass, fields
+from collections import OrderedDict
+from typing import Hashable
+
+from ..data import Paragraph, Layout, Caption, Line
+from ..utils import IndexedXML
+
+
+@dataclass
+class ParagraphsCacheStats:
+  hits: int
+  misses: int
+  entries: int
+  bytes: int
+
+# 同一份段落会被多个阶段反复读取（目录提取、目录映射、章节生成），缓存解码后的结果。
+# 键随源文件变化而变化，容量以源 XML 的字节数计算（解码后的对象会占用其数倍的内存）。
+class _ParagraphsCache:
+  def __init__(self, max_bytes: int) -> None:
+    self._max_bytes: int = max_bytes
+    self._lock: Lock = Lock()
+    self._entries: OrderedDict[Hashable, tuple[Paragraph, int]] = OrderedDict()
+    self._total_bytes: int = 0
+    self._hits: int = 0
+    self._misses: int = 0
+
+  @property
+  def stats(self) -> ParagraphsCacheStats:
+    with self._lock:
+      return ParagraphsCacheStats(
+        hits=self._hits,
+        misses=self._misses,
+        entries=len(self._entries),
+        bytes=self._total_bytes,
+      )
+
+  def set_max_bytes(self, max_bytes: int) -> None:
+    with self._lock:
+      self._max_bytes = max_bytes
+      self._evict()
+
+  def read(self, xml: IndexedXML, decode) -> Paragraph:
+    with self._lock:
+      entry = self._entries.get(xml.key, None)
+      if entry is not None:
+        self._entries.move_to_end(xml.key)
+        self._hits += 1
+      else:
+        self._misses += 1
+
+    if entry is None:
+      paragraph = decode(xml.load(), xml.index1, xml.index2)
+      with self._lock:
+        if xml.key not in self._entries and xml.size <= self._max_bytes:
+          self._entries[xml.key] = (paragraph, xml.size)
+          self._total_bytes += xml.size
+          self._evict()
+    else:
+      paragraph, _ = entry
+
+    # callers may modify paragraphs, and the cached one must stay untouched
+    return _clone_paragraph(paragraph)
+
+  def _evict(self) -> None:
+    while self._total_bytes > self._max_bytes and len(self._entries) > 0:
+      _, (_, size) = self._entries.popitem(last=False)
+      self._total_bytes -= size
+
+def _clone_paragraph(paragraph: Paragraph) -> Paragraph:
+  return Paragraph(
+    type=paragraph.type,
+    page_index=paragraph.page_index,
+    order_index=paragraph.order_index,
+    layouts=[_clone_layout(layout) for layout in paragraph.layouts],
+  )
+
+# keeps the subclass and its fields. faster than copy.copy()
+def _clone_layout(layout: Layout) -> Layout:
+  layout_type = type(layout)
+  field_names = _layout_field_names.get(layout_type, None)
+  if field_names is None:
+    field_names = tuple(f.name for f in fields(layout_type))
+    _layout_field_names[layout_type] = field_names
+
+  cloned = object.__new__(layout_type)
+  for field_name in field_names:
+    setattr(cloned, field_name, getattr(layout, field_name))
+
+  cloned.lines = [Line(text=line.text, confidence=line.confidence) for line in layout.lines]
+  cloned.caption = Caption(lines=[
+    Line(text=line.text, confidence=line.confidence)
+    for line in layout.caption.lines
+  ])
+  return cloned
+
+_layout_field_names: dict[type, tuple[str, ...]] = {}
+
+paragraphs_cache = _ParagraphsCache(max_bytes=128 * 1024 * 1024)
+
+def paragraphs_cache_stats() -> ParagraphsCacheStats:
+  return paragraphs_cache.stats
+
+# 0 to disable the cache
+def set_paragraphs_cache_max_bytes(max_bytes: int) -> None:
+  paragraphs_cache.set_max_bytes(max_bytes)
@@ -1,24 +1,38 @@
 from pathlib import Path
 
 from ...llm import LLM
-from ..utils import Context
+from ..utils import Context, Durability, PageFeed
 from .common import Phase, State, SequenceType
 from .ocr_extractor import extract_ocr
 from .joint import join
 
 
-def extract_sequences(llm: LLM, workspace: Path, ocr_path: Path, max_data_tokens: int) -> None:
+def extract_sequences(
+      llm: LLM,
+      workspace: Path,
+      ocr_path: Path,
+      max_data_tokens: int,
+      max_concurrency: int = 1,
+      durability: Durability = Durability.BATCH,
+      packed_paragraphs: bool = False,
+      ocr_feed: PageFeed | None = None,
+      bisect_after: int | None = None,
+    ) -> None:
+
   context: Context[State] = Context(workspace, lambda: {
     "phase": Phase.EXTRACTION.value,
     "max_data_tokens": max_data_tokens,
     "completed_ranges": [],
-  })
+  }, durability=durability)
   while context.state["phase"] != Phase.COMPLETED:
     if context.state["phase"] == Phase.EXTRACTION:
       extract_ocr(
         llm=llm,
         context=context,
         ocr_path=ocr_path,
+        max_concurrency=max_concurrency,
+        ocr_feed=ocr_feed,
+        bisect_after=bisect_after,
       )
       context.state = {
         **context.state,
@@ -31,6 +45,7 @@ def extract_sequences(llm: LLM, workspace: Path, ocr_path: Path, max_data_tokens
         context=context,
         type=SequenceType.TEXT,
         extraction_path=workspace / Phase.EXTRACTION.value,
+        packed=packed_paragraphs,
       )
       context.state = {
         **context.state,
@@ -42,6 +57,7 @@ def extract_sequences(llm: LLM, workspace: Path, ocr_path: Path, max_data_tokens
         context=context,
         type=SequenceType.FOOTNOTE,
         extraction_path=workspace / Phase.EXTRACTION.value,
+        packed=packed_paragraphs,
       )
       context.state = {
         **context.state,
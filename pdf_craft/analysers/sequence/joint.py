@@ -5,14 +5,14 @@ from enum import auto, Enum
 from xml.etree.ElementTree import fromstring, Element
 
 from ...llm import LLM
-from ...xml import encode
 from ..data import ParagraphType
 from ..utils import xml_files, Context
 from .common import State, SequenceType, Truncation
+from .operation import ParagraphWriter
 
 
-def join(llm: LLM, context: Context[State], type: SequenceType, extraction_path: Path):
-  _Joint(llm, context, type, extraction_path).do()
+def join(llm: LLM, context: Context[State], type: SequenceType, extraction_path: Path, packed: bool = False):
+  _Joint(llm, context, type, extraction_path, packed).do()
 
 @dataclass
 class _SequenceMeta:
@@ -50,11 +50,12 @@ class _Paragraph:
     return element
 
 class _Joint:
-  def __init__(self, llm: LLM, context: Context[State], type: SequenceType, extraction_path: Path):
+  def __init__(self, llm: LLM, context: Context[State], type: SequenceType, extraction_path: Path, packed: bool):
     self._llm: LLM = llm
     self._ctx: Context[State] = context
     self._type: SequenceType = type
     self._extraction_path: Path = extraction_path
+    self._packed: bool = packed
 
   def do(self):
     metas = self._extract_sequence_metas()
@@ -77,24 +78,31 @@ class _Joint:
 
     last_page_index = 0
     next_paragraph_id = 1
-
-    for paragraph in self._join_and_get_sequences(meta_truncation_dict):
-      page_index = paragraph.page_index
-      if last_page_index != page_index:
-        last_page_index = page_index
-        next_paragraph_id = 1
-
-      save_dir_path = self._ctx.path.joinpath("output", self._type.value)
-      save_dir_path.mkdir(parents=True, exist_ok=True)
-
-      paragraph_id = f"{page_index}_{next_paragraph_id}"
-      file_path = save_dir_path / f"paragraph_{paragraph_id}.xml"
-      next_paragraph_id += 1
-
-      self._ctx.atomic_write(
-        file_path=file_path,
-        content=encode(paragraph.to_xml()),
-      )
+    writer: ParagraphWriter | None = None
+
+    try:
+      for paragraph in self._join_and_get_sequences(meta_truncation_dict):
+        page_index = paragraph.page_index
+        if last_page_index != page_index:
+          last_page_index = page_index
+          next_paragraph_id = 1
+
+        if writer is None:
+          # the output directory exists only if there are paragraphs
+          writer = ParagraphWriter(
+            context=self._ctx,
+            dir_path=self._ctx.path.joinpath("output", self._type.value),
+            packed=self._packed,
+          )
+        writer.write_xml(
+          page_index=page_index,
+          order_index=next_paragraph_id,
+          xml=paragraph.to_xml(),
+        )
+        next_paragraph_id += 1
+    finally:
+      if writer is not None:
+        writer.close()
 
   def _extract_sequence_metas(self) -> list[_SequenceMeta]:
     metas: list[_SequenceMeta] = []
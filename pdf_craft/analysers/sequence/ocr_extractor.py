@@ -7,24 +7,47 @@ from xml.etree.ElementTree import Element
 from .common import State, Phase, SequenceType, Truncation
 from .request import SequenceRequest, RawPage
 from ...llm import LLM
-from ...xml import encode
 from ..utils import (
   remove_file,
   read_xml_file,
   xml_files,
   search_xml_children,
+  run_partition_tasks,
+  plan_chunks,
+  bisect_request,
   Context,
+  PageFeed,
   Partition,
+  PartitionTask,
 )
 
 
-def extract_ocr(llm: LLM, context: Context[State], ocr_path: Path) -> None:
-  return _Sequence(llm, context).to_sequences(ocr_path)
+# with ocr_feed, OCR pages are read while they are being generated, and each request is sent
+# as soon as its pages are written.
+def extract_ocr(
+      llm: LLM,
+      context: Context[State],
+      ocr_path: Path,
+      max_concurrency: int = 1,
+      ocr_feed: PageFeed | None = None,
+      bisect_after: int | None = None,
+    ) -> None:
+  return _Sequence(llm, context, max_concurrency, ocr_feed, bisect_after).to_sequences(ocr_path)
 
 class _Sequence:
-  def __init__(self, llm: LLM, context: Context[State]) -> None:
+  def __init__(
+        self,
+        llm: LLM,
+        context: Context[State],
+        max_concurrency: int,
+        ocr_feed: PageFeed | None,
+        bisect_after: int | None,
+      ) -> None:
     self._llm: LLM = llm
     self._ctx: Context[State] = context
+    self._max_concurrency: int = max_concurrency
+    self._ocr_feed: PageFeed | None = ocr_feed
+    self._bisect_after: int | None = bisect_after
 
   def to_sequences(self, ocr_path: Path):
     save_path = self._ctx.path.joinpath(Phase.EXTRACTION.value)
@@ -38,53 +61,72 @@ class _Sequence:
       ),
     )
     with partition:
-      for task in partition.pop_tasks():
-        with task:
-          begin = task.begin[0]
-          end = task.end[0]
-          request = task.payload
-          request_xml = request.inject_ids_and_get_xml()
-          resp_xml = self._request_sequences(request_xml)
-          data_xml = Element("pages")
-          data_xml.set("begin-page-index", str(begin))
-          data_xml.set("end-page-index", str(end))
-
-          for page in self._gen_pages_with_sequences(
-            request=request,
-            raw_page_xmls=request_xml,
-            resp_xml=resp_xml,
-          ):
-            data_xml.append(page)
-
-          data_file_path = save_path / f"pages_{begin}_{end}.xml"
-          with open(data_file_path, mode="w", encoding="utf-8") as file:
-            file.write(encode(data_xml))
+      run_partition_tasks(
+        partition=partition,
+        handle=lambda task: self._handle_task(task, save_path),
+        max_concurrency=self._max_concurrency,
+      )
 
-  def _split_requests(self, ocr_path: Path) -> Generator[SequenceRequest, None, None]:
-    max_data_tokens = self._ctx.state["max_data_tokens"]
+  def _handle_task(self, task: PartitionTask[tuple[int], State, SequenceRequest], save_path: Path) -> None:
+    begin = task.begin[0]
+    end = task.end[0]
+    data_xml = Element("pages")
+    data_xml.set("begin-page-index", str(begin))
+    data_xml.set("end-page-index", str(end))
+    data_xml.extend(bisect_request(
+      items=task.payload.raw_pages,
+      request=lambda raw_pages, retry_times, _: self._extract_pages(raw_pages, retry_times),
+      merge=lambda pages_list: [page for pages in pages_list for page in pages],
+      bisect_after=self._bisect_after,
+    ))
+    data_file_path = save_path / f"pages_{begin}_{end}.xml"
+    self._ctx.write_xml_file(data_file_path, data_xml)
+
+  def _extract_pages(self, raw_pages: list[RawPage], retry_times: int | None) -> list[Element]:
     request = SequenceRequest()
-    request_tokens: int = 0
+    for raw_page in raw_pages:
+      request.append(raw_page.page_index, raw_page)
+    request_xml = request.inject_ids_and_get_xml()
+    resp_xml = self._request_sequences(request_xml, retry_times)
+    return list(self._gen_pages_with_sequences(
+      request=request,
+      raw_page_xmls=request_xml,
+      resp_xml=resp_xml,
+    ))
 
-    for xml_path, _, page_index, _ in xml_files(ocr_path):
+  def _split_requests(self, ocr_path: Path) -> Generator[SequenceRequest, None, None]:
+    chunks = plan_chunks(
+      items=self._read_pages_with_tokens(ocr_path),
+      max_weight=self._ctx.state["max_data_tokens"],
+    )
+    for chunk in chunks:
+      request = SequenceRequest()
+      for page_index, raw_page in chunk:
+        request.append(page_index, raw_page)
+      yield request
+
+  def _read_pages_with_tokens(self, ocr_path: Path) -> Generator[tuple[tuple[int, RawPage], int], None, None]:
+    for xml_path, page_index in self._ocr_xml_paths(ocr_path):
       raw_page = RawPage(
         raw_element=read_xml_file(xml_path),
         page_index=page_index,
       )
       if not raw_page.children: # empty page
         continue
+      yield (page_index, raw_page), raw_page.tokens_count(self._llm)
 
-      tokens = raw_page.tokens_count(self._llm)
-      if request_tokens > 0 and request_tokens + tokens > max_data_tokens:
-        yield request
-        request = SequenceRequest()
-
-      request.append(page_index, raw_page)
-      request_tokens += tokens
+  def _ocr_xml_paths(self, ocr_path: Path) -> Generator[tuple[Path, int], None, None]:
+    last_page_index = 0
+    if self._ocr_feed is not None:
+      for page_index in self._ocr_feed.consecutive_pages():
+        yield ocr_path / f"page_{page_index}.xml", page_index
+        last_page_index = page_index
 
-    if request_tokens > 0:
-      yield request
+    for xml_path, _, page_index, _ in xml_files(ocr_path):
+      if page_index > last_page_index:
+        yield xml_path, page_index
 
-  def _request_sequences(self, request_xml: Element) -> Element:
+  def _request_sequences(self, request_xml: Element, retry_times: int | None) -> Element:
     next_id: int = 1
     for page in request_xml:
       for layout in page:
@@ -95,6 +137,7 @@ class _Sequence:
     return self._llm.request_xml(
       template_name="sequence",
       user_data=request_xml,
+      retry_times=retry_times,
     )
 
   def _gen_pages_with_sequences(
@@ -1,8 +1,9 @@
+from __future__ import annotations
 from pathlib import Path
 from typing import Generator
 from xml.etree.ElementTree import Element
 
-from ..utils import read_xml_file, xml_files, Context
+from ..utils import indexed_xmls, remove_packed, Context, PackedXMLWriter, PACKED_FILE
 from ..data import (
   Paragraph,
   ParagraphType,
@@ -12,14 +13,20 @@ from ..data import (
   Line,
   Layout,
   LayoutKind,
+  decode_hash,
 )
+from .cache import paragraphs_cache
 
 
-def read_paragraphs(dir_path: Path, name: str = "paragraph") -> Generator[Paragraph, None, None]:
-  for file_path, _name, page_index, order_index in xml_files(dir_path):
-    if name == _name:
-      element = read_xml_file(file_path)
-      yield decode_paragraph(element, page_index, order_index)
+def read_paragraphs(
+      dir_path: Path,
+      name: str = "paragraph",
+      begin: tuple[int, int] | None = None,
+      end: tuple[int, int] | None = None,
+    ) -> Generator[Paragraph, None, None]:
+
+  for xml in indexed_xmls(dir_path, name, begin, end):
+    yield paragraphs_cache.read(xml, decode_paragraph)
 
 def decode_paragraph(element: Element, page_index: int, order_index: int):
   return Paragraph(
@@ -56,7 +63,7 @@ def decode_layout(element: Element) -> Layout:
 
     return FormulaLayout(
       kind=kind,
-      hash=bytes.fromhex(hash_hex),
+      hash=decode_hash(hash_hex),
       page_index=int(page_index),
       order_index=int(order_index),
       caption=Caption(lines=caption_lines),
@@ -67,7 +74,7 @@ def decode_layout(element: Element) -> Layout:
     hash_hex = element.get("hash", "")
     return AssetLayout(
       kind=kind,
-      hash=bytes.fromhex(hash_hex),
+      hash=decode_hash(hash_hex),
       page_index=int(page_index),
       order_index=int(order_index),
       caption=Caption(lines=caption_lines),
@@ -85,23 +92,64 @@ def decode_layout(element: Element) -> Layout:
 def _decode_line(element: Element) -> Line:
   return Line(
     text=(element.text or "").strip(),
-    confidence=element.get("confidence"),
+    confidence=_decode_confidence(element.get("confidence", None)),
   )
 
+def _decode_confidence(confidence: str | None) -> float | None:
+  if confidence is None:
+    return None
+  try:
+    return float(confidence)
+  except ValueError:
+    return None # written as "None" by previous versions
+
+# write paragraphs as XML files, or pack them into one file of the directory if `packed` is True
 class ParagraphWriter:
-  def __init__(self, context: Context, dir_path: Path, name: str = "paragraph"):
+  def __init__(self, context: Context, dir_path: Path, name: str = "paragraph", packed: bool = False):
     self._name: str = name
     self._context: Context = context
     self._dir_path: Path = dir_path
+    self._packed_writer: PackedXMLWriter | None = None
 
     if not self._dir_path.exists():
       self._dir_path.mkdir(parents=True)
     if not self._dir_path.is_dir():
       raise ValueError(f"Path {self._dir_path} is not a directory")
 
+    if packed:
+      self._packed_writer = PackedXMLWriter(
+        file_path=self._dir_path / PACKED_FILE,
+        durability=context.durability,
+      )
+    else:
+      # readers prefer the packed file, which may be left by a previous run
+      remove_packed(self._dir_path)
+
+  def __enter__(self) -> ParagraphWriter:
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+    return False
+
   def write(self, paragraph: Paragraph) -> None:
-    file_name = f"{self._name}_{paragraph.page_index}_{paragraph.order_index}.xml"
-    self._context.write_xml_file(
-      file_path=self._dir_path / file_name,
+    self.write_xml(
+      page_index=paragraph.page_index,
+      order_index=paragraph.order_index,
       xml=paragraph.to_xml(),
-    )
\ No newline at end of file
+    )
+
+  def write_xml(self, page_index: int, order_index: int, xml: Element) -> None:
+    if self._packed_writer is not None:
+      self._packed_writer.write(self._name, page_index, order_index, xml)
+    else:
+      file_name = f"{self._name}_{page_index}_{order_index}.xml"
+      self._context.write_xml_file(
+        file_path=self._dir_path / file_name,
+        xml=xml,
+      )
+
+  def close(self) -> None:
+    if self._packed_writer is not None:
+      self._packed_writer.close()
+      self._packed_writer = None
\ No newline at end of file
@@ -104,11 +104,10 @@ class RawPage:
       yield asset, captions
 
   def tokens_count(self, llm: LLM) -> int:
-    tokens_count: int = 0
-    for element in self.children:
-      text = encode_friendly(element)
-      tokens_count += len(llm.encode_tokens(text))
-    return tokens_count
+    return sum(llm.count_tokens_many(
+      encode_friendly(element)
+      for element in self.children
+    ))
 
   def inject_assets(self, line_ids: list[int]) -> Generator[tuple[int, Element | None], None, None]:
     if len(line_ids) <= 1:
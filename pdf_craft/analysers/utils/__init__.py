@@ -1,3 +1,9 @@
 from .others import *
 from .partition import *
-from .context import *
\ No newline at end of file
+from .context import *
+from .scheduler import *
+from .packed import *
+from .tokens import *
+from .planner import *
+from .feed import *
+from .bisection import *
\ No newline at end of file
@@ -0,0 +1,41 @@
+from typing import Callable, Sequence, TypeVar
+
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# requests items (of a chunk) as a whole. once its response fails to parse bisect_after times (raising ValueError),
+# the items are split into halves, which are requested (and bisected) independently, and their results are merged.
+# an item alone can't be split, so that it's retried as many times as configured.
+# request receives the items, the retry times of the request, and the path of halves to the items
+# (such as (0, 1) for the second half of the first half). the path is () for the whole chunk.
+def bisect_request(
+      items: Sequence[_T],
+      request: Callable[[Sequence[_T], int | None, tuple[int, ...]], _R],
+      merge: Callable[[list[_R]], _R],
+      bisect_after: int | None,
+    ) -> _R:
+  return _Bisection(request, merge, bisect_after).do(items, ())
+
+class _Bisection:
+  def __init__(
+        self,
+        request: Callable[[Sequence[_T], int | None, tuple[int, ...]], _R],
+        merge: Callable[[list[_R]], _R],
+        bisect_after: int | None,
+      ) -> None:
+    self._request: Callable[[Sequence[_T], int | None, tuple[int, ...]], _R] = request
+    self._merge: Callable[[list[_R]], _R] = merge
+    self._bisect_after: int | None = bisect_after
+
+  def do(self, items: Sequence[_T], halves: tuple[int, ...]) -> _R:
+    if self._bisect_after is None or len(items) <= 1:
+      return self._request(items, None, halves)
+    try:
+      return self._request(items, max(0, self._bisect_after - 1), halves)
+    except ValueError:
+      middle = len(items) // 2
+      return self._merge([
+        self.do(items[:middle], (*halves, 0)),
+        self.do(items[middle:], (*halves, 1)),
+      ])
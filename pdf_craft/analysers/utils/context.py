@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import re
 import os
+import json
 import shutil
 
+from enum import Enum
 from pathlib import Path
+from threading import RLock, get_ident
 from datetime import datetime, timezone
 from typing import cast, Any, TypeVar, Generic, TypedDict, Callable
 from yaml import safe_load, safe_dump
@@ -16,19 +19,51 @@ CURRENT_STATE_VERSION = "1.0.0"
 S = TypeVar("S")
 
 _STATE_FILE = "state.yaml"
+_JOURNAL_FILE = "state.journal"
+
+# the journal is merged into state.yaml after this number of records
+_COMPACT_RECORDS = 512
+
+# temporary files of `_write_file()`, named by the process and thread writing them
+_TEMP_FILE_PATTERN = re.compile(r"^\..+\.(\d+)\.\d+\.tmp$")
+
+class Durability(Enum):
+  EACH = "each" # fsync every written file
+  BATCH = "batch" # fsync written files together before the state is saved
+  NONE = "none" # leave it to the OS. files are still replaced atomically
 
 class _StateRoot(TypedDict):
   version: str
   created_at: str
   updated_at: str
   payload: Any
+  journal_seq: int # records of the journal up to this seq are included in payload
 
+class _JournalRecord(TypedDict):
+  seq: int
+  key: str
+  value: Any
 
+
+# state is saved as a snapshot (state.yaml) plus a journal of appended list items (state.journal),
+# so that recording progress item by item doesn't rewrite the whole state each time.
 class Context(Generic[S]):
-  def __init__(self, path: Path, init: Callable[[], S]) -> None:
+  def __init__(
+        self,
+        path: Path,
+        init: Callable[[], S],
+        durability: Durability = Durability.BATCH,
+      ) -> None:
+
     self._state: S
     self._path: Path = path
     self._created_at: str
+    self._durability: Durability = durability
+    self._unsynced_paths: set[Path] = set()
+    self._lock: RLock = RLock()
+    self._journal_seq: int = 0
+    self._journal_records: int = 0
+    self._has_snapshot: bool = False
 
     state: S | None = None
     created_at: str | None = None
@@ -39,6 +74,8 @@ class Context(Generic[S]):
         state, created_at = self._load_state(state_path)
       if state is None:
         shutil.rmtree(path)
+      else:
+        self._remove_temp_files()
 
     if state is None:
       path.mkdir(parents=True)
@@ -48,41 +85,116 @@ class Context(Generic[S]):
     self._state = state
     self._created_at = created_at
 
+    if path.joinpath(_JOURNAL_FILE).exists():
+      # merge the replayed journal, whose last record may be cut off by a crash
+      self._write_snapshot()
+
   def _load_state(self, state_path: Path) -> tuple[S, str] | tuple[None, None]:
     with state_path.open("r", encoding="utf-8") as file:
       root = cast(_StateRoot, safe_load(file))
       version = root["version"]
       if version != CURRENT_STATE_VERSION:
         return None, None
-      return cast(S, root["payload"]), root["created_at"]
+      state = cast(S, root["payload"])
+      self._journal_seq = root.get("journal_seq", 0)
+      self._has_snapshot = True
+
+    journal_path = self._path.joinpath(_JOURNAL_FILE)
+    if journal_path.exists():
+      for record in self._read_journal(journal_path):
+        if record["seq"] <= self._journal_seq:
+          continue # already included by the snapshot
+        state[record["key"]].append(record["value"])
+        self._journal_seq = record["seq"]
+        self._journal_records += 1
+
+    return state, root["created_at"]
+
+  # a crash between writing a temporary file and renaming it leaves the file behind
+  def _remove_temp_files(self) -> None:
+    pid = os.getpid()
+    for dir_path, _, file_names in os.walk(self._path):
+      for file_name in file_names:
+        matches = _TEMP_FILE_PATTERN.match(file_name)
+        # files of this process may be being written by other contexts
+        if matches and int(matches.group(1)) != pid:
+          Path(dir_path, file_name).unlink(missing_ok=True)
+
+  def _read_journal(self, journal_path: Path):
+    with journal_path.open("r", encoding="utf-8") as file:
+      for line in file:
+        try:
+          record = cast(_JournalRecord, json.loads(line))
+        except json.JSONDecodeError:
+          break # the last record may be cut off by a crash
+        yield record
 
   @property
   def path(self) -> Path:
     return self._path
 
+  @property
+  def durability(self) -> Durability:
+    return self._durability
+
   @property
   def state(self) -> S:
     return self._state
 
   @state.setter
   def state(self, state: S) -> None:
-    self._state = state
+    with self._lock:
+      self._state = state
+      self._write_snapshot()
+
+  # append an item to the list `state[key]` by one journal record instead of rewriting the whole state
+  def append_state(self, key: str, value: Any) -> None:
+    with self._lock:
+      self._state[key].append(value)
+      if not self._has_snapshot:
+        # the journal can't be replayed without a snapshot
+        self._write_snapshot()
+        return
+      self._journal_seq += 1
+      self._journal_records += 1
+      record: _JournalRecord = {
+        "seq": self._journal_seq,
+        "key": key,
+        "value": value,
+      }
+      # files of the recorded progress must be on disk before the record
+      self._sync_written_files()
+      with open(self._path.joinpath(_JOURNAL_FILE), "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False))
+        file.write("\n")
+        file.flush()
+        if self._durability != Durability.NONE:
+          os.fsync(file.fileno())
+      if self._journal_records >= _COMPACT_RECORDS:
+        self._write_snapshot()
+
+  def _write_snapshot(self) -> None:
     file_path = self._path.joinpath(_STATE_FILE)
-    self.atomic_write(
+    self._sync_written_files()
+    self._write_file(
       file_path=file_path,
+      sync=self._durability != Durability.NONE,
       content=safe_dump({
         "version": CURRENT_STATE_VERSION,
         "created_at": self._created_at,
         "updated_at": self._current_utc(),
         "payload": self._state,
+        "journal_seq": self._journal_seq,
       }),
     )
+    self._has_snapshot = True
+    # records of the journal have been included by the snapshot (see `journal_seq`)
+    self._path.joinpath(_JOURNAL_FILE).unlink(missing_ok=True)
+    self._journal_records = 0
 
   def write_xml_file(self, file_path: Path, xml: Element) -> None:
     file_content = encode(xml)
-    base_path = file_path.parent
-    if not base_path.exists():
-      base_path.mkdir(parents=True)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
     self.atomic_write(file_path, file_content)
 
   def _current_utc(self) -> str:
@@ -105,12 +217,60 @@ class Context(Generic[S]):
 
     return file_prefix, int(index1), int(index2)
 
+  # the file is written to a temporary file then renamed, so that it is either complete or untouched
   def atomic_write(self, file_path: Path, content: str):
+    file_path = Path(file_path)
+    self._write_file(
+      file_path=file_path,
+      content=content,
+      sync=self._durability == Durability.EACH,
+    )
+    if self._durability == Durability.BATCH:
+      with self._lock:
+        self._unsynced_paths.add(file_path)
+
+  def _write_file(self, file_path: Path, content: str, sync: bool) -> None:
+    temp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.{get_ident()}.tmp")
     try:
-      with open(file_path, "w", encoding="utf-8") as file:
+      with open(temp_path, "w", encoding="utf-8") as file:
         file.write(content)
         file.flush()
-    except Exception as e:
-      if os.path.exists(file_path):
-        os.unlink(file_path)
+        if sync:
+          os.fsync(file.fileno())
+      os.replace(temp_path, file_path)
+    except BaseException as e:
+      if os.path.exists(temp_path):
+        os.unlink(temp_path)
       raise e
+    if sync:
+      _fsync_dir(file_path.parent)
+
+  def _sync_written_files(self) -> None:
+    with self._lock:
+      paths = self._unsynced_paths
+      self._unsynced_paths = set()
+
+    dir_paths: set[Path] = set()
+    for path in paths:
+      try:
+        fd = os.open(path, os.O_RDONLY)
+      except FileNotFoundError:
+        continue # removed after written
+      try:
+        os.fsync(fd)
+      finally:
+        os.close(fd)
+      dir_paths.add(path.parent)
+
+    for dir_path in dir_paths:
+      _fsync_dir(dir_path)
+
+# a rename is durable only after its directory is synced. (Windows can't open directories)
+def _fsync_dir(dir_path: Path) -> None:
+  if not hasattr(os, "O_DIRECTORY"):
+    return
+  fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
@@ -0,0 +1,48 @@
+from threading import Condition
+from typing import Generator
+
+
+# announces OCR page files (page_N.xml, N begins with 1) written by one thread, to another thread
+# reading them at the same time. pages may be written out of order (by processes), but they are
+# read in order, so that only consecutive pages from the first one are yielded before it's finished.
+# once the reader fails, it closes the feed, and the writer raises at the next page to stop early.
+class PageFeed:
+  def __init__(self) -> None:
+    self._condition: Condition = Condition()
+    self._page_indexes: set[int] = set()
+    self._finished: bool = False
+    self._error: BaseException | None = None
+    self._reader_error: BaseException | None = None
+
+  def put(self, page_index: int) -> None:
+    with self._condition:
+      if self._reader_error is not None:
+        raise RuntimeError("Pages are no longer read") from self._reader_error
+      self._page_indexes.add(page_index)
+      self._condition.notify_all()
+
+  def close(self, error: BaseException) -> None:
+    with self._condition:
+      self._reader_error = error
+      self._condition.notify_all()
+
+  # once finished without error, all page files are written, and the rest can be listed from the disk
+  def finish(self, error: BaseException | None = None) -> None:
+    with self._condition:
+      self._finished = True
+      self._error = error
+      self._condition.notify_all()
+
+  def consecutive_pages(self) -> Generator[int, None, None]:
+    page_index = 1
+    while True:
+      with self._condition:
+        self._condition.wait_for(
+          lambda: page_index in self._page_indexes or self._finished,
+        )
+        if page_index not in self._page_indexes:
+          if self._error is not None:
+            raise RuntimeError("OCR stopped before its pages were written") from self._error
+          return
+      yield page_index
+      page_index += 1
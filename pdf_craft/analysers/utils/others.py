@@ -18,15 +18,15 @@ def read_xml_file(file_path: Path) -> Element:
 
 def xml_files(dir_path: Path) -> list[XML_Info]:
   xml_infos: list[XML_Info] = []
-  for file in dir_path.iterdir():
-    file_path = dir_path / file
-    if not file_path.is_file():
-      continue
-    file_prefix, index1, index2 = _split_index_suffix(file.name)
-    if file_prefix is None:
-      continue
-
-    xml_infos.append((file_path, file_prefix, index1, index2))
+  # scandir knows file types without a stat() for each entry
+  with os.scandir(dir_path) as entries:
+    for entry in entries:
+      file_prefix, index1, index2 = _split_index_suffix(entry.name)
+      if file_prefix is None:
+        continue
+      if not entry.is_file():
+        continue
+      xml_infos.append((dir_path / entry.name, file_prefix, index1, index2))
 
   xml_infos.sort(key=lambda x: (x[2], x[3]))
   return xml_infos
@@ -36,19 +36,15 @@ def search_xml_children(parent: Element) -> Generator[tuple[Element, Element], N
     yield child, parent
     yield from search_xml_children(child)
 
+_INDEX_SUFFIX_PATTERN = re.compile(r"^([a-zA-Z]+)_(\d+)(?:_(\d+))?\.xml$")
+
 def _split_index_suffix(file_name: str) -> tuple[str | None, int, int]:
-  matches = re.match(r"^[a-zA-Z]+_\d+(_\d+)?\.xml$", file_name)
+  matches = _INDEX_SUFFIX_PATTERN.match(file_name)
   if not matches:
     return None, -1, -1
 
-  file_prefix: str
-  index1: str
-  index2: str
-  cells = re.sub(r"\..*$", "", file_name).split("_")
-  if len(cells) == 3:
-    file_prefix, index1, index2 = cells
-  else:
-    file_prefix, index1 = cells
+  file_prefix, index1, index2 = matches.groups()
+  if index2 is None:
     index2 = index1
 
   return file_prefix, int(index1), int(index2)
\ No newline at end of file
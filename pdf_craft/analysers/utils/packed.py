@@ -0,0 +1,143 @@
+import sqlite3
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Generator, Hashable
+from xml.etree.ElementTree import fromstring, Element
+
+from ...xml import encode
+from .context import Durability
+from .others import xml_files, read_xml_file
+
+
+# XML files named like `{name}_{index1}_{index2}.xml` can be packed into this SQLite file of the directory,
+# instead of one file for each. readers look for it first, so that they don't care how the XMLs were written.
+PACKED_FILE = "packed.sqlite3"
+
+_COMMIT_BATCH_SIZE = 256
+
+@dataclass
+class IndexedXML:
+  index1: int
+  index2: int
+  key: Hashable # changes whenever the XML changes
+  size: int
+  load: Callable[[], Element]
+
+def is_packed(dir_path: Path) -> bool:
+  return dir_path.joinpath(PACKED_FILE).exists()
+
+def remove_packed(dir_path: Path) -> None:
+  for suffix in ("", "-wal", "-shm", "-journal"):
+    dir_path.joinpath(PACKED_FILE + suffix).unlink(missing_ok=True)
+
+# yield (element, index1, index2) sorted by indexes, within [begin, end] if they are given
+def read_indexed_xmls(
+      dir_path: Path,
+      name: str,
+      begin: tuple[int, int] | None = None,
+      end: tuple[int, int] | None = None,
+    ) -> Generator[tuple[Element, int, int], None, None]:
+
+  for xml in indexed_xmls(dir_path, name, begin, end):
+    yield xml.load(), xml.index1, xml.index2
+
+# the same as `read_indexed_xmls()`, but XMLs are parsed only if `load()` is called
+def indexed_xmls(
+      dir_path: Path,
+      name: str,
+      begin: tuple[int, int] | None = None,
+      end: tuple[int, int] | None = None,
+    ) -> Generator[IndexedXML, None, None]:
+
+  if is_packed(dir_path):
+    yield from _packed_xmls(dir_path / PACKED_FILE, name, begin, end)
+    return
+
+  for file_path, file_name, index1, index2 in xml_files(dir_path):
+    if file_name != name:
+      continue
+    if begin is not None and (index1, index2) < begin:
+      continue
+    if end is not None and (index1, index2) > end:
+      break
+    stat = file_path.stat()
+    yield IndexedXML(
+      index1=index1,
+      index2=index2,
+      key=(str(file_path), stat.st_mtime_ns, stat.st_size),
+      size=stat.st_size,
+      load=lambda p=file_path: read_xml_file(p),
+    )
+
+def _packed_xmls(
+      file_path: Path,
+      name: str,
+      begin: tuple[int, int] | None,
+      end: tuple[int, int] | None,
+    ) -> Generator[IndexedXML, None, None]:
+
+  sql = "SELECT index1, index2, xml FROM xmls WHERE name = ?"
+  params: list = [name]
+  if begin is not None:
+    sql += " AND (index1, index2) >= (?, ?)"
+    params.extend(begin)
+  if end is not None:
+    sql += " AND (index1, index2) <= (?, ?)"
+    params.extend(end)
+  sql += " ORDER BY index1, index2"
+
+  # committed XMLs may stay in the WAL file until a checkpoint
+  version: list[tuple[int, int]] = []
+  for suffix in ("", "-wal"):
+    path = file_path.with_name(file_path.name + suffix)
+    if path.exists():
+      stat = path.stat()
+      version.append((stat.st_mtime_ns, stat.st_size))
+
+  conn = sqlite3.connect(file_path)
+  try:
+    for index1, index2, xml in conn.execute(sql, params):
+      yield IndexedXML(
+        index1=index1,
+        index2=index2,
+        key=(str(file_path), tuple(version), name, index1, index2),
+        size=len(xml),
+        load=lambda x=xml: fromstring(x),
+      )
+  finally:
+    conn.close()
+
+# not thread safe
+class PackedXMLWriter:
+  def __init__(self, file_path: Path, durability: Durability) -> None:
+    self._durability: Durability = durability
+    self._uncommitted: int = 0
+    self._conn: sqlite3.Connection = sqlite3.connect(file_path)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    if durability == Durability.NONE:
+      self._conn.execute("PRAGMA synchronous=OFF")
+    else:
+      self._conn.execute("PRAGMA synchronous=FULL")
+    self._conn.execute(
+      "CREATE TABLE IF NOT EXISTS xmls ("
+      "name TEXT NOT NULL, index1 INTEGER NOT NULL, index2 INTEGER NOT NULL, xml TEXT NOT NULL, "
+      "PRIMARY KEY (name, index1, index2)"
+      ") WITHOUT ROWID"
+    )
+    self._conn.commit()
+
+  def write(self, name: str, index1: int, index2: int, element: Element) -> None:
+    self._conn.execute(
+      "INSERT OR REPLACE INTO xmls (name, index1, index2, xml) VALUES (?, ?, ?, ?)",
+      (name, index1, index2, encode(element)),
+    )
+    self._uncommitted += 1
+    # one commit (and fsync) for a batch of XMLs, unless each must be durable
+    if self._durability == Durability.EACH or self._uncommitted >= _COMMIT_BATCH_SIZE:
+      self._conn.commit()
+      self._uncommitted = 0
+
+  def close(self) -> None:
+    self._conn.commit()
+    self._conn.close()
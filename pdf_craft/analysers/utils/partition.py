@@ -30,6 +30,7 @@ class Partition(Generic[T, S, P]):
     self._last_index: T | None = None
     self._done_ranges: list[tuple[T, T]] = []
     self._to_remove_ranges: list[tuple[T, T]] = []
+    self._journaled: bool = False
 
     for item in context.state.get(_STATE_KEY, ()):
       half_len = len(item) // 2
@@ -60,6 +61,9 @@ class Partition(Generic[T, S, P]):
         if last_index >= 0:
           self._done_ranges = self._done_ranges[:last_index]
           self._sync_done_ranges()
+      if self._journaled:
+        # leave sorted ranges in the snapshot
+        self._sync_done_ranges()
 
       for begin, end in self._to_remove_ranges:
         self._remove(begin, end)
@@ -116,10 +120,12 @@ class Partition(Generic[T, S, P]):
   def _on_task_done(self, done_begin: T, done_end: T) -> None:
     with self._range_lock:
       found_matched = False
+      overlapped = False
       new_done_ranges: list[tuple[T, T]] = []
       for begin, end in self._done_ranges:
         if done_begin <= end and done_end >= begin:
           self._to_remove_ranges.append((begin, end))
+          overlapped = True
         else:
           if done_begin == begin and done_end == end:
             found_matched = True
@@ -130,7 +136,13 @@ class Partition(Generic[T, S, P]):
 
       new_done_ranges.sort(key=lambda x: x[0])
       self._done_ranges = new_done_ranges
-      self._sync_done_ranges()
+
+      if not overlapped and not found_matched and _STATE_KEY in self._context.state:
+        # only a new range: append it to the journal instead of rewriting all ranges
+        self._context.append_state(_STATE_KEY, [*done_begin, *done_end])
+        self._journaled = True
+      else:
+        self._sync_done_ranges()
 
   def _sync_done_ranges(self) -> None:
     ranges: list[list[int]] = []
@@ -141,6 +153,7 @@ class Partition(Generic[T, S, P]):
       **self._context.state,
       _STATE_KEY: ranges,
     }
+    self._journaled = False
 
 class PartitionTask(Generic[T, S, P]):
   def __init__(self, begin: T, end: T, payload: P, done: Callable[[], None]) -> None:
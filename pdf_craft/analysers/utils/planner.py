@@ -0,0 +1,76 @@
+from typing import Any, Callable, Generator, Iterable, TypeVar
+
+
+_T = TypeVar("_T")
+
+# chunks planned together. the more, the more items are waited for (such as OCR pages being generated)
+# before yielding. it changes how chunks are balanced, but never how many they are.
+_LOOKAHEAD_CHUNKS = 4
+
+# splits items (with their weights) in order into the fewest chunks not heavier than max_weight
+# (an item heavier than it takes a chunk alone), then balances them: the heaviest chunk is made
+# as light as possible without more chunks. unlike filling chunks greedily, it leaves no ragged last chunk.
+# items of different groups are never in the same chunk.
+def plan_chunks(
+      items: Iterable[tuple[_T, int]],
+      max_weight: int,
+      group: Callable[[_T], Any] | None = None,
+    ) -> Generator[list[_T], None, None]:
+
+  buffer: list[tuple[_T, int]] = []
+  buffer_weight: int = 0
+  last_group: Any = None
+
+  for item, weight in items:
+    if group is not None:
+      item_group = group(item)
+      if buffer and item_group != last_group:
+        for chunk in _balance(buffer, max_weight):
+          yield [item for item, _ in chunk]
+        buffer = []
+        buffer_weight = 0
+      last_group = item_group
+
+    buffer.append((item, weight))
+    buffer_weight += weight
+
+    if buffer_weight >= max_weight * _LOOKAHEAD_CHUNKS:
+      # filling greedily ends a chunk as late as possible, so that items to come need no more chunks
+      # after these greedy chunks but the last. they are balanced among themselves, and the last waits
+      # to be balanced with items to come.
+      chunks = _split_greedily(buffer, max_weight)
+      for chunk in _balance([pair for chunk in chunks[:-1] for pair in chunk], max_weight):
+        yield [item for item, _ in chunk]
+      buffer = chunks[-1]
+      buffer_weight = sum(weight for _, weight in buffer)
+
+  if buffer:
+    for chunk in _balance(buffer, max_weight):
+      yield [item for item, _ in chunk]
+
+def _balance(items: list[tuple[_T, int]], max_weight: int) -> list[list[tuple[_T, int]]]:
+  # filling greedily gets the fewest chunks. then search the least max weight getting no more chunks
+  chunks_count = len(_split_greedily(items, max_weight))
+  low, high = 1, max(1, max_weight)
+  while low < high:
+    middle = (low + high) // 2
+    if len(_split_greedily(items, middle)) <= chunks_count:
+      high = middle
+    else:
+      low = middle + 1
+  return _split_greedily(items, low)
+
+def _split_greedily(items: list[tuple[_T, int]], max_weight: int) -> list[list[tuple[_T, int]]]:
+  chunks: list[list[tuple[_T, int]]] = []
+  chunk: list[tuple[_T, int]] = []
+  chunk_weight: int = 0
+  for item, weight in items:
+    if chunk and chunk_weight + weight > max_weight:
+      chunks.append(chunk)
+      chunk = []
+      chunk_weight = 0
+    chunk.append((item, weight))
+    chunk_weight += weight
+  if chunk:
+    chunks.append(chunk)
+  return chunks
@@ -0,0 +1,75 @@
+from threading import Event, Lock
+from concurrent.futures import wait, ThreadPoolExecutor
+from typing import Any, TypeVar, Callable
+from .partition import Partition, PartitionTask
+
+
+T = TypeVar("T", bound=tuple[int, ...])
+S = TypeVar("S", bound=dict[str, Any])
+P = TypeVar("P")
+
+# tasks are pulled from the partition by `max_concurrency` workers. each task is marked done
+# by its own worker once handled, so the partition records completed ranges out of order.
+def run_partition_tasks(
+      partition: Partition[T, S, P],
+      handle: Callable[[PartitionTask[T, S, P]], None],
+      max_concurrency: int = 1,
+    ) -> None:
+
+  if max_concurrency <= 1:
+    for task in partition.pop_tasks():
+      with task:
+        handle(task)
+  else:
+    _Scheduler(partition, handle, max_concurrency).do()
+
+class _Scheduler:
+  def __init__(
+        self,
+        partition: Partition[T, S, P],
+        handle: Callable[[PartitionTask[T, S, P]], None],
+        max_concurrency: int,
+      ) -> None:
+
+    self._partition: Partition[T, S, P] = partition
+    self._handle: Callable[[PartitionTask[T, S, P]], None] = handle
+    self._max_concurrency: int = max_concurrency
+    self._stopped: Event = Event()
+    self._error_lock: Lock = Lock()
+    self._error: BaseException | None = None
+
+  def do(self) -> None:
+    with ThreadPoolExecutor(
+      max_workers=self._max_concurrency,
+      thread_name_prefix="partition-worker",
+    ) as executor:
+      futures = [
+        executor.submit(self._work)
+        for _ in range(self._max_concurrency)
+      ]
+      try:
+        wait(futures)
+      except BaseException as err:
+        # workers must finish their in-flight tasks before the partition exits,
+        # otherwise the completed ranges they report would be lost.
+        self._stopped.set()
+        wait(futures)
+        raise err
+
+    if self._error is not None:
+      raise self._error
+
+  def _work(self) -> None:
+    while not self._stopped.is_set():
+      task = self._partition.pop_task()
+      if task is None:
+        break
+      try:
+        with task:
+          self._handle(task)
+      except BaseException as err:
+        with self._error_lock:
+          if self._error is None:
+            self._error = err
+        self._stopped.set()
+        break
@@ -0,0 +1,22 @@
+from typing import Callable, Generator, Iterable, TypeVar
+from ...llm import LLM
+
+
+_T = TypeVar("_T")
+_BATCH_SIZE = 64
+
+# count_tokens_many() encodes texts of a batch in parallel, so that items are read ahead a batch at a time
+def count_tokens_in_batches(
+      llm: LLM,
+      items: Iterable[_T],
+      to_text: Callable[[_T], str],
+    ) -> Generator[tuple[_T, int], None, None]:
+
+  batch: list[_T] = []
+  for item in items:
+    batch.append(item)
+    if len(batch) >= _BATCH_SIZE:
+      yield from zip(batch, llm.count_tokens_many(to_text(i) for i in batch))
+      batch = []
+  if batch:
+    yield from zip(batch, llm.count_tokens_many(to_text(i) for i in batch))
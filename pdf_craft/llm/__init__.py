@@ -1 +1,2 @@
-from .node import LLM
\ No newline at end of file
+from .node import LLM
+from .cache import LLMCacheStats
@@ -0,0 +1,110 @@
+import os
+import json
+
+from os import PathLike
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Any
+
+
+@dataclass
+class LLMCacheStats:
+  hits: int
+  misses: int
+  entries: int
+  bytes: int
+
+# 以请求内容的哈希为键，将成功解析的回复保存到磁盘。文件的 mtime 记录最近一次使用的时间，
+# 重新打开缓存时据此恢复 LRU 顺序。
+class LLMCache:
+  def __init__(self, dir_path: PathLike, max_bytes: int | None = None) -> None:
+    self._dir_path: Path = Path(dir_path)
+    self._max_bytes: int | None = max_bytes
+    self._lock: Lock = Lock()
+    self._entries: OrderedDict[str, int] = OrderedDict()
+    self._total_bytes: int = 0
+    self._hits: int = 0
+    self._misses: int = 0
+    self._dir_path.mkdir(parents=True, exist_ok=True)
+    self._load_entries()
+
+  @property
+  def stats(self) -> LLMCacheStats:
+    with self._lock:
+      return LLMCacheStats(
+        hits=self._hits,
+        misses=self._misses,
+        entries=len(self._entries),
+        bytes=self._total_bytes,
+      )
+
+  def key(self, **fields: Any) -> str:
+    content = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return sha256(content.encode("utf-8")).hexdigest()
+
+  def get(self, key: str) -> str | None:
+    with self._lock:
+      if key not in self._entries:
+        self._misses += 1
+        return None
+      file_path = self._file_path(key)
+      try:
+        response = file_path.read_text(encoding="utf-8")
+        os.utime(file_path)
+      except FileNotFoundError:
+        self._total_bytes -= self._entries.pop(key)
+        self._misses += 1
+        return None
+
+      self._entries.move_to_end(key)
+      self._hits += 1
+      return response
+
+  def put(self, key: str, response: str) -> None:
+    data = response.encode("utf-8")
+    file_path = self._file_path(key)
+    temp_path = file_path.with_suffix(".tmp")
+    with self._lock:
+      file_path.parent.mkdir(exist_ok=True)
+      with open(temp_path, "wb") as file:
+        file.write(data)
+      os.replace(temp_path, file_path)
+
+      if key in self._entries:
+        self._total_bytes -= self._entries.pop(key)
+      self._entries[key] = len(data)
+      self._total_bytes += len(data)
+      self._evict()
+
+  def remove(self, key: str) -> None:
+    with self._lock:
+      size = self._entries.pop(key, None)
+      if size is not None:
+        self._total_bytes -= size
+        self._file_path(key).unlink(missing_ok=True)
+
+  def _load_entries(self) -> None:
+    files: list[tuple[float, str, int]] = []
+    for file_path in self._dir_path.glob("*/*.txt"):
+      stat = file_path.stat()
+      files.append((stat.st_mtime, file_path.stem, stat.st_size))
+
+    files.sort()
+    for _, key, size in files:
+      self._entries[key] = size
+      self._total_bytes += size
+    self._evict()
+
+  def _evict(self) -> None:
+    if self._max_bytes is None:
+      return
+    while self._total_bytes > self._max_bytes and len(self._entries) > 0:
+      key, size = self._entries.popitem(last=False)
+      self._total_bytes -= size
+      self._file_path(key).unlink(missing_ok=True)
+
+  def _file_path(self, key: str) -> Path:
+    return self._dir_path / key[:2] / f"{key}.txt"
@@ -2,8 +2,13 @@ import openai
 import httpx
 import requests
 
+from time import time
+from email.utils import parsedate_to_datetime
+
 
 def is_retry_error(err: Exception) -> bool:
+  if is_rate_limit_error(err):
+    return True
   if _is_openai_retry_error(err):
     return True
   if _is_httpx_retry_error(err):
@@ -46,4 +51,40 @@ def _is_request_retry_error(err: Exception) -> bool:
     return True
   if isinstance(err, requests.Timeout):
     return True
-  return False
\ No newline at end of file
+  return False
+
+# 429 means the client is sending faster than the provider allows, and is worth retrying after a while.
+# an exhausted quota responds 429 too, but waiting will not help.
+def is_rate_limit_error(err: BaseException) -> bool:
+  if isinstance(err, openai.RateLimitError):
+    return err.code != "insufficient_quota"
+  if isinstance(err, httpx.HTTPStatusError):
+    return err.response.status_code == 429
+  return False
+
+def retry_after_seconds(err: BaseException) -> float | None:
+  response: httpx.Response | None = None
+  if isinstance(err, (openai.APIStatusError, httpx.HTTPStatusError)):
+    response = err.response
+  if response is None:
+    return None
+
+  retry_after_ms = response.headers.get("retry-after-ms", None)
+  if retry_after_ms is not None:
+    try:
+      return max(0.0, float(retry_after_ms) / 1000.0)
+    except ValueError:
+      pass
+
+  retry_after = response.headers.get("retry-after", None)
+  if retry_after is None:
+    return None
+  try:
+    return max(0.0, float(retry_after))
+  except ValueError:
+    pass
+  try:
+    # HTTP-date format, e.g. "Wed, 21 Oct 2015 07:28:00 GMT"
+    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time())
+  except (TypeError, ValueError):
+    return None
@@ -1,6 +1,11 @@
-from typing import cast, Any, Callable
+from typing import cast, Any, Awaitable, Callable
 from io import StringIO
+from random import uniform
 from time import sleep
+from asyncio import sleep as async_sleep, get_running_loop, AbstractEventLoop, CancelledError
+from threading import Lock
+from weakref import WeakKeyDictionary
+from httpx import Client, AsyncClient, Limits
 from pydantic import SecretStr
 from logging import Logger
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
@@ -8,7 +13,12 @@ from langchain_core.language_models import LanguageModelInput
 from langchain_openai import ChatOpenAI
 
 from .increasable import Increasable, Increaser
-from .error import is_retry_error
+from .limiter import RateLimiter
+from .watcher import StreamWatcher
+from .error import is_retry_error, retry_after_seconds
+
+
+_MAX_RETRY_INTERVAL_SECONDS = 60.0
 
 
 class LLMExecutor:
@@ -22,83 +32,194 @@ class LLMExecutor:
     temperature: Increasable,
     retry_times: int,
     retry_interval_seconds: float,
+    max_connections: int,
+    limiter: RateLimiter,
+    count_tokens: Callable[[str], int],
     create_logger: Callable[[], Logger | None],
   ) -> None:
 
+    self._api_key: SecretStr = api_key
+    self._url: str = url
+    self._model_name: str = model
     self._timeout: float | None = timeout
     self._top_p: Increasable = top_p
     self._temperature: Increasable = temperature
     self._retry_times: int = retry_times
     self._retry_interval_seconds: float = retry_interval_seconds
+    self._limiter: RateLimiter = limiter
+    self._count_tokens: Callable[[str], int] = count_tokens
     self._create_logger: Callable[[], Logger | None] = create_logger
-    self._model = ChatOpenAI(
-      api_key=cast(SecretStr, api_key),
-      base_url=url,
-      model=model,
-      timeout=timeout,
+    self._limits: Limits = Limits(
+      max_connections=max_connections,
+      max_keepalive_connections=max_connections,
+    )
+    self._model = self._create_model(
+      http_client=Client(limits=self._limits),
     )
+    # an async HTTP client can only be used by the event loop that created it,
+    # so that each loop shares one pooled client across all of its requests.
+    self._async_models: WeakKeyDictionary[AbstractEventLoop, ChatOpenAI] = WeakKeyDictionary()
+    self._async_models_lock: Lock = Lock()
 
-  def request(self, input: LanguageModelInput, parser: Callable[[str], Any]) -> Any:
-    result: Any | None = None
-    last_error: Exception | None = None
-    did_success = False
-    top_p: Increaser = self._top_p.context()
-    temperature: Increaser = self._temperature.context()
-    logger = self._create_logger()
+  def _create_model(self, **kwargs) -> ChatOpenAI:
+    return ChatOpenAI(
+      api_key=cast(SecretStr, self._api_key),
+      base_url=self._url,
+      model=self._model_name,
+      timeout=self._timeout,
+      **kwargs,
+    )
 
-    if logger is not None:
-      logger.debug(f"[[Request]]:\n{self._input2str(input)}\n")
+  def _async_model(self) -> ChatOpenAI:
+    loop = get_running_loop()
+    with self._async_models_lock:
+      model = self._async_models.get(loop, None)
+      if model is None:
+        model = self._create_model(
+          http_async_client=AsyncClient(limits=self._limits),
+        )
+        self._async_models[loop] = model
+      return model
 
+  def request(
+        self,
+        input: LanguageModelInput,
+        parser: Callable[[str], Any],
+        create_watcher: Callable[[], StreamWatcher] | None = None,
+        retry_times: int | None = None,
+        repair: Callable[[str], str | None] | None = None,
+      ) -> Any:
+    attempts = self._create_attempts(input)
     try:
       for i in range(self._retry_times + 1):
         try:
           response = self._invoke_model(
             input=input,
-            top_p=top_p.current,
-            temperature=temperature.current,
+            top_p=attempts.top_p.current,
+            temperature=attempts.temperature.current,
+            watcher=create_watcher() if create_watcher is not None else None,
           )
-          if logger is not None:
-            logger.debug(f"[[Response]]:\n{response}\n")
-
+        except _AbortedResponse as aborted:
+          attempts.on_response(aborted.response)
+          attempts.on_parsing_failed(aborted.error, i)
+          if attempts.gives_up_parsing(retry_times):
+            break
+          sleep(self._retry_interval(i))
+          continue
         except Exception as err:
-          last_error = err
-          if not is_retry_error(err):
-            raise err
-          if logger is not None:
-            logger.warning(f"request failed with connection error, retrying... ({i + 1} times)")
-          if self._retry_interval_seconds > 0.0 and \
-            i < self._retry_times:
-            sleep(self._retry_interval_seconds)
+          attempts.on_invoking_failed(err, i)
+          sleep(self._backoff_interval(i, err))
           continue
 
+        attempts.on_response(response)
         try:
-          result = parser(response)
-          did_success = True
-          break
+          return parser(response)
+        except Exception as err:
+          # a complete response failed to parse. repairing it costs less than regenerating it
+          repaired = repair(response) if repair is not None else None
+          if repaired is not None:
+            succeeded, result = attempts.parse_repaired(parser, repaired)
+            if succeeded:
+              return result
+          attempts.on_parsing_failed(err, i)
+          if attempts.gives_up_parsing(retry_times):
+            break
+          sleep(self._retry_interval(i))
 
+    except KeyboardInterrupt as err:
+      attempts.on_interrupted()
+      raise err
+
+    attempts.raise_last_error()
+
+  async def arequest(
+        self,
+        input: LanguageModelInput,
+        parser: Callable[[str], Any],
+        create_watcher: Callable[[], StreamWatcher] | None = None,
+        retry_times: int | None = None,
+        repair: Callable[[str], Awaitable[str | None]] | None = None,
+      ) -> Any:
+    attempts = self._create_attempts(input)
+    try:
+      for i in range(self._retry_times + 1):
+        try:
+          response = await self._ainvoke_model(
+            input=input,
+            top_p=attempts.top_p.current,
+            temperature=attempts.temperature.current,
+            watcher=create_watcher() if create_watcher is not None else None,
+          )
+        except _AbortedResponse as aborted:
+          attempts.on_response(aborted.response)
+          attempts.on_parsing_failed(aborted.error, i)
+          if attempts.gives_up_parsing(retry_times):
+            break
+          await async_sleep(self._retry_interval(i))
+          continue
         except Exception as err:
-          last_error = err
-          if logger is not None:
-            logger.warning(f"request failed with parsing error, retrying... ({i + 1} times)")
-          top_p.increase()
-          temperature.increase()
-          if self._retry_interval_seconds > 0.0 and \
-            i < self._retry_times:
-            sleep(self._retry_interval_seconds)
+          attempts.on_invoking_failed(err, i)
+          await async_sleep(self._backoff_interval(i, err))
           continue
 
-    except KeyboardInterrupt as err:
-      if last_error is not None and logger is not None:
-        logger.debug(f"[[Error]]:\n{last_error}\n")
+        attempts.on_response(response)
+        try:
+          return parser(response)
+        except Exception as err:
+          # a complete response failed to parse. repairing it costs less than regenerating it
+          repaired = await repair(response) if repair is not None else None
+          if repaired is not None:
+            succeeded, result = attempts.parse_repaired(parser, repaired)
+            if succeeded:
+              return result
+          attempts.on_parsing_failed(err, i)
+          if attempts.gives_up_parsing(retry_times):
+            break
+          await async_sleep(self._retry_interval(i))
+
+    except (KeyboardInterrupt, CancelledError) as err:
+      attempts.on_interrupted()
       raise err
 
-    if not did_success:
-      if last_error is None:
-        raise RuntimeError("Request failed with unknown error")
-      else:
-        raise last_error
+    attempts.raise_last_error()
+
+  def _create_attempts(self, input: LanguageModelInput) -> "_Attempts":
+    logger = self._create_logger()
+    if logger is not None:
+      logger.debug(f"[[Request]]:\n{self._input2str(input)}\n")
+    return _Attempts(
+      top_p=self._top_p.context(),
+      temperature=self._temperature.context(),
+      logger=logger,
+    )
+
+  def _retry_interval(self, index: int) -> float:
+    if index >= self._retry_times:
+      return 0.0
+    return max(0.0, self._retry_interval_seconds)
 
-    return result
+  # connection errors and 429 back off exponentially, as the provider may need a while to recover.
+  # a Retry-After header from the provider takes priority when it asks for a longer wait.
+  def _backoff_interval(self, index: int, err: Exception) -> float:
+    if index >= self._retry_times:
+      return 0.0
+    interval = self._retry_interval_seconds * (2 ** index)
+    interval = min(interval, max(_MAX_RETRY_INTERVAL_SECONDS, self._retry_interval_seconds))
+    interval *= uniform(0.75, 1.0) # avoid retrying in lockstep with concurrent requests
+    retry_after = retry_after_seconds(err)
+    if retry_after is not None:
+      interval = max(interval, retry_after)
+    return max(0.0, interval)
+
+  def _input_tokens(self, input: LanguageModelInput) -> int:
+    if not self._limiter.limits_tokens:
+      return 0
+    return self._count_tokens(self._input2str(input))
+
+  def _output_tokens(self, response: str) -> int:
+    if not self._limiter.limits_tokens:
+      return 0
+    return self._count_tokens(response)
 
   def _input2str(self, input: LanguageModelInput) -> str:
     if isinstance(input, str):
@@ -131,15 +252,142 @@ class LLMExecutor:
         input: LanguageModelInput,
         top_p: float | None,
         temperature: float | None,
+        watcher: StreamWatcher | None,
       ):
-    stream = self._model.stream(
-      input=input,
-      timeout=self._timeout,
-      top_p=top_p,
-      temperature=temperature,
-    )
-    buffer = StringIO()
-    for chunk in stream:
-      data = str(chunk.content)
-      buffer.write(data)
-    return buffer.getvalue()
\ No newline at end of file
+    started_at = self._limiter.acquire(self._input_tokens(input))
+    try:
+      stream = self._model.stream(
+        input=input,
+        timeout=self._timeout,
+        top_p=top_p,
+        temperature=temperature,
+      )
+      reader = _StreamReader(watcher)
+      try:
+        for chunk in stream:
+          if reader.read(str(chunk.content)):
+            break
+      finally:
+        stream.close() # stop receiving the rest of the response
+      response = reader.response
+
+    except BaseException as err:
+      self._limiter.release(started_at, error=err)
+      raise err
+
+    self._limiter.release(started_at, output_tokens=self._output_tokens(response))
+    reader.raise_if_aborted()
+    return response
+
+  async def _ainvoke_model(
+        self,
+        input: LanguageModelInput,
+        top_p: float | None,
+        temperature: float | None,
+        watcher: StreamWatcher | None,
+      ):
+    started_at = await self._limiter.aacquire(self._input_tokens(input))
+    try:
+      stream = self._async_model().astream(
+        input=input,
+        timeout=self._timeout,
+        top_p=top_p,
+        temperature=temperature,
+      )
+      reader = _StreamReader(watcher)
+      try:
+        async for chunk in stream:
+          if reader.read(str(chunk.content)):
+            break
+      finally:
+        await stream.aclose()
+      response = reader.response
+
+    except BaseException as err:
+      self._limiter.release(started_at, error=err)
+      raise err
+
+    self._limiter.release(started_at, output_tokens=self._output_tokens(response))
+    reader.raise_if_aborted()
+    return response
+
+class _AbortedResponse(Exception):
+  def __init__(self, response: str, error: Exception) -> None:
+    super().__init__(str(error))
+    self.response: str = response
+    self.error: Exception = error
+
+# reads chunks of a streaming response, until the watcher decides it's finished or aborts it
+class _StreamReader:
+  def __init__(self, watcher: StreamWatcher | None) -> None:
+    self._watcher: StreamWatcher | None = watcher
+    self._buffer: StringIO = StringIO()
+    self._error: Exception | None = None
+
+  @property
+  def response(self) -> str:
+    return self._buffer.getvalue()
+
+  def read(self, chunk: str) -> bool:
+    self._buffer.write(chunk)
+    if self._watcher is None:
+      return False
+    try:
+      return self._watcher(chunk)
+    except Exception as err:
+      self._error = err
+      return True
+
+  def raise_if_aborted(self) -> None:
+    if self._error is not None:
+      raise _AbortedResponse(self.response, self._error)
+
+# state of one request across its retries, shared by the sync and async paths
+class _Attempts:
+  def __init__(self, top_p: Increaser, temperature: Increaser, logger: Logger | None) -> None:
+    self.top_p: Increaser = top_p
+    self.temperature: Increaser = temperature
+    self._logger: Logger | None = logger
+    self._last_error: Exception | None = None
+    self._parsing_failures: int = 0
+
+  def on_response(self, response: str) -> None:
+    if self._logger is not None:
+      self._logger.debug(f"[[Response]]:\n{response}\n")
+
+  def on_invoking_failed(self, err: Exception, index: int) -> None:
+    self._last_error = err
+    if not is_retry_error(err):
+      raise err
+    if self._logger is not None:
+      self._logger.warning(f"request failed with connection error, retrying... ({index + 1} times)")
+
+  def on_parsing_failed(self, err: Exception, index: int) -> None:
+    self._last_error = err
+    self._parsing_failures += 1
+    if self._logger is not None:
+      self._logger.warning(f"request failed with parsing error, retrying... ({index + 1} times)")
+    self.top_p.increase()
+    self.temperature.increase()
+
+  def parse_repaired(self, parser: Callable[[str], Any], repaired: str) -> tuple[bool, Any]:
+    if self._logger is not None:
+      self._logger.debug(f"[[Repaired Response]]:\n{repaired}\n")
+    try:
+      return True, parser(repaired)
+    except Exception: # pylint: disable=broad-exception-caught
+      return False, None
+
+  # retry_times of a request caps the retries after failing to parse (it can't raise the configured ones).
+  # connection errors are still retried as configured.
+  def gives_up_parsing(self, retry_times: int | None) -> bool:
+    return retry_times is not None and self._parsing_failures > retry_times
+
+  def on_interrupted(self) -> None:
+    if self._last_error is not None and self._logger is not None:
+      self._logger.debug(f"[[Error]]:\n{self._last_error}\n")
+
+  def raise_last_error(self):
+    if self._last_error is None:
+      raise RuntimeError("Request failed with unknown error")
+    raise self._last_error
@@ -0,0 +1,140 @@
+from time import monotonic
+from threading import Condition
+from asyncio import sleep as async_sleep
+from .error import is_rate_limit_error, retry_after_seconds
+
+
+# waiting for another request to release its slot cannot be awaited across threads,
+# so that the async path polls at this interval instead.
+_ASYNC_POLL_SECONDS = 0.05
+
+# client side limits shared by all requests of one LLM.
+# requests and tokens per minute are enforced by token buckets. the number of requests in flight
+# follows AIMD: halved when the provider answers 429, and grows back by one per window of successes.
+class RateLimiter:
+  def __init__(
+        self,
+        max_requests_per_minute: int | None,
+        max_tokens_per_minute: int | None,
+        max_concurrent_requests: int | None,
+      ) -> None:
+
+    self._condition: Condition = Condition()
+    self._requests_bucket: _TokenBucket | None = None
+    self._tokens_bucket: _TokenBucket | None = None
+    self._max_concurrency: float | None = None
+    self._concurrency: float | None = None
+    self._in_flight: int = 0
+    self._paused_until: float = 0.0
+    self._decreased_at: float = 0.0
+
+    if max_requests_per_minute is not None:
+      self._requests_bucket = _TokenBucket(max_requests_per_minute)
+    if max_tokens_per_minute is not None:
+      self._tokens_bucket = _TokenBucket(max_tokens_per_minute)
+    if max_concurrent_requests is not None:
+      self._max_concurrency = float(max(1, max_concurrent_requests))
+      self._concurrency = self._max_concurrency
+
+  @property
+  def limits_tokens(self) -> bool:
+    return self._tokens_bucket is not None
+
+  @property
+  def concurrency(self) -> float | None:
+    with self._condition:
+      return self._concurrency
+
+  # return the time the request started at, which should be passed back to `release`
+  def acquire(self, tokens: int) -> float:
+    with self._condition:
+      while True:
+        wait_seconds = self._try_acquire(tokens)
+        if wait_seconds == 0.0:
+          return monotonic()
+        self._condition.wait(wait_seconds)
+
+  async def aacquire(self, tokens: int) -> float:
+    while True:
+      with self._condition:
+        wait_seconds = self._try_acquire(tokens)
+      if wait_seconds == 0.0:
+        return monotonic()
+      if wait_seconds is None:
+        wait_seconds = _ASYNC_POLL_SECONDS
+      await async_sleep(wait_seconds)
+
+  def release(self, started_at: float, output_tokens: int = 0, error: BaseException | None = None) -> None:
+    with self._condition:
+      now = monotonic()
+      self._in_flight -= 1
+      if self._tokens_bucket is not None and output_tokens > 0:
+        self._tokens_bucket.charge(now, output_tokens)
+
+      if error is not None and is_rate_limit_error(error):
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+          self._paused_until = max(self._paused_until, now + retry_after)
+        # requests sent before the last decrease were already counted by it
+        if started_at >= self._decreased_at:
+          self._decreased_at = now
+          concurrency = self._concurrency
+          if concurrency is None:
+            concurrency = float(self._in_flight + 1)
+          self._concurrency = max(1.0, concurrency / 2.0)
+
+      elif error is None and self._concurrency is not None:
+        self._concurrency += 1.0 / self._concurrency
+        if self._max_concurrency is not None:
+          self._concurrency = min(self._concurrency, self._max_concurrency)
+
+      self._condition.notify_all()
+
+  # None means waiting until another request releases its slot
+  def _try_acquire(self, tokens: int) -> float | None:
+    now = monotonic()
+    if self._paused_until > now:
+      return self._paused_until - now
+    if self._concurrency is not None and self._in_flight >= int(self._concurrency):
+      return None
+
+    wait_seconds = 0.0
+    if self._requests_bucket is not None:
+      wait_seconds = max(wait_seconds, self._requests_bucket.wait_seconds(now, 1))
+    if self._tokens_bucket is not None:
+      wait_seconds = max(wait_seconds, self._tokens_bucket.wait_seconds(now, tokens))
+    if wait_seconds > 0.0:
+      return wait_seconds
+
+    if self._requests_bucket is not None:
+      self._requests_bucket.charge(now, 1)
+    if self._tokens_bucket is not None:
+      self._tokens_bucket.charge(now, tokens)
+    self._in_flight += 1
+    return 0.0
+
+class _TokenBucket:
+  def __init__(self, capacity_per_minute: int) -> None:
+    self._capacity: float = float(max(1, capacity_per_minute))
+    self._rate: float = self._capacity / 60.0
+    self._tokens: float = self._capacity
+    self._updated_at: float = monotonic()
+
+  def wait_seconds(self, now: float, amount: int) -> float:
+    self._refill(now)
+    # a request larger than the whole bucket is let through once the bucket is full
+    amount = min(float(amount), self._capacity)
+    if self._tokens >= amount:
+      return 0.0
+    return (amount - self._tokens) / self._rate
+
+  # the balance may go negative (e.g. output tokens known after the response), delaying later requests
+  def charge(self, now: float, amount: int) -> None:
+    self._refill(now)
+    self._tokens -= float(amount)
+
+  def _refill(self, now: float) -> None:
+    elapsed = now - self._updated_at
+    if elapsed > 0.0:
+      self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+      self._updated_at = now
@@ -1,21 +1,34 @@
+import re
 import json
 import datetime
 
 from os import PathLike
 from pathlib import Path
-from typing import cast, Any, Generator
+from typing import cast, Any, Awaitable, Callable, Generator, Iterable
+from contextlib import contextmanager
 from importlib.resources import files
 from jinja2 import Environment, Template
 from xml.etree.ElementTree import Element
 from pydantic import SecretStr
 from logging import getLogger, DEBUG, Formatter, Logger, FileHandler
 from tiktoken import get_encoding, Encoding
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 
 from ..template import create_env
-from ..xml import decode_friendly, encode_friendly
+from ..xml import decode_friendly, decode_friendly_by_priority, encode_friendly
 from .increasable import Increasable
 from .executor import LLMExecutor
+from .cache import LLMCache, LLMCacheStats
+from .limiter import RateLimiter
+from .tokens import TokensCounter
+from .watcher import StreamWatcher, XMLResponseWatcher, RESPONSE_TAG
+from .repair import close_xml_tags, split_xml_tail, close_json
+
+
+_RESPONSE_OPENING_PATTERN = re.compile(rf"<{RESPONSE_TAG}[ \n>]")
+
+# a malformed tail longer than this rate of the response is not worth repairing by a request
+_MAX_REPAIRED_TAIL_RATE = 0.5
 
 
 class LLM:
@@ -30,13 +43,31 @@ class LLM:
       temperature: float | tuple[float, float] | None = None,
       retry_times: int = 5,
       retry_interval_seconds: float = 6.0,
+      max_connections: int = 100,
+      max_requests_per_minute: int | None = None,
+      max_tokens_per_minute: int | None = None,
+      max_concurrent_requests: int | None = None,
       log_dir_path: PathLike | None = None,
+      cache_dir_path: PathLike | None = None,
+      cache_max_bytes: int | None = None,
+      strict_xml: bool = False,
+      repair_responses: bool = True,
     ):
     prompts_path = files("pdf_craft").joinpath("data/prompts")
     self._templates: dict[str, Template] = {}
     self._encoding: Encoding = get_encoding(token_encoding)
+    self._tokens_counter: TokensCounter = TokensCounter(self._encoding)
     self._env: Environment = create_env(prompts_path)
     self._logger_save_path: Path | None = None
+    self._model: str = model
+    self._top_p: float | tuple[float, float] | None = top_p
+    self._temperature: float | tuple[float, float] | None = temperature
+    self._cache: LLMCache | None = None
+    self._strict_xml: bool = strict_xml
+    self._repair_responses: bool = repair_responses
+
+    if cache_dir_path is not None:
+      self._cache = LLMCache(cache_dir_path, cache_max_bytes)
 
     if log_dir_path is not None:
       self._logger_save_path = Path(log_dir_path)
@@ -54,9 +85,20 @@ class LLM:
       temperature=Increasable(temperature),
       retry_times=retry_times,
       retry_interval_seconds=retry_interval_seconds,
+      max_connections=max_connections,
+      limiter=RateLimiter(
+        max_requests_per_minute=max_requests_per_minute,
+        max_tokens_per_minute=max_tokens_per_minute,
+        max_concurrent_requests=max_concurrent_requests,
+      ),
+      count_tokens=self._count_request_tokens,
       create_logger=self._create_logger,
     )
 
+  # each request is counted only once, and isn't worth caching
+  def _count_request_tokens(self, text: str) -> int:
+    return len(self._encoding.encode(text))
+
   def _create_logger(self) -> Logger | None:
     if self._logger_save_path is None:
       return None
@@ -73,31 +115,172 @@ class LLM:
 
     return logger
 
-  def request_markdown(self, template_name: str, user_data: Element | str, params: dict[str, Any] | None = None) -> str:
-    if params is None:
-      params = {}
-    return self._executor.request(
-      input=self._create_input(template_name, user_data, params),
-      parser=self._encode_markdown,
+  @property
+  def cache_stats(self) -> LLMCacheStats | None:
+    if self._cache is None:
+      return None
+    return self._cache.stats
+
+  def request_markdown(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> str:
+    return self._request(template_name, user_data, params, retry_times, attempt, self._encode_markdown)
+
+  def request_json(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> Any:
+    return self._request(template_name, user_data, params, retry_times, attempt, self._encode_json)
+
+  def request_xml(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> Element:
+    return self._request(
+      template_name, user_data, params, retry_times, attempt, self._encode_xml,
+      self._create_xml_watcher, self._repair_xml if self._repair_responses else None,
     )
 
-  def request_json(self, template_name: str, user_data: Element | str, params: dict[str, Any] | None = None) -> Any:
-    if params is None:
-      params = {}
-    return self._executor.request(
-      input=self._create_input(template_name, user_data, params),
-      parser=self._encode_json,
+  async def arequest_markdown(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> str:
+    return await self._arequest(template_name, user_data, params, retry_times, attempt, self._encode_markdown)
+
+  async def arequest_json(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> Any:
+    return await self._arequest(template_name, user_data, params, retry_times, attempt, self._encode_json)
+
+  async def arequest_xml(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None = None,
+        retry_times: int | None = None,
+        attempt: int = 0,
+      ) -> Element:
+    return await self._arequest(
+      template_name, user_data, params, retry_times, attempt, self._encode_xml,
+      self._create_xml_watcher, self._arepair_xml if self._repair_responses else None,
     )
 
-  def request_xml(self, template_name: str, user_data: Element | str, params: dict[str, Any] | None = None) -> Element:
-    if params is None:
-      params = {}
+  def _request(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None,
+        retry_times: int | None,
+        attempt: int,
+        parser: Callable[[str], Any],
+        create_watcher: Callable[[], StreamWatcher] | None = None,
+        repair: Callable[[str], str | None] | None = None,
+      ) -> Any:
+
+    input = self._create_input(template_name, user_data, params or {})
+    cache_key = self._cache_key(template_name, input, attempt)
+    did_hit, result = self._parse_cached(cache_key, parser)
+    if did_hit:
+      return result
     return self._executor.request(
-      input=self._create_input(template_name, user_data, params),
-      parser=self._encode_xml,
+      input=input,
+      parser=self._caching_parser(cache_key, parser),
+      create_watcher=create_watcher,
+      retry_times=retry_times,
+      repair=repair,
     )
 
-  def _create_input(self, template_name: str, user_data: Element | str, params: dict[str, Any]):
+  async def _arequest(
+        self,
+        template_name: str,
+        user_data: Element | str,
+        params: dict[str, Any] | None,
+        retry_times: int | None,
+        attempt: int,
+        parser: Callable[[str], Any],
+        create_watcher: Callable[[], StreamWatcher] | None = None,
+        repair: Callable[[str], Awaitable[str | None]] | None = None,
+      ) -> Any:
+
+    input = self._create_input(template_name, user_data, params or {})
+    cache_key = self._cache_key(template_name, input, attempt)
+    did_hit, result = self._parse_cached(cache_key, parser)
+    if did_hit:
+      return result
+    return await self._executor.arequest(
+      input=input,
+      parser=self._caching_parser(cache_key, parser),
+      create_watcher=create_watcher,
+      retry_times=retry_times,
+      repair=repair,
+    )
+
+  # a request repeated on purpose (such as another step of correction) is told apart by its attempt,
+  # otherwise it would get the same cached response again. the first attempt keeps keys of older caches.
+  def _cache_key(self, template_name: str, input: list[BaseMessage], attempt: int) -> str | None:
+    if self._cache is None:
+      return None
+    system_message, human_message = input
+    fields: dict[str, Any] = {
+      "model": self._model,
+      "template": template_name,
+      "prompt": system_message.content,
+      "data": human_message.content,
+      "top_p": self._top_p,
+      "temperature": self._temperature,
+    }
+    if attempt > 0:
+      fields["attempt"] = attempt
+    return self._cache.key(**fields)
+
+  def _parse_cached(self, cache_key: str | None, parser: Callable[[str], Any]) -> tuple[bool, Any]:
+    if self._cache is None or cache_key is None:
+      return False, None
+    response = self._cache.get(cache_key)
+    if response is None:
+      return False, None
+    try:
+      return True, parser(response)
+    except Exception:
+      # 解析规则可能已经变化，丢弃这条缓存并重新请求
+      self._cache.remove(cache_key)
+      return False, None
+
+  def _caching_parser(self, cache_key: str | None, parser: Callable[[str], Any]) -> Callable[[str], Any]:
+    cache = self._cache
+    if cache is None or cache_key is None:
+      return parser
+
+    def parse(response: str) -> Any:
+      result = parser(response)
+      cache.put(cache_key, response)
+      return result
+
+    return parse
+
+  def _create_input(self, template_name: str, user_data: Element | str, params: dict[str, Any]) -> list[BaseMessage]:
     data: str
     if isinstance(user_data, Element):
       data = encode_friendly(user_data)
@@ -115,7 +298,7 @@ class LLM:
   def prompt_tokens_count(self, template_name: str, params: dict[str, Any]) -> int:
     template = self._template(template_name)
     prompt = template.render(**params)
-    return len(self._encoding.encode(prompt))
+    return self._tokens_counter.count(prompt)
 
   def encode_tokens(self, text: str) -> list[int]:
     return self._encoding.encode(text)
@@ -124,7 +307,21 @@ class LLM:
     return self._encoding.decode(tokens)
 
   def count_tokens_count(self, text: str) -> int:
-    return len(self._encoding.encode(text))
+    return self._tokens_counter.count(text)
+
+  # texts not counted before are encoded in parallel
+  def count_tokens_many(self, texts: Iterable[str]) -> list[int]:
+    return self._tokens_counter.count_many(texts)
+
+  # token counts are also kept in the file (and read from it) until exiting
+  @contextmanager
+  def tokens_cache(self, file_path: PathLike) -> Generator[None, None, None]:
+    file_path = Path(file_path)
+    self._tokens_counter.open_store(file_path)
+    try:
+      yield
+    finally:
+      self._tokens_counter.close_store(file_path)
 
   def _template(self, template_name: str) -> Template:
     template = self._templates.get(template_name, None)
@@ -140,36 +337,65 @@ class LLM:
 
   def _encode_json(self, response: str) -> Any:
     for quote in self._search_quotes("JSON", response):
-      return json.loads(quote)
-    raise ValueError("No valid Markdown response found")
+      return self._load_json(quote)
+    raise ValueError("No valid JSON response found")
+
+  def _load_json(self, text: str) -> Any:
+    try:
+      return json.loads(text)
+    except json.JSONDecodeError as err:
+      repaired = close_json(text) if self._repair_responses else None
+      if repaired is None:
+        raise err
+      return json.loads(repaired)
+
+  def _create_xml_watcher(self) -> StreamWatcher:
+    return XMLResponseWatcher(self._strict_xml)
 
   def _encode_xml(self, response: str) -> Element:
+    try:
+      return self._decode_xml_response(response)
+    except ValueError as err:
+      # 只有闭合标签残缺或缺失时，在本地补全即可，不必重新生成
+      repaired = close_xml_tags(response) if self._repair_responses else None
+      if repaired is None:
+        raise err
+      return self._decode_xml_response(repaired)
+
+  def _decode_xml_response(self, response: str) -> Element:
     # 添加调试信息
     print(f"🔍 尝试解析 XML 响应，响应长度: {len(response)} 字符")
 
-    # 尝试从 decode_friendly 获取元素
-    elements = list(decode_friendly(response, "response"))
-    if elements:
+    if self._strict_xml:
+      # 与流式请求时的检查相同，缓存中的响应也要经过它
+      XMLResponseWatcher(strict=True)(response)
+      elements = list(decode_friendly(response, RESPONSE_TAG))
+      if not elements:
+        raise ValueError("No valid XML response found")
+      return elements[0]
+
+    # 常见的根元素标签，按优先级排列。只解析一次响应，而不是为每个标签重新解析
+    common_tags = ["correction", "overview", "updation", "request", "result", "output"]
+    tag, elements = decode_friendly_by_priority(response, [RESPONSE_TAG, *common_tags])
+    if tag == RESPONSE_TAG:
       print(f"✅ 成功解析到 {len(elements)} 个 XML 元素")
       return elements[0]
 
+    # <response> 打开了却没有闭合（例如被截断），其中的子元素不能当作根元素
+    if _RESPONSE_OPENING_PATTERN.search(response):
+      raise ValueError(f"Unclosed <{RESPONSE_TAG}> in XML response")
+
     # 如果没有找到 "response" 标签，尝试查找其他可能的根元素
     print("🔍 未找到 'response' 标签，尝试查找其他根元素...")
-
-    # 尝试常见的根元素标签
-    common_tags = ["correction", "overview", "updation", "request", "result", "output"]
-    for tag in common_tags:
-      elements = list(decode_friendly(response, tag))
-      if elements:
-        print(f"✅ 找到 '{tag}' 标签，包含 {len(elements)} 个元素")
-        return elements[0]
+    if tag is not None:
+      print(f"✅ 找到 '{tag}' 标签，包含 {len(elements)} 个元素")
+      return elements[0]
 
     # 尝试解析所有可能的 XML 元素
     print("🔍 尝试解析所有 XML 元素...")
-    all_elements = list(decode_friendly(response))
-    if all_elements:
-      print(f"✅ 找到 {len(all_elements)} 个 XML 元素，使用第一个")
-      return all_elements[0]
+    if elements:
+      print(f"✅ 找到 {len(elements)} 个 XML 元素，使用第一个")
+      return elements[0]
 
     # 如果仍然失败，显示响应的前500个字符用于调试
     print(f"❌ XML 解析完全失败")
@@ -179,6 +405,56 @@ class LLM:
 
     raise ValueError("No valid XML response found")
 
+  # only the malformed tail (after the last complete child of the root) is sent to be repaired.
+  # returns the repaired response, or None to regenerate it.
+  def _repair_xml(self, response: str) -> str | None:
+    split = self._split_tail_to_repair(response)
+    if split is None:
+      return None
+    prefix, tail, opening_names = split
+    try:
+      repaired_tail = self._executor.request(
+        input=self._create_input("repair/xml", tail, { "opening_names": opening_names }),
+        parser=self._encode_repaired_tail,
+        retry_times=0,
+      )
+    except Exception: # pylint: disable=broad-exception-caught
+      return None
+    return prefix + repaired_tail
+
+  async def _arepair_xml(self, response: str) -> str | None:
+    split = self._split_tail_to_repair(response)
+    if split is None:
+      return None
+    prefix, tail, opening_names = split
+    try:
+      repaired_tail = await self._executor.arequest(
+        input=self._create_input("repair/xml", tail, { "opening_names": opening_names }),
+        parser=self._encode_repaired_tail,
+        retry_times=0,
+      )
+    except Exception: # pylint: disable=broad-exception-caught
+      return None
+    return prefix + repaired_tail
+
+  def _split_tail_to_repair(self, response: str) -> tuple[str, str, list[str]] | None:
+    split = split_xml_tail(response)
+    if split is None:
+      return None
+    _, tail, opening_names = split
+    if opening_names[0] != RESPONSE_TAG or \
+       len(tail) > len(response) * _MAX_REPAIRED_TAIL_RATE:
+      return None
+    # without the end of its ```XML block, the response may be truncated. what's lost can't be repaired
+    if not tail.rstrip().endswith("```"):
+      return None
+    return split
+
+  def _encode_repaired_tail(self, response: str) -> str:
+    for quote in self._search_quotes("XML", response):
+      return quote
+    raise ValueError("No repaired XML found")
+
   def _search_quotes(self, kind: str, response: str) -> Generator[str, None, None]:
     start_marker = f"```{kind}"
     end_marker = "```"
@@ -0,0 +1,104 @@
+import re
+
+from ..xml.parser import parse_tags
+from ..xml.tag import Tag, TagKind
+
+
+# what may be left after the last tag when only closing tags are broken or missing:
+# the end of the ```XML block, and closing tags cut off or malformed (such as "</respon")
+_BROKEN_CLOSING_PATTERN = re.compile(r"(?:</[a-zA-Z0-9_\-\s]*>?\s*)*")
+
+# a response is repaired locally when nothing but closing tags are wrong: they are (re)written
+# after the last tag. returns None if there is no unclosed tag, or content is cut off after the last tag
+# (such as a truncated line), which must not be guessed. nor is a response ending right after a tag,
+# unless the end of its ```XML block or a broken closing tag proves the LLM finished it, since closing
+# the tags of a truncated response would drop what the LLM never sent.
+def close_xml_tags(response: str) -> str | None:
+  cells = list(parse_tags(response))
+  opening_names: list[str] = []
+  last_tag_index = -1
+
+  for i, cell in enumerate(cells):
+    if isinstance(cell, Tag):
+      _read_tag(cell, opening_names)
+      last_tag_index = i
+
+  if not opening_names:
+    return None
+
+  rest = "".join(cells[last_tag_index + 1:]).strip()
+  finished = rest.endswith("```")
+  if finished:
+    rest = rest[:-3].strip()
+  if _BROKEN_CLOSING_PATTERN.fullmatch(rest) is None:
+    return None
+  if not finished and rest == "":
+    return None
+
+  return _join_cells(cells[:last_tag_index + 1]) + \
+         "".join(f"</{name}>" for name in reversed(opening_names))
+
+# splits a response with an unclosed root, after its last complete child (or its opening tag).
+# returns the part before, the tail to repair, and names of tags opened before the tail.
+def split_xml_tail(response: str) -> tuple[str, str, list[str]] | None:
+  cells = list(parse_tags(response))
+  opening_names: list[str] = []
+  cut_index = -1
+  cut_opening_names: list[str] = []
+
+  for i, cell in enumerate(cells):
+    if isinstance(cell, Tag):
+      _read_tag(cell, opening_names)
+      if len(opening_names) == 1:
+        cut_index = i + 1
+        cut_opening_names = list(opening_names)
+
+  if not opening_names or cut_index == -1:
+    return None
+
+  return (
+    _join_cells(cells[:cut_index]),
+    _join_cells(cells[cut_index:]),
+    cut_opening_names,
+  )
+
+def _read_tag(tag: Tag, opening_names: list[str]) -> None:
+  if tag.kind == TagKind.OPENING:
+    opening_names.append(tag.name)
+  elif tag.kind == TagKind.CLOSING:
+    for i in range(len(opening_names) - 1, -1, -1):
+      if opening_names[i] == tag.name:
+        del opening_names[i:]
+        break
+
+def _join_cells(cells: list[str | Tag]) -> str:
+  return "".join(str(cell) for cell in cells)
+
+# a JSON block (found with its closing ```, so that the LLM finished it) missing nothing but its closing
+# brackets is closed. returns None if nothing is unclosed, or it ends inside a string or after a comma or colon,
+# which means it's truncated, and what's lost must not be guessed.
+def close_json(text: str) -> str | None:
+  closers: list[str] = []
+  in_string = False
+  escaped = False
+
+  for char in text:
+    if in_string:
+      if escaped:
+        escaped = False
+      elif char == "\\":
+        escaped = True
+      elif char == "\"":
+        in_string = False
+    elif char == "\"":
+      in_string = True
+    elif char in ("{", "["):
+      closers.append("}" if char == "{" else "]")
+    elif char in ("}", "]"):
+      if closers:
+        closers.pop()
+
+  text = text.rstrip()
+  if not closers or in_string or text.endswith((",", ":")):
+    return None
+  return text + "".join(reversed(closers))
@@ -0,0 +1,136 @@
+import sqlite3
+
+from pathlib import Path
+from hashlib import blake2b
+from threading import Lock
+from collections import OrderedDict
+from typing import Iterable
+from tiktoken import Encoding
+
+
+_MAX_MEMORY_ENTRIES = 256 * 1024
+_COMMIT_BATCH_SIZE = 1024
+_ENCODING_THREADS = 8
+
+# 以内容的哈希与编码名为键，缓存文本的 token 数。请求切分时同样的内容会被反复计数，
+# 打开磁盘上的文件后，计数还能在各阶段之间、重新运行时复用。
+class TokensCounter:
+  def __init__(self, encoding: Encoding) -> None:
+    self._encoding: Encoding = encoding
+    self._lock: Lock = Lock()
+    self._entries: OrderedDict[bytes, int] = OrderedDict()
+    self._stores: list[_TokensStore] = [] # the last opened one is used
+
+  def count(self, text: str) -> int:
+    return self.count_many((text,))[0]
+
+  def count_many(self, texts: Iterable[str]) -> list[int]:
+    texts = list(texts)
+    keys = [blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+    counts: dict[bytes, int] = {}
+    missing: dict[bytes, str] = {}
+
+    with self._lock:
+      store = self._stores[-1] if self._stores else None
+      for key, text in zip(keys, texts):
+        if key in counts or key in missing:
+          continue
+        count = self._entries.get(key, None)
+        if count is not None:
+          self._entries.move_to_end(key)
+        elif store is not None:
+          count = store.get(key)
+        if count is None:
+          missing[key] = text
+        else:
+          counts[key] = count
+
+    if missing:
+      missing_texts = list(missing.values())
+      if len(missing_texts) == 1:
+        tokens_list = [self._encoding.encode(missing_texts[0])]
+      else:
+        tokens_list = self._encoding.encode_batch(missing_texts, num_threads=_ENCODING_THREADS)
+
+      with self._lock:
+        store = self._stores[-1] if self._stores else None
+        for key, tokens in zip(missing.keys(), tokens_list):
+          counts[key] = len(tokens)
+          if store is not None:
+            store.put(key, len(tokens))
+
+    with self._lock:
+      for key, count in counts.items():
+        self._entries[key] = count
+      while len(self._entries) > _MAX_MEMORY_ENTRIES:
+        self._entries.popitem(last=False)
+
+    return [counts[key] for key in keys]
+
+  def open_store(self, file_path: Path) -> None:
+    store = _TokensStore(file_path, self._encoding.name)
+    with self._lock:
+      self._stores.append(store)
+
+  def close_store(self, file_path: Path) -> None:
+    with self._lock:
+      for i in range(len(self._stores) - 1, -1, -1):
+        store = self._stores[i]
+        if store.file_path == file_path:
+          del self._stores[i]
+          store.close()
+          break
+
+# not thread safe
+class _TokensStore:
+  def __init__(self, file_path: Path, encoding_name: str) -> None:
+    self.file_path: Path = file_path
+    self._encoding_name: str = encoding_name
+    self._uncommitted: int = 0
+    try:
+      self._conn: sqlite3.Connection = self._connect()
+    except sqlite3.DatabaseError:
+      # it's only a cache, so that a broken one is dropped
+      file_path.unlink(missing_ok=True)
+      self._conn = self._connect()
+
+  def _connect(self) -> sqlite3.Connection:
+    self.file_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(self.file_path, check_same_thread=False)
+    try:
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute("PRAGMA synchronous=OFF")
+      conn.execute(
+        "CREATE TABLE IF NOT EXISTS tokens ("
+        "encoding TEXT NOT NULL, hash BLOB NOT NULL, count INTEGER NOT NULL, "
+        "PRIMARY KEY (encoding, hash)"
+        ") WITHOUT ROWID"
+      )
+      conn.commit()
+    except sqlite3.DatabaseError as err:
+      conn.close()
+      raise err
+    return conn
+
+  def get(self, key: bytes) -> int | None:
+    row = self._conn.execute(
+      "SELECT count FROM tokens WHERE encoding = ? AND hash = ?",
+      (self._encoding_name, key),
+    ).fetchone()
+    if row is None:
+      return None
+    return row[0]
+
+  def put(self, key: bytes, count: int) -> None:
+    self._conn.execute(
+      "INSERT OR REPLACE INTO tokens (encoding, hash, count) VALUES (?, ?, ?)",
+      (self._encoding_name, key, count),
+    )
+    self._uncommitted += 1
+    if self._uncommitted >= _COMMIT_BATCH_SIZE:
+      self._conn.commit()
+      self._uncommitted = 0
+
+  def close(self) -> None:
+    self._conn.commit()
+    self._conn.close()
@@ -0,0 +1,67 @@
+from typing import Callable
+
+from ..xml.parser import XMLTagsParser
+from ..xml.tag import Tag, TagKind
+
+
+# feeds chunks of a response while it's streaming. returns True when the rest is no longer needed,
+# or raises to abort the request, which is retried as a response failed to parse.
+StreamWatcher = Callable[[str], bool]
+
+# the root element of an XML response
+RESPONSE_TAG = "response"
+
+# an XML response is decided once its <response> is closed, as the first closed one is picked.
+# when strict, a response is aborted as soon as the root of its ```XML block isn't <response>,
+# or a closing tag inside the root matches no opening one.
+class XMLResponseWatcher:
+  def __init__(self, strict: bool) -> None:
+    self._strict: bool = strict
+    self._parser: XMLTagsParser = XMLTagsParser()
+    self._opening_names: list[str] = []
+    self._quoted: bool = False # in ```XML block
+    self._finished: bool = False
+
+  def __call__(self, chunk: str) -> bool:
+    if not self._finished:
+      for cell in self._parser.feed(chunk):
+        if isinstance(cell, Tag):
+          self._read_tag(cell)
+          if self._finished:
+            break
+        else:
+          self._read_text(cell)
+    return self._finished
+
+  def _read_text(self, text: str) -> None:
+    for part in text.split("```")[1:]:
+      self._quoted = not self._quoted and part[:3].lower() == "xml"
+
+  def _read_tag(self, tag: Tag) -> None:
+    if tag.kind == TagKind.CLOSING:
+      self._read_closing_tag(tag)
+      return
+
+    if len(self._opening_names) == 0 and self._strict and self._quoted and tag.name != RESPONSE_TAG:
+      raise ValueError(f"Unexpected root <{tag.name}> of XML response")
+
+    if tag.kind == TagKind.OPENING:
+      self._opening_names.append(tag.name)
+    elif tag.name == RESPONSE_TAG:
+      self._finished = True
+
+  def _read_closing_tag(self, tag: Tag) -> None:
+    index = -1
+    for i in range(len(self._opening_names) - 1, -1, -1):
+      if self._opening_names[i] == tag.name:
+        index = i
+        break
+
+    if index == -1:
+      if self._strict and len(self._opening_names) > 0:
+        raise ValueError(f"Unmatched closing tag </{tag.name}> in XML response")
+      return
+
+    del self._opening_names[index:]
+    if tag.name == RESPONSE_TAG:
+      self._finished = True
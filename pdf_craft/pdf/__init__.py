@@ -1,4 +1,4 @@
-from .types import OCRLevel, PDFPageExtractorProgressReport
+from .types import OCRLevel, AdaptiveDPI, PDFPageExtractorProgressReport
 from .extractor import PDFPageExtractor
 from .types import (
   Block,
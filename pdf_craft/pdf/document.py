@@ -3,14 +3,19 @@ import fitz
 
 from typing import Generator, Literal, Iterable, Sequence
 from dataclasses import dataclass
+from threading import Thread, Event
+from queue import Queue, Empty, Full
 from PIL.Image import frombytes, Image
-from doc_page_extractor import plot, Layout, DocExtractor, ExtractedResult, TableLayoutParsedFormat
+from doc_page_extractor import plot, Layout, DocExtractor, ExtractedResult, OCRFragment, TableLayoutParsedFormat
 from .section import Section
-from .types import OCRLevel, PDFPageExtractorProgressReport
+from .text_layer import read_text_layer_fragments, extract_with_text_layer
+from .dpi import adaptive_page_dpi
+from .types import OCRLevel, AdaptiveDPI, PDFPageExtractorProgressReport
 
 
 # section can be viewed up to 2 pages back
 _MAX_VIEWED_PAGES: int = 2
+_DEFAULT_DPI: int = 300 # for scanned book pages
 
 @dataclass
 class DocumentParams:
@@ -27,8 +32,16 @@ class DocumentExtractor:
       extract_formula: bool,
       extract_table_format: TableLayoutParsedFormat | None,
       debug_dir_path: str | None,
+      prefetch_pages: int = 0,
+      text_layer_dpi: int | None = None,
+      adaptive_dpi: AdaptiveDPI | None = None,
     ):
     self._debug_dir_path: str | None = debug_dir_path
+    self._prefetch_pages: int = prefetch_pages
+    self._render_params: _RenderParams = _RenderParams(
+      text_layer_dpi=text_layer_dpi,
+      adaptive_dpi=adaptive_dpi,
+    )
     self._doc_extractor = DocExtractor(
       device=device,
       model_dir_path=model_dir_path,
@@ -49,7 +62,8 @@ class DocumentExtractor:
     queue: list[tuple[ExtractedResult, Section]] = []
 
     for page_index, result in self._extract_page_result(params):
-      section = Section(page_index, result.layouts)
+      dpi, _ = result.extracted_image.info.get("dpi", (_DEFAULT_DPI, _DEFAULT_DPI))
+      section = Section(page_index, result.layouts, _DEFAULT_DPI / dpi)
       for i, (_, pre_section) in enumerate(queue):
         offset = len(queue) - i
         pre_section.link_next(section, offset)
@@ -79,15 +93,22 @@ class DocumentExtractor:
       document=document,
       page_indexes=params.page_indexes,
     )
+    pages: Generator[_RenderedPage, None, None]
+    if self._prefetch_pages > 0:
+      pages = _prefetch_pages(document, scan_indexes, self._render_params, self._prefetch_pages)
+    else:
+      pages = _render_pages(document, scan_indexes, self._render_params)
+
     try:
-      for i, page_index in enumerate(scan_indexes):
-        dpi = 300 # for scanned book pages
-        page = document.load_page(page_index)
-        image = self._page_screenshot_image(page, dpi)
-        result = self._doc_extractor.extract(
-          image=image,
-          adjust_points=False,
-        )
+      for i, (page_index, image, fragments) in enumerate(pages):
+        result: ExtractedResult
+        if fragments is None:
+          result = self._doc_extractor.extract(
+            image=image,
+            adjust_points=False,
+          )
+        else:
+          result = extract_with_text_layer(self._doc_extractor, image, fragments)
         if self._debug_dir_path is not None:
           self._generate_plot(image, page_index, result, self._debug_dir_path)
 
@@ -98,6 +119,7 @@ class DocumentExtractor:
           report_progress(i + 1, len(scan_indexes))
 
     finally:
+      pages.close()
       if should_close:
         document.close()
 
@@ -121,13 +143,7 @@ class DocumentExtractor:
     enable_list.sort()
     scan_list.sort()
 
-    return enable_list, scan_list
-
-  def _page_screenshot_image(self, page: fitz.Page, dpi: int):
-    default_dpi = 72
-    matrix = fitz.Matrix(dpi / default_dpi, dpi / default_dpi)
-    pixmap = page.get_pixmap(matrix=matrix)
-    return frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return scan_list, enable_list
 
   def _generate_plot(self, image: Image, index: int, result: ExtractedResult, plot_path: str):
     plot_image: Image
@@ -139,4 +155,94 @@ class DocumentExtractor:
     plot(plot_image, result.layouts)
     os.makedirs(plot_path, exist_ok=True)
     image_path = os.path.join(plot_path, f"plot_{index + 1}.png")
-    plot_image.save(image_path)
\ No newline at end of file
+    plot_image.save(image_path)
+
+_RenderedPage = tuple[int, Image, list[OCRFragment] | None]
+
+@dataclass
+class _RenderParams:
+  text_layer_dpi: int | None
+  adaptive_dpi: AdaptiveDPI | None
+
+def _render_pages(document: fitz.Document, page_indexes: Sequence[int], params: _RenderParams):
+  for page_index in page_indexes:
+    yield _render_page(document, page_index, params)
+
+# pages are rendered by a background thread ahead of the model, so that the next page is usually ready
+# once the model asks for it. how much rendering really runs alongside inference depends on how long
+# each holds the GIL (PyMuPDF may not release it), so measure before raising it. the bounded queue caps
+# images held in memory.
+def _prefetch_pages(
+      document: fitz.Document,
+      page_indexes: Sequence[int],
+      params: _RenderParams,
+      prefetch_pages: int,
+    ):
+
+  queue: Queue[_RenderedPage | BaseException | None] = Queue(maxsize=prefetch_pages)
+  stopped = Event()
+
+  def put(item: _RenderedPage | BaseException | None) -> bool:
+    while not stopped.is_set():
+      try:
+        queue.put(item, timeout=0.1)
+        return True
+      except Full:
+        pass
+    return False
+
+  def render():
+    try:
+      for page_index in page_indexes:
+        if stopped.is_set():
+          return
+        if not put(_render_page(document, page_index, params)):
+          return
+      put(None)
+    except BaseException as err: # pylint: disable=broad-exception-caught
+      put(err)
+
+  thread = Thread(target=render, name="pdf-page-renderer", daemon=True)
+  thread.start()
+  try:
+    while True:
+      item = queue.get()
+      if item is None:
+        break
+      if isinstance(item, BaseException):
+        raise item
+      yield item
+  finally:
+    stopped.set()
+    while True:
+      try:
+        queue.get_nowait()
+      except Empty:
+        break
+    # the document may be closed right after, so that wait for the page being rendered
+    thread.join()
+
+# pages with a usable text layer skip OCR, so that a lower DPI is enough for layout detection.
+# the DPI is kept in `image.info` so that coordinates of pages rendered at different DPI can be compared.
+def _render_page(document: fitz.Document, page_index: int, params: _RenderParams) -> _RenderedPage:
+  page = document.load_page(page_index)
+  fragments: list[OCRFragment] | None = None
+  dpi = _DEFAULT_DPI
+
+  if params.text_layer_dpi is not None:
+    fragments = read_text_layer_fragments(page, params.text_layer_dpi)
+    if fragments is not None:
+      dpi = params.text_layer_dpi
+
+  if fragments is None and params.adaptive_dpi is not None:
+    dpi = adaptive_page_dpi(page, params.adaptive_dpi)
+
+  image = _page_screenshot_image(page, dpi)
+  image.info["dpi"] = (dpi, dpi)
+  return page_index, image, fragments
+
+def _page_screenshot_image(page: fitz.Page, dpi: int) -> Image:
+  default_dpi = 72
+  matrix = fitz.Matrix(dpi / default_dpi, dpi / default_dpi)
+  pixmap = page.get_pixmap(matrix=matrix)
+  return frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
@@ -0,0 +1,51 @@
+import fitz
+import numpy as np
+
+from .types import AdaptiveDPI
+
+
+_PROBE_DPI = 72 # one pixel per point
+_INK_THRESHOLD = 160
+_MIN_INK_RATE = 0.002
+
+# OCR models read text best around a certain line height in pixels. a quick grayscale probe measures
+# the height of inked rows (text lines) in points, so that large print needs a lower DPI than footnotes.
+def adaptive_page_dpi(page: fitz.Page, policy: AdaptiveDPI) -> int:
+  dpi = float(policy.max_dpi)
+  line_height = _probe_line_height(page)
+  if line_height is not None:
+    dpi = policy.line_height_pixels * _PROBE_DPI / line_height
+
+  width_inches = page.rect.width / 72
+  height_inches = page.rect.height / 72
+  page_area = width_inches * height_inches
+  if page_area > 0.0:
+    dpi = min(dpi, (policy.max_pixels / page_area) ** 0.5)
+
+  dpi = max(float(policy.min_dpi), min(float(policy.max_dpi), dpi))
+  return int(dpi)
+
+def _probe_line_height(page: fitz.Page) -> float | None:
+  scale = _PROBE_DPI / 72
+  pixmap = page.get_pixmap(
+    matrix=fitz.Matrix(scale, scale),
+    colorspace=fitz.csGRAY,
+    alpha=False,
+  )
+  if pixmap.width == 0 or pixmap.height == 0:
+    return None
+
+  pixels = np.frombuffer(pixmap.samples, dtype=np.uint8)
+  pixels = pixels.reshape(pixmap.height, pixmap.stride)[:, :pixmap.width]
+  ink_counts = np.count_nonzero(pixels < _INK_THRESHOLD, axis=1)
+  inked_rows = ink_counts > max(1, int(pixmap.width * _MIN_INK_RATE))
+
+  # lengths of runs of consecutive inked rows
+  padded = np.concatenate(([False], inked_rows, [False])).astype(np.int8)
+  edges = np.flatnonzero(np.diff(padded))
+  run_lengths = edges[1::2] - edges[0::2]
+  run_lengths = run_lengths[run_lengths >= 2] # noise and rules
+
+  if len(run_lengths) == 0:
+    return None
+  return float(np.median(run_lengths)) / scale
@@ -20,6 +20,7 @@ from .utils import contains_cjka
 from .types import (
   Block,
   OCRLevel,
+  AdaptiveDPI,
   Text,
   TextBlock,
   TextKind,
@@ -41,8 +42,23 @@ class PDFPageExtractor:
         extract_formula: bool = True,
         extract_table_format: ExtractedTableFormat | None = None,
         debug_dir_path: str | None = None,
+        prefetch_pages: int = 0,
+        text_layer_dpi: int | None = None,
+        adaptive_dpi: AdaptiveDPI | None = None,
       ) -> None:
 
+    # worker processes rebuild the extractor (and load their own models) from these arguments
+    self._init_args: tuple = (
+      device,
+      model_dir_path,
+      ocr_level,
+      extract_formula,
+      extract_table_format,
+      debug_dir_path,
+      prefetch_pages,
+      text_layer_dpi,
+      adaptive_dpi,
+    )
     if extract_table_format is None:
       if device == "cpu":
         extract_table_format = ExtractedTableFormat.DISABLE
@@ -64,8 +80,14 @@ class PDFPageExtractor:
       extract_table_format=to_pass_table_format,
       model_dir_path=model_dir_path,
       debug_dir_path=debug_dir_path,
+      prefetch_pages=prefetch_pages,
+      text_layer_dpi=text_layer_dpi,
+      adaptive_dpi=adaptive_dpi,
     )
 
+  def __reduce__(self):
+    return (PDFPageExtractor, self._init_args)
+
   def extract(self, pdf: str | Document, report_progress: PDFPageExtractorProgressReport | None = None) -> Generator[Block, None, None]:
     for _, blocks, _ in self.extract_enumerated_blocks_and_image(
       pdf=pdf,
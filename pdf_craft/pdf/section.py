@@ -1,19 +1,43 @@
 from __future__ import annotations
 
+import numpy as np
+
 from typing import Iterable, Sequence, Callable
 from doc_page_extractor import Point, Rectangle, Layout, OCRFragment
 from .text_matcher import check_texts_matching_rate
-from .utils import rate, intersection_area_size
+from .utils import rates, intersection_area_size, axis_aligned_box, boxes_intersection_sizes
 
 class _Shape:
-  def __init__(self, layout: Layout):
+  def __init__(self, layout: Layout, scale: float):
     self.layout: Layout = layout
+    self.rect: Rectangle = _scale_rect(layout.rect, scale)
+    self.fragments: list[OCRFragment] = [
+      OCRFragment(
+        order=fragment.order,
+        text=fragment.text,
+        rank=fragment.rank,
+        rect=_scale_rect(fragment.rect, scale),
+      )
+      for fragment in layout.fragments
+    ] if scale != 1.0 else layout.fragments
     self.pre: list[Layout | None] = [None, None]
     self.nex: list[Layout | None] = [None, None]
+    self.size: tuple[float, float] = self.rect.size
+
+    # fragments relative to the layout, as (x1, y1, x2, y2) boxes to be compared in arrays.
+    # boxes of fragments which are not axis-aligned rectangles are compared by shapely instead.
+    origin = self.rect.lt
+    self.relative_rects: list[Rectangle] = [_relative_rect(origin, f.rect) for f in self.fragments]
+    boxes = [axis_aligned_box(rect) for rect in self.relative_rects]
+    self.is_box_list: list[bool] = [box is not None for box in boxes]
+    self.boxes: np.ndarray = np.array(
+      [box if box is not None else (0.0, 0.0, 1.0, 1.0) for box in boxes],
+      dtype=np.float64,
+    ).reshape(-1, 4)
 
   @property
   def distance2(self) -> float:
-    x, y = self.layout.rect.lt
+    x, y = self.rect.lt
     return x*x + y*y
 
 class Section:
@@ -21,9 +45,11 @@ class Section:
       self,
       page_index: int,
       layouts: Iterable[Layout],
+      scale: float = 1.0,
     ) -> list[Layout]:
+    # pages may be rendered at different DPI, scale their coordinates into the same units before comparing
     self._page_index: int = page_index
-    self._shapes: list[_Shape] = [_Shape(layout) for layout in layouts]
+    self._shapes: list[_Shape] = [_Shape(layout, scale) for layout in layouts]
 
   @property
   def page_index(self) -> int:
@@ -55,39 +81,48 @@ class Section:
   def link_next(self, next: Section, offset: int) -> None:
     assert offset in (1, 2), f"invalid offset {offset}"
     matched_shapes_matrix: list[list[_Shape]] = []
-    for shape in self._shapes:
+    # pylint: disable=W0212
+    next_shapes = next._shapes
+    size_matches = self._size_matches(self._shapes, next_shapes)
+
+    for shape, shape_size_matches in zip(self._shapes, size_matches):
       matched_shapes_matrix.append([
-        # pylint: disable=W0212
-        next_shape for next_shape in next._shapes
-        if self._is_shape_contents_matches(shape, next_shape)
+        next_shapes[j] for j in np.flatnonzero(shape_size_matches)
+        if self._is_shape_contents_matches(shape, next_shapes[j])
       ])
 
     origin_shapes = self._find_origin_shapes(matched_shapes_matrix)
     if origin_shapes is not None:
-      origins = (origin_shapes[0].layout.rect.lt, origin_shapes[1].layout.rect.lt)
+      origins = (origin_shapes[0].rect.lt, origin_shapes[1].rect.lt)
       for shape1, shape2 in self._iter_matched_shapes(origins, matched_shapes_matrix):
         shape1.nex[offset - 1] = shape2
         shape2.pre[offset - 1] = shape1
 
-  def _is_shape_contents_matches(self, shape1: _Shape, shape2: _Shape) -> bool:
+  # whether sizes of each pair of shapes are close enough to be the same framework, as a (N, M) array
+  def _size_matches(self, shapes1: list[_Shape], shapes2: list[_Shape]) -> np.ndarray:
     size_match_rate = 0.95
-    layout1 = shape1.layout
-    layout2 = shape2.layout
-    size1 = layout1.rect.size
-    size2 = layout2.rect.size
-    if rate(size1[0], size2[0]) < size_match_rate or \
-       rate(size1[1], size2[1]) < size_match_rate:
-      return False
+    if len(shapes1) == 0 or len(shapes2) == 0:
+      return np.zeros((len(shapes1), len(shapes2)), dtype=bool)
+
+    sizes1 = np.array([shape.size for shape in shapes1], dtype=np.float64)
+    sizes2 = np.array([shape.size for shape in shapes2], dtype=np.float64)
+    width_rates = rates(sizes1[:, None, 0], sizes2[None, :, 0])
+    height_rates = rates(sizes1[:, None, 1], sizes2[None, :, 1])
+    return (width_rates >= size_match_rate) & (height_rates >= size_match_rate)
 
+  def _is_shape_contents_matches(self, shape1: _Shape, shape2: _Shape) -> bool:
+    size_match_rate = 0.85
     matched_count: int = 0
 
-    for fragment1 in layout1.fragments:
-      for fragment2 in layout2.fragments:
-        if self._is_fragments_matches(layout1, layout2, fragment1, fragment2):
-          matched_count += 1
-          break
+    if len(shape1.fragments) > 0 and len(shape2.fragments) > 0:
+      intersection_rates = self._fragments_intersection_rates(shape1, shape2)
+      for fragment1, fragment_rates in zip(shape1.fragments, intersection_rates):
+        for j in np.flatnonzero(fragment_rates >= size_match_rate):
+          if self._is_texts_matches(fragment1.text, shape2.fragments[j].text):
+            matched_count += 1
+            break
 
-    fragments_count = max(len(layout1.fragments), len(layout2.fragments))
+    fragments_count = max(len(shape1.fragments), len(shape2.fragments))
     if fragments_count == 0:
       return True
 
@@ -97,14 +132,29 @@ class Section:
       (0.0, 0.45, 0.45, 0.6, 0.8, 0.95),
     )
 
-  def _is_fragments_matches(self, layout1: Layout, layout2: Layout, fragment1: OCRFragment, fragment2: OCRFragment) -> bool:
-    size_match_rate = 0.85
-    rect1 = self._relative_rect(layout1.rect.lt, fragment1.rect)
-    rect2 = self._relative_rect(layout2.rect.lt, fragment2.rect)
-    if self._intersection_rate(rect1, rect2) < size_match_rate:
-      return False
-
-    text_rate, text_length = check_texts_matching_rate(fragment1.text, fragment2.text)
+  def _fragments_intersection_rates(self, shape1: _Shape, shape2: _Shape) -> np.ndarray:
+    boxes1 = shape1.boxes
+    boxes2 = shape2.boxes
+    widths, heights = boxes_intersection_sizes(boxes1, boxes2)
+    widths1 = boxes1[:, 2] - boxes1[:, 0]
+    heights1 = boxes1[:, 3] - boxes1[:, 1]
+    widths2 = boxes2[:, 2] - boxes2[:, 0]
+    heights2 = boxes2[:, 3] - boxes2[:, 1]
+    width_rates = widths / np.maximum(widths1[:, None], widths2[None, :])
+    height_rates = heights / np.maximum(heights1[:, None], heights2[None, :])
+    intersection_rates = 0.5 * (width_rates + height_rates)
+
+    for i, is_box1 in enumerate(shape1.is_box_list):
+      for j, is_box2 in enumerate(shape2.is_box_list):
+        if not is_box1 or not is_box2:
+          intersection_rates[i, j] = self._intersection_rate(
+            shape1.relative_rects[i],
+            shape2.relative_rects[j],
+          )
+    return intersection_rates
+
+  def _is_texts_matches(self, text1: str, text2: str) -> bool:
+    text_rate, text_length = check_texts_matching_rate(text1, text2)
     return self._check_group_matches(
       text_rate,
       text_length,
@@ -146,12 +196,12 @@ class Section:
       if len(matched_shapes) == 0:
         continue
 
-      rect1 = self._relative_rect(origins[0], shape1.layout.rect)
+      rect1 = _relative_rect(origins[0], shape1.rect)
       max_area_rate: float = float("-inf")
       matched_shape2: _Shape | None = None
 
       for shape2 in matched_shapes:
-        rect2 = self._relative_rect(origins[1], shape2.layout.rect)
+        rect2 = _relative_rect(origins[1], shape2.rect)
         size_rate = self._intersection_rate(rect1, rect2)
         if size_rate > max_area_rate:
           max_area_rate = size_rate
@@ -167,14 +217,6 @@ class Section:
     else:
       return calculated_rate >= rates_list[-1]
 
-  def _relative_rect(self, origin: Point, rect: Rectangle) -> Rectangle:
-    return Rectangle(
-      lt=(rect.lt[0] - origin[0], rect.lt[1] - origin[1]),
-      rt=(rect.rt[0] - origin[0], rect.rt[1] - origin[1]),
-      lb=(rect.lb[0] - origin[0], rect.lb[1] - origin[1]),
-      rb=(rect.rb[0] - origin[0], rect.rb[1] - origin[1])
-    )
-
   def _intersection_rate(self, rect1: Rectangle, rect2: Rectangle) -> float:
     width1, height1 = rect1.size
     width2, height2 = rect2.size
@@ -182,3 +224,21 @@ class Section:
     width_rate = width / max(width1, width2)
     height_rate = height / max(height1, height2)
     return 0.5 * (width_rate + height_rate)
+
+def _relative_rect(origin: Point, rect: Rectangle) -> Rectangle:
+  return Rectangle(
+    lt=(rect.lt[0] - origin[0], rect.lt[1] - origin[1]),
+    rt=(rect.rt[0] - origin[0], rect.rt[1] - origin[1]),
+    lb=(rect.lb[0] - origin[0], rect.lb[1] - origin[1]),
+    rb=(rect.rb[0] - origin[0], rect.rb[1] - origin[1])
+  )
+
+def _scale_rect(rect: Rectangle, scale: float) -> Rectangle:
+  if scale == 1.0:
+    return rect
+  return Rectangle(
+    lt=(rect.lt[0] * scale, rect.lt[1] * scale),
+    rt=(rect.rt[0] * scale, rect.rt[1] * scale),
+    lb=(rect.lb[0] * scale, rect.lb[1] * scale),
+    rb=(rect.rb[0] * scale, rect.rb[1] * scale),
+  )
@@ -0,0 +1,88 @@
+import fitz
+
+from doc_page_extractor import DocExtractor, ExtractedResult, OCRFragment, Rectangle, Layout
+from doc_page_extractor.overlap import merge_fragments_as_line, remove_overlap_layouts
+from doc_page_extractor.raw_optimizer import RawOptimizer
+from PIL.Image import Image
+
+
+# text layers made by a previous OCR pass lie on top of the scanned image, and are often worse than ours
+_MAX_IMAGE_COVERAGE = 0.85
+_MIN_TEXT_CHARS = 16
+_MAX_INVALID_CHARS_RATE = 0.02
+
+# return None if the page has no usable text layer and has to be recognized by OCR.
+# fragments are lines of the text layer, positioned in the image rendered at `dpi`.
+def read_text_layer_fragments(page: fitz.Page, dpi: int) -> list[OCRFragment] | None:
+  if _images_coverage(page) > _MAX_IMAGE_COVERAGE:
+    return None
+
+  scale = dpi / 72
+  fragments: list[OCRFragment] = []
+  chars_count = 0
+  invalid_chars_count = 0
+  text_page = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+
+  for block in text_page["blocks"]:
+    if block.get("type", 0) != 0:
+      continue
+    for line in block["lines"]:
+      text = "".join(span["text"] for span in line["spans"]).strip()
+      if text == "":
+        continue
+      chars_count += sum(1 for c in text if not c.isspace())
+      invalid_chars_count += text.count("\ufffd")
+      x1, y1, x2, y2 = (v * scale for v in line["bbox"])
+      fragments.append(OCRFragment(
+        order=len(fragments),
+        text=text,
+        rank=1.0, # the text layer is exact
+        rect=Rectangle(
+          lt=(x1, y1),
+          rt=(x2, y1),
+          lb=(x1, y2),
+          rb=(x2, y2),
+        ),
+      ))
+
+  if chars_count < _MIN_TEXT_CHARS:
+    return None
+  if invalid_chars_count / chars_count > _MAX_INVALID_CHARS_RATE:
+    return None
+  return fragments
+
+# the same steps as `DocExtractor.extract()`, except that fragments come from the text layer instead of OCR
+def extract_with_text_layer(
+      doc_extractor: DocExtractor,
+      image: Image,
+      fragments: list[OCRFragment],
+    ) -> ExtractedResult:
+
+  # pylint: disable=protected-access
+  raw_optimizer = RawOptimizer(image, False)
+  layouts: list[Layout] = list(doc_extractor._yolo_extract_layouts(image))
+  layouts = doc_extractor._layouts_matched_by_fragments(fragments, layouts)
+  layouts = remove_overlap_layouts(layouts)
+  layouts = doc_extractor._layout_order.sort(layouts, image.size)
+  layouts = [layout for layout in layouts if doc_extractor._should_keep_layout(layout)]
+  doc_extractor._parse_table_and_formula_layouts(layouts, raw_optimizer)
+
+  for layout in layouts:
+    layout.fragments = merge_fragments_as_line(layout.fragments)
+
+  return ExtractedResult(
+    rotation=0.0,
+    layouts=layouts,
+    extracted_image=image,
+    adjusted_image=None,
+  )
+
+def _images_coverage(page: fitz.Page) -> float:
+  page_area = abs(page.rect)
+  if page_area == 0.0:
+    return 0.0
+  max_area = 0.0
+  for image_info in page.get_image_info():
+    bbox = fitz.Rect(image_info["bbox"]) & page.rect
+    max_area = max(max_area, abs(bbox))
+  return max_area / page_area
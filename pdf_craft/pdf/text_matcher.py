@@ -1,93 +1,70 @@
 import re
-import io
+import sys
 
-from enum import Enum
-from unicodedata import category
-from alphabet_detector import AlphabetDetector
+from collections import deque
+from functools import lru_cache
+from unicodedata import category, name
+from typing import Generator
 
 
 def check_texts_matching_rate(text1: str, text2: str) -> tuple[float, int]:
-  words1: list[str] = list(split_into_words(text1))
-  words2: list[str] = list(split_into_words(text2))
+  words1: list[str] = split_words(text1)
+  words2: list[str] = split_words(text2)
 
   if len(words1) > len(words2):
     words1, words2 = words2, words1
 
-  marked_taken_list: list[bool] = [False] * len(words2)
-  matched_indexes: list[int] = []
-  for word1 in words1:
-    matched_index: int = -1
-    for i, word2 in enumerate(words2):
-      if not marked_taken_list[i] and word1 == word2:
-        marked_taken_list[i] = True
-        matched_index = i
-        break
-    matched_indexes.append(matched_index)
+  # each word takes the first untaken occurrence of the same word in words2
+  occurrences: dict[str, deque[int]] = {}
+  for i, word2 in enumerate(words2):
+    indexes = occurrences.get(word2, None)
+    if indexes is None:
+      indexes = deque()
+      occurrences[word2] = indexes
+    indexes.append(i)
 
   not_matched_count: int = len(words2) - len(words1)
-  for i, matched_index in enumerate(matched_indexes):
-    if matched_index == -1 or i > matched_index:
+  for i, word1 in enumerate(words1):
+    indexes = occurrences.get(word1, None)
+    if not indexes:
+      not_matched_count += 1
+    elif i > indexes.popleft():
       not_matched_count += 1
 
   return 1.0 - not_matched_count / len(words2), len(words2)
 
-class _Phase(Enum):
-  Init = 0,
-  Letter = 1,
-  Character = 2,
-  Number = 3,
-  Space = 4,
-
-def split_into_words(text: str):
-  space_pattern = re.compile(r"\s")
-  number_pattern = re.compile(r"\d")
-  number_signs_pattern = re.compile(r"[\.,']")
-  word_buffer = io.StringIO()
-  phase: _Phase = _Phase.Init
-
-  for char in text:
-    if _is_letter(char):
-      if phase == _Phase.Number:
-        yield word_buffer.getvalue()
-        word_buffer = io.StringIO()
-      word_buffer.write(char)
-      phase = _Phase.Letter
-
-    elif number_pattern.match(char):
-      if phase == _Phase.Letter:
-        yield word_buffer.getvalue()
-        word_buffer = io.StringIO()
-      word_buffer.write(char)
-      phase = _Phase.Letter
-
-    elif phase == _Phase.Number and \
-         number_signs_pattern.match(char):
-      word_buffer.write(char)
-
+# a word is a run of letters (see `_letters_class()`), which may begin with one digit.
+# other characters except spaces are words of their own.
+def split_into_words(text: str) -> Generator[str, None, None]:
+  yield from split_words(text)
+
+def split_words(text: str) -> list[str]:
+  return _words_pattern().findall(text)
+
+# building the letters class takes ~0.1s, so that it is compiled at the first use instead of import
+@lru_cache(maxsize=None)
+def _words_pattern() -> re.Pattern:
+  letters = _letters_class()
+  return re.compile(rf"\d{letters}*|{letters}+|\S")
+
+# Latin, Cyrillic, Greek, or Hebrew letter: a character of category L whose unicode name contains the script.
+# such letters only exist in the BMP and the SMP, so that higher planes (CJK ideographs) are not scanned.
+def _letters_class() -> str:
+  scripts = ("LATIN", "CYRILLIC", "GREEK", "HEBREW")
+  ranges: list[tuple[int, int]] = []
+  for code in range(min(0x20000, sys.maxunicode + 1)):
+    char = chr(code)
+    if not category(char).startswith("L"):
+      continue
+    char_name = name(char, "")
+    if not any(script in char_name for script in scripts):
+      continue
+    if len(ranges) > 0 and ranges[-1][1] == code - 1:
+      ranges[-1] = (ranges[-1][0], code)
     else:
-      if phase == _Phase.Letter or \
-        phase == _Phase.Number:
-        yield word_buffer.getvalue()
-        word_buffer = io.StringIO()
-
-      if space_pattern.match(char):
-        phase = _Phase.Space
-      else: # others (like Chinese character)
-        yield char
-        phase = _Phase.Character
-
-  if phase == _Phase.Letter:
-    yield word_buffer.getvalue()
-
-ad = AlphabetDetector()
-
-# check is Latin, Cyrillic, Greek, or Hebrew letter
-def _is_letter(char: str):
-  if not category(char).startswith("L"):
-    return False
+      ranges.append((code, code))
 
-  # AlphabetDetector unable to process punctuation
-  return ad.is_latin(char) or \
-         ad.is_cyrillic(char) or \
-         ad.is_greek(char) or \
-         ad.is_hebrew(char)
\ No newline at end of file
+  return "[" + "".join(
+    re.escape(chr(begin)) if begin == end else f"{re.escape(chr(begin))}-{re.escape(chr(end))}"
+    for begin, end in ranges
+  ) + "]"
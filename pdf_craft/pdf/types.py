@@ -12,6 +12,15 @@ class OCRLevel(Enum):
   Once = auto()
   OncePerLayout = auto()
 
+# pick the rendering DPI of each scanned page by the height of its text lines,
+# so that the same lines are about `line_height_pixels` high, within the pixels budget.
+@dataclass
+class AdaptiveDPI:
+  min_dpi: int = 150
+  max_dpi: int = 300
+  max_pixels: int = 2480 * 3508 # A4 at 300 DPI
+  line_height_pixels: int = 42
+
 class ExtractedTableFormat(Enum):
   LATEX = auto()
   MARKDOWN = auto()
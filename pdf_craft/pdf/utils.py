@@ -1,4 +1,5 @@
 import re
+import numpy as np
 
 from doc_page_extractor import Rectangle
 from shapely.geometry import Polygon
@@ -12,7 +13,42 @@ def rate(value1: float, value2: float) -> float:
   else:
     return value1 / value2
 
+def rates(values1: np.ndarray, values2: np.ndarray) -> np.ndarray:
+  min_values = np.minimum(values1, values2)
+  max_values = np.maximum(values1, values2)
+  result = np.ones(np.broadcast(min_values, max_values).shape, dtype=np.float64)
+  np.divide(min_values, max_values, out=result, where=(max_values != 0.0))
+  return result
+
+# (x1, y1, x2, y2) if the rectangle is axis-aligned and not empty, otherwise None
+def axis_aligned_box(rect: Rectangle) -> tuple[float, float, float, float] | None:
+  if rect.lt[1] != rect.rt[1] or rect.lb[1] != rect.rb[1] or \
+     rect.lt[0] != rect.lb[0] or rect.rt[0] != rect.rb[0]:
+    return None
+  x1, x2 = sorted((rect.lt[0], rect.rt[0]))
+  y1, y2 = sorted((rect.lt[1], rect.lb[1]))
+  if x1 == x2 or y1 == y2:
+    return None
+  return x1, y1, x2, y2
+
+# the same as `intersection_area_size()` for every pair of boxes of `axis_aligned_box()`, as a (N, M) array.
+# rectangles that touch only on an edge or a corner intersect as a line or a point, whose size is 0 in both directions.
+def boxes_intersection_sizes(boxes1: np.ndarray, boxes2: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  widths = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2]) - np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+  heights = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3]) - np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+  intersected = (widths > 0.0) & (heights > 0.0)
+  return np.where(intersected, widths, 0.0), np.where(intersected, heights, 0.0)
+
 def intersection_area_size(rect1: Rectangle, rect2: Rectangle) -> tuple[float, float]:
+  box1 = axis_aligned_box(rect1)
+  box2 = axis_aligned_box(rect2)
+  if box1 is not None and box2 is not None:
+    width = min(box1[2], box2[2]) - max(box1[0], box2[0])
+    height = min(box1[3], box2[3]) - max(box1[1], box2[1])
+    if width <= 0.0 or height <= 0.0:
+      return 0.0, 0.0
+    return width, height
+
   poly1 = Polygon(rect1)
   poly2 = Polygon(rect2)
   intersection = poly1.intersection(poly2)
@@ -1,3 +1,3 @@
 from .encoder import encode, encode_friendly
-from .decoder import decode_friendly
+from .decoder import decode_friendly, decode_friendly_by_priority
 from .utils import clone
\ No newline at end of file
@@ -18,6 +18,18 @@ def decode_friendly(chars: Iterable[str], tags: Iterable[str] | str = ()) -> Gen
     if element.tag in tags or len(tags) == 0:
       yield clone(element)
 
+# parse once, then pick elements of the first tag found in `tags` by priority (or all elements if none is found).
+# returns the tag found and its elements.
+def decode_friendly_by_priority(chars: Iterable[str], tags: Iterable[str]) -> tuple[str | None, list[Element]]:
+  # an element is not changed after it's closed, except its tail which `clone()` ignores.
+  # so that only picked elements are cloned.
+  elements = list(_collect_elements(chars))
+  for tag in tags:
+    picked = [clone(e) for e in elements if e.tag == tag]
+    if picked:
+      return tag, picked
+  return None, [clone(e) for e in elements]
+
 def _collect_elements(chars: Iterable[str]) -> Generator[Element, None, None]:
   opening_stack: list[Element] = []
   last_closed_element: Element | None = None
@@ -1,75 +1,79 @@
-from io import StringIO
 from typing import Callable
+from functools import lru_cache
 from html import escape as escape_html
 from xml.etree.ElementTree import Element
 
 from .tag import Tag, TagKind
-from .parser import parse_tags
+from .parser import parse_tags, may_contain_tags
 from .transform import element_to_tag
 
 # why implement XML encoding?
 # https://github.com/oomol-lab/pdf-craft/issues/149
 def encode_friendly(element: Element, indent: int = 2) -> str:
-  buffer = StringIO()
+  parts: list[str] = []
   _encode_element(
-    buffer=buffer,
+    parts=parts,
     element=element,
     indent=indent,
     depth=0,
     escape=_escape_text,
   )
-  return buffer.getvalue()
+  return "".join(parts)
 
 def _escape_text(text: str) -> str:
-  buffer = StringIO()
-  for cell in parse_tags(text):
-    if isinstance(cell, Tag):
-      cell = escape_html(str(cell))
-    buffer.write(cell)
-  return buffer.getvalue()
+  if not may_contain_tags(text):
+    return text
+  return _escape_tags(text)
+
+# the same texts are encoded again and again (to count tokens of requests, then to send them)
+@lru_cache(maxsize=4096)
+def _escape_tags(text: str) -> str:
+  return "".join(
+    escape_html(str(cell)) if isinstance(cell, Tag) else cell
+    for cell in parse_tags(text)
+  )
 
 def encode(element: Element, indent: int = 2) -> str:
-  buffer = StringIO()
+  parts: list[str] = []
   _encode_element(
-    buffer=buffer,
+    parts=parts,
     element=element,
     indent=indent,
     depth=0,
     escape=escape_html,
   )
-  return buffer.getvalue()
+  return "".join(parts)
 
 _TINY_TEXT_LEN = 35
 
 def _encode_element(
-      buffer: StringIO,
+      parts: list[str],
       element: Element,
       indent: int,
       depth: int,
       escape: Callable[[str], str],
     ) -> None:
 
-  _write_indent(buffer, indent, depth)
+  parts.append(" " * (indent * depth))
   if len(element) == 0 and not element.text:
     tag = element_to_tag(element, TagKind.SELF_CLOSING)
-    buffer.write(str(tag))
+    parts.append(str(tag))
   else:
     text = (element.text or "").strip()
     opening_tag = element_to_tag(element, TagKind.OPENING)
-    closing_tag = element_to_tag(element, TagKind.CLOSING)
-    buffer.write(str(opening_tag))
+    parts.append(str(opening_tag))
     is_one_line = len(text) <= _TINY_TEXT_LEN and len(element) == 0
+    child_indent = "\n" + " " * (indent * (depth + 1))
 
     if text:
       if not is_one_line:
-        buffer.write("\n")
-        _write_indent(buffer, indent, depth + 1)
-      buffer.write(escape(text))
+        parts.append(child_indent)
+      parts.append(escape(text))
 
     for child in element:
-      buffer.write("\n")
+      parts.append("\n")
       _encode_element(
-        buffer=buffer,
+        parts=parts,
         element=child,
         indent=indent,
         depth=depth + 1,
@@ -77,16 +81,12 @@ def _encode_element(
       )
       child_tail = (child.tail or "").strip()
       if child_tail:
-        buffer.write("\n")
-        _write_indent(buffer, indent, depth + 1)
-        buffer.write(escape(child_tail))
+        parts.append(child_indent)
+        parts.append(escape(child_tail))
 
     if not is_one_line:
-      buffer.write("\n")
-      _write_indent(buffer, indent, depth)
-
-    buffer.write(str(closing_tag))
+      parts.append("\n")
+      parts.append(" " * (indent * depth))
 
-def _write_indent(buffer: StringIO, indent: int, depth: int) -> None:
-  for _ in range(indent * depth):
-    buffer.write(" ")
\ No newline at end of file
+    # the name has been checked with the opening tag
+    parts.append(f"</{opening_tag.name}>")
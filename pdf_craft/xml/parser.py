@@ -1,4 +1,5 @@
-from io import StringIO
+import re
+
 from typing import Generator, Iterable
 from enum import auto, Enum
 from .tag import is_valid_name_char, is_valid_value_char, Tag, TagKind
@@ -6,8 +7,20 @@ from .tag import is_valid_name_char, is_valid_value_char, Tag, TagKind
 
 _SPACES = (" ", "\n")
 
+# a well-formed tag matched at once. the same syntax as the state machine of `_scan_tag()`,
+# which handles everything else (malformed tags, and tags cut off by the end of a chunk).
+_TAG_PATTERN = re.compile(
+  r"<(/?)([a-zA-Z0-9_\-]+)"
+  r"(?:[ \n]+((?:[a-zA-Z0-9_\-]+=\"[a-zA-Z0-9_\-,./]*\"[ \n]*)*))?"
+  r"(/?)>"
+)
+_ATTRIBUTE_PATTERN = re.compile(r"([a-zA-Z0-9_\-]+)=\"([a-zA-Z0-9_\-,./]*)\"")
+
+# a tag only succeeds at ">". before it arrives, scanning a tag cut off by chunks again and again is
+# a waste, unless there is so much text after "<" that the outside text should be yielded in time.
+_MAX_DEFERRED_LENGTH = 256
+
 class _Phase(Enum):
-  OUTSIDE = auto()
   LEFT_BRACKET = auto()
   LEFT_SLASH = auto()
   TAG_NAME = auto()
@@ -22,151 +35,191 @@ class _ParsedResult(Enum):
   Success = auto()
   Failed = auto()
 
-def parse_tags(chars: Iterable[str]) -> Generator[str | Tag, None, None]:
-  yield from _XMLTagsParser().do(chars)
+# a text without any tag-like substring is parsed into itself. parse_tags() must be called to make sure.
+def may_contain_tags(text: str) -> bool:
+  return _TAG_PATTERN.search(text) is not None
 
-class _XMLTagsParser:
+# chars can be a string, or chunks of a string (such as a streaming response)
+def parse_tags(chars: Iterable[str]) -> Generator[str | Tag, None, None]:
+  parser = XMLTagsParser()
+  if isinstance(chars, str):
+    chars = (chars,)
+  for chunk in chars:
+    yield from parser.feed(chunk)
+  yield from parser.end()
+
+# text outside valid tags is yielded as a whole between two valid tags.
+# a malformed tag is treated as text, until the char where it goes wrong.
+class XMLTagsParser:
   def __init__(self):
-    self._outside_buffer: StringIO = StringIO()
-    self._tag_buffer: StringIO = StringIO()
-    self._tag: Tag | None = None
-    self._phase: _Phase = _Phase.OUTSIDE
-
-  def do(self, chars: Iterable[str]) -> Generator[str | Tag, None, None]:
-    for char in chars:
-      parsed_result = self._parse_char(char)
-      yield from self._generate_by_result(parsed_result)
-
-    self._outside_buffer.write(self._tag_buffer.getvalue())
-    outside_text = self._outside_buffer.getvalue()
+    self._outside_texts: list[str] = []
+    self._pending: str = "" # begins with a tag not finished yet
+
+  def feed(self, chunk: str) -> Generator[str | Tag, None, None]:
+    text = self._pending + chunk
+    self._pending = ""
+    index = 0
+
+    while True:
+      begin = text.find("<", index)
+      if begin == -1:
+        self._outside_texts.append(text[index:])
+        break
+
+      self._outside_texts.append(text[index:begin])
+      parsed_result, end, tag = _match_tag(text, begin)
+
+      if parsed_result == _ParsedResult.Continue:
+        self._pending = text[begin:]
+        break
+
+      elif parsed_result == _ParsedResult.Failed:
+        self._outside_texts.append(text[begin:end])
+
+      elif _is_tag_valid(tag):
+        outside_text = "".join(self._outside_texts)
+        self._outside_texts.clear()
+        if outside_text != "":
+          yield outside_text
+        yield tag
+
+      else:
+        tag.proto = text[begin:end]
+        self._outside_texts.append(tag.proto)
+
+      index = end
+
+  def end(self) -> Generator[str, None, None]:
+    self._outside_texts.append(self._pending)
+    self._pending = ""
+    outside_text = "".join(self._outside_texts)
+    self._outside_texts.clear()
     if outside_text != "":
       yield outside_text
 
-  def _parse_char(self, char: str) -> _ParsedResult:
-    parsed_result: _ParsedResult = _ParsedResult.Continue
+# returns the result, the index after the last char consumed, and the tag if succeeded
+def _match_tag(text: str, begin: int) -> tuple[_ParsedResult, int, Tag | None]:
+  if len(text) - begin < _MAX_DEFERRED_LENGTH and text.find(">", begin) == -1:
+    return _ParsedResult.Continue, len(text), None
+
+  matched = _TAG_PATTERN.match(text, begin)
+  if matched is None:
+    return _scan_tag(text, begin)
+
+  slash, name, attributes, self_closing = matched.groups()
+  if slash and self_closing:
+    return _scan_tag(text, begin) # a closing tag can't be self-closing
+
+  kind = TagKind.OPENING
+  if slash:
+    kind = TagKind.CLOSING
+  elif self_closing:
+    kind = TagKind.SELF_CLOSING
+
+  return _ParsedResult.Success, matched.end(), Tag(
+    kind=kind,
+    name=name,
+    proto="",
+    attributes=_ATTRIBUTE_PATTERN.findall(attributes) if attributes else [],
+  )
+
+# scan char by char from "<", until the tag is finished, goes wrong, or the text ends (Continue)
+def _scan_tag(text: str, begin: int) -> tuple[_ParsedResult, int, Tag | None]:
+  phase: _Phase = _Phase.LEFT_BRACKET
+  tag = Tag(
+    kind=TagKind.OPENING,
+    name="",
+    proto="",
+    attributes=[],
+  )
+  for index in range(begin + 1, len(text)):
+    char = text[index]
+    parsed_result = _ParsedResult.Continue
+
+    if phase == _Phase.LEFT_BRACKET:
+      if char == "/":
+        tag.kind = TagKind.CLOSING
+        phase = _Phase.LEFT_SLASH
+      elif is_valid_name_char(char):
+        tag.name += char
+        phase = _Phase.TAG_NAME
+      else:
+        parsed_result = _ParsedResult.Failed
 
-    if self._phase == _Phase.OUTSIDE:
-      if char != "<":
-        self._outside_buffer.write(char)
+    elif phase == _Phase.LEFT_SLASH:
+      if is_valid_name_char(char):
+        tag.name += char
+        phase = _Phase.TAG_NAME
       else:
-        self._phase = _Phase.LEFT_BRACKET
-        self._tag_buffer.write(char)
-        self._tag = Tag(
-          kind=TagKind.OPENING,
-          name="",
-          proto="",
-          attributes=[],
-        )
-    else:
-      self._tag_buffer.write(char)
-
-      if self._phase == _Phase.LEFT_BRACKET:
-        if char == "/":
-          self._tag.kind = TagKind.CLOSING
-          self._phase = _Phase.LEFT_SLASH
-        elif is_valid_name_char(char):
-          self._tag.name += char
-          self._phase = _Phase.TAG_NAME
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.LEFT_SLASH:
-        if is_valid_name_char(char):
-          self._tag.name += char
-          self._phase = _Phase.TAG_NAME
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.TAG_NAME:
-        if char in _SPACES:
-          self._phase = _Phase.TAG_GAP
-        elif is_valid_name_char(char):
-          self._tag.name += char
-        elif char == ">":
-          parsed_result = _ParsedResult.Success
-        elif char == "/" and self._tag.kind == TagKind.OPENING:
-          self._tag.kind = TagKind.SELF_CLOSING
-          self._phase = _Phase.MUST_CLOSING_SIGN
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.TAG_GAP:
-        if char in _SPACES:
-          pass
-        elif is_valid_name_char(char):
-          self._tag.attributes.append((char, ""))
-          self._phase = _Phase.ATTRIBUTE_NAME
-        elif char == ">":
-          parsed_result = _ParsedResult.Success
-        elif char == "/" and self._tag.kind == TagKind.OPENING:
-          self._tag.kind = TagKind.SELF_CLOSING
-          self._phase = _Phase.MUST_CLOSING_SIGN
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.ATTRIBUTE_NAME:
-        if is_valid_name_char(char):
-          attr_name, attr_value = self._tag.attributes[-1]
-          attr_name = attr_name + char
-          self._tag.attributes[-1] = (attr_name, attr_value)
-        elif char == "=":
-          self._phase = _Phase.ATTRIBUTE_NAME_EQUAL
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.ATTRIBUTE_NAME_EQUAL:
-        if char == "\"":
-          self._phase = _Phase.ATTRIBUTE_VALUE
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.ATTRIBUTE_VALUE:
-        if is_valid_value_char(char):
-          attr_name, attr_value = self._tag.attributes[-1]
-          attr_value = attr_value + char
-          self._tag.attributes[-1] = (attr_name, attr_value)
-        elif char == "\"":
-          self._phase = _Phase.TAG_GAP
-        else:
-          parsed_result = _ParsedResult.Failed
-
-      elif self._phase == _Phase.MUST_CLOSING_SIGN:
-        if char == ">":
-          parsed_result = _ParsedResult.Success
-        else:
-          parsed_result = _ParsedResult.Failed
-
-    return parsed_result
-
-  def _generate_by_result(self, parsed_result: _ParsedResult) -> Generator[str | Tag, None, None]:
-    if parsed_result == _ParsedResult.Success:
-      assert self._tag is not None
-      if self._is_tag_valid(self._tag):
-        outside_text = self._outside_buffer.getvalue()
-        self._clear_buffer(self._outside_buffer)
-        self._clear_buffer(self._tag_buffer)
-        if outside_text != "":
-          yield outside_text
-        yield self._tag
+        parsed_result = _ParsedResult.Failed
+
+    elif phase == _Phase.TAG_NAME:
+      if char in _SPACES:
+        phase = _Phase.TAG_GAP
+      elif is_valid_name_char(char):
+        tag.name += char
+      elif char == ">":
+        parsed_result = _ParsedResult.Success
+      elif char == "/" and tag.kind == TagKind.OPENING:
+        tag.kind = TagKind.SELF_CLOSING
+        phase = _Phase.MUST_CLOSING_SIGN
+      else:
+        parsed_result = _ParsedResult.Failed
+
+    elif phase == _Phase.TAG_GAP:
+      if char in _SPACES:
+        pass
+      elif is_valid_name_char(char):
+        tag.attributes.append((char, ""))
+        phase = _Phase.ATTRIBUTE_NAME
+      elif char == ">":
+        parsed_result = _ParsedResult.Success
+      elif char == "/" and tag.kind == TagKind.OPENING:
+        tag.kind = TagKind.SELF_CLOSING
+        phase = _Phase.MUST_CLOSING_SIGN
       else:
-        self._tag.proto = self._tag_buffer.getvalue()
-        self._outside_buffer.write(self._tag.proto)
-        self._clear_buffer(self._tag_buffer)
-      self._tag = None
-      self._phase = _Phase.OUTSIDE
+        parsed_result = _ParsedResult.Failed
+
+    elif phase == _Phase.ATTRIBUTE_NAME:
+      if is_valid_name_char(char):
+        attr_name, attr_value = tag.attributes[-1]
+        tag.attributes[-1] = (attr_name + char, attr_value)
+      elif char == "=":
+        phase = _Phase.ATTRIBUTE_NAME_EQUAL
+      else:
+        parsed_result = _ParsedResult.Failed
 
+    elif phase == _Phase.ATTRIBUTE_NAME_EQUAL:
+      if char == "\"":
+        phase = _Phase.ATTRIBUTE_VALUE
+      else:
+        parsed_result = _ParsedResult.Failed
+
+    elif phase == _Phase.ATTRIBUTE_VALUE:
+      if is_valid_value_char(char):
+        attr_name, attr_value = tag.attributes[-1]
+        tag.attributes[-1] = (attr_name, attr_value + char)
+      elif char == "\"":
+        phase = _Phase.TAG_GAP
+      else:
+        parsed_result = _ParsedResult.Failed
+
+    elif phase == _Phase.MUST_CLOSING_SIGN:
+      if char == ">":
+        parsed_result = _ParsedResult.Success
+      else:
+        parsed_result = _ParsedResult.Failed
+
+    if parsed_result == _ParsedResult.Success:
+      return parsed_result, index + 1, tag
     elif parsed_result == _ParsedResult.Failed:
-      self._outside_buffer.write(self._tag_buffer.getvalue())
-      self._clear_buffer(self._tag_buffer)
-      self._phase = _Phase.OUTSIDE
-
-  def _is_tag_valid(self, tag: Tag) -> bool:
-    if tag.kind == TagKind.CLOSING and len(tag.attributes) > 0:
-      return False
-    if tag.find_invalid_name() is not None:
-      return False
-    return True
-
-  def _clear_buffer(self, buffer: StringIO):
-    buffer.truncate(0)
-    buffer.seek(0)
\ No newline at end of file
+      return parsed_result, index + 1, None
+
+  return _ParsedResult.Continue, len(text), None
+
+def _is_tag_valid(tag: Tag) -> bool:
+  if tag.kind == TagKind.CLOSING and len(tag.attributes) > 0:
+    return False
+  if tag.find_invalid_name() is not None:
+    return False
+  return True
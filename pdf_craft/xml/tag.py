@@ -1,9 +1,14 @@
-from io import StringIO
+import re
+
 from enum import auto, Enum
 from typing import Generator
 from dataclasses import dataclass
 
 
+# the same chars as is_valid_value_char()
+_VALUE_PATTERN = re.compile(r"[a-zA-Z0-9_\-,./]*")
+_NAME_PATTERN = re.compile(r"[a-zA-Z_][a-zA-Z0-9_\-,./]*")
+
 class TagKind(Enum):
   OPENING = auto()
   CLOSING = auto()
@@ -17,49 +22,27 @@ class Tag:
   attributes: list[tuple[str, str]]
 
   def __str__(self):
-    buffer = StringIO()
-    buffer.write("<")
+    attributes = "".join(f" {name}=\"{value}\"" for name, value in self.attributes)
     if self.kind == TagKind.CLOSING:
-      buffer.write("/")
-    buffer.write(self.name)
-    if len(self.attributes) > 0:
-      buffer.write(" ")
-      for i, (attr_name, attr_value) in enumerate(self.attributes):
-        buffer.write(attr_name)
-        buffer.write("=")
-        buffer.write("\"")
-        buffer.write(attr_value)
-        buffer.write("\"")
-        if i < len(self.attributes) - 1:
-          buffer.write(" ")
-    if self.kind == TagKind.SELF_CLOSING:
-      buffer.write("/>")
+      return f"</{self.name}{attributes}>"
+    elif self.kind == TagKind.SELF_CLOSING:
+      return f"<{self.name}{attributes}/>"
     else:
-      buffer.write(">")
-    return buffer.getvalue()
+      return f"<{self.name}{attributes}>"
 
   def find_invalid_name(self) -> str | None:
     for name in self._iter_tag_names():
-      if not all(is_valid_value_char(c) for c in name):
-        return name
       # https://www.w3schools.com/xml/xml_elements.asp
       # The following logic enforces a subset of XML naming rules:
       # - Names must not be empty.
       # - Names must start with a letter (a-z, A-Z) or an underscore (_).
-      if name == "":
+      if _NAME_PATTERN.fullmatch(name) is None:
         return name
-      char = name[0]
-      if char == "_":
-        continue
-      if "a" <= char <= "z" or "A" <= char <= "Z":
-        continue
-      return name
-
     return None
 
   def find_invalid_attr_value(self) -> tuple[str, str] | None:
     for attr_name, attr_value in self.attributes:
-      if not all(is_valid_value_char(c) for c in attr_value):
+      if _VALUE_PATTERN.fullmatch(attr_value) is None:
         return attr_name, attr_value
     return None
 
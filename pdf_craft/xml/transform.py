@@ -16,9 +16,7 @@ def element_to_tag(element: Element, kind: TagKind, proto: str = "") -> Tag:
     attributes=[],
   )
   if kind != TagKind.CLOSING:
-    for attr_name in sorted(list(element.keys())):
-      attr_value = element.get(attr_name, "")
-      tag.attributes.append((attr_name, attr_value))
+    tag.attributes.extend(sorted(element.items()))
 
   # To make LLM easier to understand, the naming here is restricted in a more strict way.
   # https://github.com/oomol-lab/pdf-craft/issues/149
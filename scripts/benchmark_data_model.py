@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+from dataclasses import dataclass
+from xml.etree.ElementTree import Element
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "..", "..")))
+
+from pdf_craft.analysers.sequence import decode_paragraph
+from pdf_craft.analysers.data import LayoutKind
+
+
+# compares the memory taken by paragraphs of pdf_craft.analysers.data with their previous
+# implementation (kept below), decoded from the same XMLs of a generated 1000-page book.
+_PAGES = 1000
+_PARAGRAPHS_PER_PAGE = 8
+_ASSETS = 300
+
+def main():
+  paragraph_xmls = list(_generate_paragraph_xmls())
+  lines_count = sum(len(layout) for paragraph in paragraph_xmls for layout in paragraph)
+  print(f"{_PAGES} pages, {len(paragraph_xmls)} paragraphs, {lines_count} lines")
+
+  legacy_bytes, legacy_duration = _measure(_legacy_decode_paragraph, paragraph_xmls)
+  current_bytes, current_duration = _measure(decode_paragraph, paragraph_xmls)
+  print(f"legacy: {legacy_bytes / 1024 / 1024:.1f} MB, decoded in {legacy_duration:.3f}s")
+  print(f"current: {current_bytes / 1024 / 1024:.1f} MB, decoded in {current_duration:.3f}s")
+  print(f"memory reduced by {1.0 - current_bytes / legacy_bytes:.1%}")
+
+def _measure(decode, paragraph_xmls: list[Element]) -> tuple[int, float]:
+  tracemalloc.start()
+  begin = time.perf_counter()
+  paragraphs = [
+    decode(element, page_index, order_index)
+    for element, page_index, order_index in _indexed(paragraph_xmls)
+  ]
+  duration = time.perf_counter() - begin
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  assert len(paragraphs) == len(paragraph_xmls)
+  return size, duration
+
+def _indexed(paragraph_xmls: list[Element]):
+  for i, element in enumerate(paragraph_xmls):
+    yield element, i // _PARAGRAPHS_PER_PAGE + 1, i % _PARAGRAPHS_PER_PAGE + 1
+
+def _generate_paragraph_xmls():
+  rand = random.Random(42)
+  words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+  asset_hashes = [rand.randbytes(32).hex() for _ in range(_ASSETS)]
+
+  for page_index in range(1, _PAGES + 1):
+    for order_index in range(1, _PARAGRAPHS_PER_PAGE + 1):
+      paragraph = Element("paragraph")
+      paragraph.set("type", "text")
+      for i in range(rand.randint(1, 3)):
+        kind = rand.choice((LayoutKind.TEXT, LayoutKind.TEXT, LayoutKind.TEXT, LayoutKind.FIGURE))
+        layout = Element(kind.value)
+        layout.set("id", f"{page_index}/{order_index * 10 + i}")
+        if kind == LayoutKind.FIGURE:
+          layout.set("hash", rand.choice(asset_hashes))
+        for _ in range(rand.randint(1, 8)):
+          line = Element("line")
+          line.text = " ".join(rand.choices(words, k=10))
+          line.set("confidence", "{:.2f}".format(rand.uniform(0.6, 1.0)))
+          layout.append(line)
+        paragraph.append(layout)
+      yield paragraph
+
+@dataclass
+class _LegacyParagraph:
+  type: str
+  page_index: int
+  order_index: int
+  layouts: list["_LegacyLayout"]
+
+@dataclass
+class _LegacyLayout:
+  kind: LayoutKind
+  page_index: int
+  order_index: int
+  caption: "_LegacyCaption"
+  lines: list["_LegacyLine"]
+
+@dataclass
+class _LegacyAssetLayout(_LegacyLayout):
+  hash: bytes
+
+@dataclass
+class _LegacyCaption:
+  lines: list["_LegacyLine"]
+
+@dataclass
+class _LegacyLine:
+  text: str
+  confidence: str
+
+def _legacy_decode_paragraph(element: Element, page_index: int, order_index: int):
+  return _LegacyParagraph(
+    type=element.get("type"),
+    page_index=page_index,
+    order_index=order_index,
+    layouts=[_legacy_decode_layout(e) for e in element],
+  )
+
+def _legacy_decode_layout(element: Element) -> _LegacyLayout:
+  kind = LayoutKind(element.tag)
+  page_index, order_index = element.get("id").split("/", maxsplit=1)
+  lines = [
+    _LegacyLine(
+      text=(line_element.text or "").strip(),
+      confidence=line_element.get("confidence"),
+    )
+    for line_element in element
+    if line_element.tag == "line"
+  ]
+  if kind == LayoutKind.FIGURE:
+    return _LegacyAssetLayout(
+      kind=kind,
+      hash=bytes.fromhex(element.get("hash", "")),
+      page_index=int(page_index),
+      order_index=int(order_index),
+      caption=_LegacyCaption(lines=[]),
+      lines=lines,
+    )
+  return _LegacyLayout(
+    kind=kind,
+    page_index=int(page_index),
+    order_index=int(order_index),
+    caption=_LegacyCaption(lines=[]),
+    lines=lines,
+  )
+
+if __name__ == "__main__":
+  main()
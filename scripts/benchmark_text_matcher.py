@@ -0,0 +1,146 @@
+import os
+import re
+import io
+import sys
+import time
+import fitz
+
+from enum import Enum
+from unicodedata import category
+from alphabet_detector import AlphabetDetector
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "..", "..")))
+
+from pdf_craft.pdf.text_matcher import check_texts_matching_rate, split_into_words
+
+
+# compares pdf_craft.pdf.text_matcher with its previous implementation (kept below) on
+# pairs of lines from neighbouring pages of the PDF files in tests/assets.
+def main():
+  assets_path = os.path.abspath(os.path.join(__file__, "..", "..", "tests", "assets"))
+  pages_lines = list(_read_pages_lines(assets_path))
+  texts = [line for lines in pages_lines for line in lines]
+  pairs: list[tuple[str, str]] = []
+  for lines1, lines2 in zip(pages_lines, pages_lines[1:]):
+    for line1 in lines1[:40]:
+      for line2 in lines2[:40]:
+        pairs.append((line1, line2))
+
+  print(f"{len(texts)} lines, {len(pairs)} pairs")
+  for text in texts:
+    assert list(split_into_words(text)) == list(_legacy_split_into_words(text)), text
+  for text1, text2 in pairs:
+    assert check_texts_matching_rate(text1, text2) == _legacy_check_texts_matching_rate(text1, text2), (text1, text2)
+  print("results are identical")
+
+  _benchmark("split_into_words", texts, lambda text: list(_legacy_split_into_words(text)), lambda text: list(split_into_words(text)))
+  _benchmark("check_texts_matching_rate", pairs, lambda p: _legacy_check_texts_matching_rate(*p), lambda p: check_texts_matching_rate(*p))
+
+def _benchmark(title: str, inputs: list, legacy, current):
+  legacy_duration = _measure(legacy, inputs)
+  current_duration = _measure(current, inputs)
+  print(f"{title}: legacy {legacy_duration:.3f}s, current {current_duration:.3f}s, {legacy_duration / current_duration:.1f}x")
+
+def _measure(func, inputs: list) -> float:
+  begin = time.perf_counter()
+  for item in inputs:
+    func(item)
+  return time.perf_counter() - begin
+
+def _read_pages_lines(assets_path: str):
+  for file_name in sorted(os.listdir(assets_path)):
+    if not file_name.endswith(".pdf"):
+      continue
+    with fitz.open(os.path.join(assets_path, file_name)) as document:
+      for page in document:
+        lines = [line.strip() for line in page.get_text().splitlines()]
+        lines = [line for line in lines if line != ""]
+        if len(lines) > 0:
+          yield lines
+
+def _legacy_check_texts_matching_rate(text1: str, text2: str) -> tuple[float, int]:
+  words1: list[str] = list(_legacy_split_into_words(text1))
+  words2: list[str] = list(_legacy_split_into_words(text2))
+
+  if len(words1) > len(words2):
+    words1, words2 = words2, words1
+
+  marked_taken_list: list[bool] = [False] * len(words2)
+  matched_indexes: list[int] = []
+  for word1 in words1:
+    matched_index: int = -1
+    for i, word2 in enumerate(words2):
+      if not marked_taken_list[i] and word1 == word2:
+        marked_taken_list[i] = True
+        matched_index = i
+        break
+    matched_indexes.append(matched_index)
+
+  not_matched_count: int = len(words2) - len(words1)
+  for i, matched_index in enumerate(matched_indexes):
+    if matched_index == -1 or i > matched_index:
+      not_matched_count += 1
+
+  return 1.0 - not_matched_count / len(words2), len(words2)
+
+class _Phase(Enum):
+  Init = 0,
+  Letter = 1,
+  Character = 2,
+  Number = 3,
+  Space = 4,
+
+def _legacy_split_into_words(text: str):
+  space_pattern = re.compile(r"\s")
+  number_pattern = re.compile(r"\d")
+  number_signs_pattern = re.compile(r"[\.,']")
+  word_buffer = io.StringIO()
+  phase: _Phase = _Phase.Init
+
+  for char in text:
+    if _is_letter(char):
+      if phase == _Phase.Number:
+        yield word_buffer.getvalue()
+        word_buffer = io.StringIO()
+      word_buffer.write(char)
+      phase = _Phase.Letter
+
+    elif number_pattern.match(char):
+      if phase == _Phase.Letter:
+        yield word_buffer.getvalue()
+        word_buffer = io.StringIO()
+      word_buffer.write(char)
+      phase = _Phase.Letter
+
+    elif phase == _Phase.Number and \
+         number_signs_pattern.match(char):
+      word_buffer.write(char)
+
+    else:
+      if phase == _Phase.Letter or \
+        phase == _Phase.Number:
+        yield word_buffer.getvalue()
+        word_buffer = io.StringIO()
+
+      if space_pattern.match(char):
+        phase = _Phase.Space
+      else: # others (like Chinese character)
+        yield char
+        phase = _Phase.Character
+
+  if phase == _Phase.Letter:
+    yield word_buffer.getvalue()
+
+ad = AlphabetDetector()
+
+def _is_letter(char: str):
+  if not category(char).startswith("L"):
+    return False
+
+  return ad.is_latin(char) or \
+         ad.is_cyrillic(char) or \
+         ad.is_greek(char) or \
+         ad.is_hebrew(char)
+
+if __name__ == "__main__":
+  main()
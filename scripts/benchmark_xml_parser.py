@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import random
+
+from io import StringIO
+from enum import auto, Enum
+from typing import Generator, Iterable
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "..", "..")))
+
+from pdf_craft.xml import decode_friendly, decode_friendly_by_priority
+from pdf_craft.xml.parser import parse_tags
+from pdf_craft.xml.tag import is_valid_name_char, is_valid_value_char, Tag, TagKind
+
+
+# compares pdf_craft.xml.parser with its previous char-by-char implementation (kept below) on
+# responses built from the recorded chunks of tests/serial_chunks and from generated sequence
+# responses, and compares the selection of LLM._encode_xml (decoding once per tag) with
+# decode_friendly_by_priority (decoding once).
+_SEQUENCE_RESPONSES = 200
+_COMMON_TAGS = ["correction", "overview", "updation", "request", "result", "output"]
+
+def main():
+  responses = list(_read_recorded_responses()) + list(_generate_sequence_responses())
+  chunked_responses = [_split_into_chunks(response) for response in responses]
+  print(f"{len(responses)} responses, {sum(len(r) for r in responses)} chars")
+
+  for response, chunks in zip(responses, chunked_responses):
+    legacy_cells = _cells(_legacy_parse_tags(response))
+    assert _cells(parse_tags(response)) == legacy_cells
+    assert _cells(parse_tags(chunks)) == legacy_cells
+    assert _legacy_select(response) == _select(response)
+  print("results are identical")
+
+  _benchmark("parse_tags", responses, lambda r: list(_legacy_parse_tags(r)), lambda r: list(parse_tags(r)))
+  _benchmark("parse_tags (streaming)", chunked_responses, lambda c: list(_legacy_parse_tags(_chars(c))), lambda c: list(parse_tags(c)))
+  _benchmark("select root element", responses, _legacy_select, _select)
+
+def _benchmark(title: str, inputs: list, legacy, current):
+  legacy_duration = _measure(legacy, inputs)
+  current_duration = _measure(current, inputs)
+  print(f"{title}: legacy {legacy_duration:.3f}s, current {current_duration:.3f}s, {legacy_duration / current_duration:.1f}x")
+
+# best of 3 runs
+def _measure(func, inputs: list) -> float:
+  durations: list[float] = []
+  for _ in range(3):
+    begin = time.perf_counter()
+    for item in inputs:
+      func(item)
+    durations.append(time.perf_counter() - begin)
+  return min(durations)
+
+def _cells(cells: Iterable[str | Tag]) -> list:
+  return [
+    (cell.kind, cell.name, tuple(cell.attributes), cell.proto)
+    if isinstance(cell, Tag) else cell
+    for cell in cells
+  ]
+
+def _chars(chunks: list[str]):
+  for chunk in chunks:
+    yield from chunk
+
+# what LLM._encode_xml did: decode the whole response again for each tag it tries
+def _legacy_select(response: str):
+  for tag in ["response", *_COMMON_TAGS]:
+    elements = list(decode_friendly(response, tag))
+    if elements:
+      return tag, _xml_texts(elements)
+  return None, _xml_texts(decode_friendly(response))
+
+def _select(response: str):
+  tag, elements = decode_friendly_by_priority(response, ["response", *_COMMON_TAGS])
+  return tag, _xml_texts(elements)
+
+def _xml_texts(elements) -> list[str]:
+  return [str(element.tag) + str(len(element)) for element in elements]
+
+# streamed responses arrive in small chunks, and tags are cut off by them
+def _split_into_chunks(response: str) -> list[str]:
+  rand = random.Random(len(response))
+  chunks: list[str] = []
+  begin = 0
+  while begin < len(response):
+    end = begin + rand.randint(1, 24)
+    chunks.append(response[begin:end])
+    begin = end
+  return chunks
+
+def _read_recorded_responses():
+  chunks_path = os.path.abspath(os.path.join(__file__, "..", "..", "tests", "serial_chunks"))
+  for dir_name in sorted(os.listdir(chunks_path)):
+    dir_path = os.path.join(chunks_path, dir_name)
+    for file_name in sorted(os.listdir(dir_path)):
+      with open(os.path.join(dir_path, file_name), "r", encoding="utf-8") as file:
+        content = file.read()
+      # LLMs write their analysis before the XML, and wrap the XML in a markdown block
+      for tag in ["response", *_COMMON_TAGS]:
+        yield f"## 分析\n\n段落 1 < 段落 2，参见 <ref> 与 a<b 的情况。\n\n```XML\n<{tag}>\n{content}\n</{tag}>\n```\n"
+
+def _generate_sequence_responses():
+  rand = random.Random(42)
+  for i in range(_SEQUENCE_RESPONSES):
+    lines = [f"## 汇报分析结果\n\n第 {i} 页的第 3 行 < 第 4 行，<此处> 不是标签。\n\n```XML\n<response>"]
+    line_id = 1
+    for page_index in range(i, i + rand.randint(1, 4)):
+      lines.append(f"  <page page-index=\"{page_index}\" type=\"text\">")
+      for group_type in ("text", "footnote"):
+        lines.append(f"    <group type=\"{group_type}\" truncation-begin=\"not-truncated\" truncation-end=\"probably\">")
+        for _ in range(rand.randint(1, 12)):
+          count = rand.randint(1, 5)
+          if count == 1:
+            lines.append(f"      <line id=\"{line_id}\"/>")
+          else:
+            lines.append(f"      <line id=\"{line_id}-{line_id + count - 1}\"/>")
+          line_id += count
+        lines.append("    </group>")
+      lines.append("  </page>")
+    lines.append("</response>\n```")
+    yield "\n".join(lines)
+
+_SPACES = (" ", "\n")
+
+class _LegacyPhase(Enum):
+  OUTSIDE = auto()
+  LEFT_BRACKET = auto()
+  LEFT_SLASH = auto()
+  TAG_NAME = auto()
+  TAG_GAP = auto()
+  ATTRIBUTE_NAME = auto()
+  ATTRIBUTE_NAME_EQUAL = auto()
+  ATTRIBUTE_VALUE = auto()
+  MUST_CLOSING_SIGN = auto()
+
+class _LegacyParsedResult(Enum):
+  Continue = auto()
+  Success = auto()
+  Failed = auto()
+
+def _legacy_parse_tags(chars: Iterable[str]) -> Generator[str | Tag, None, None]:
+  yield from _LegacyXMLTagsParser().do(chars)
+
+class _LegacyXMLTagsParser:
+  def __init__(self):
+    self._outside_buffer: StringIO = StringIO()
+    self._tag_buffer: StringIO = StringIO()
+    self._tag: Tag | None = None
+    self._phase: _LegacyPhase = _LegacyPhase.OUTSIDE
+
+  def do(self, chars: Iterable[str]) -> Generator[str | Tag, None, None]:
+    for char in chars:
+      parsed_result = self._parse_char(char)
+      yield from self._generate_by_result(parsed_result)
+
+    self._outside_buffer.write(self._tag_buffer.getvalue())
+    outside_text = self._outside_buffer.getvalue()
+    if outside_text != "":
+      yield outside_text
+
+  def _parse_char(self, char: str) -> _LegacyParsedResult:
+    parsed_result: _LegacyParsedResult = _LegacyParsedResult.Continue
+
+    if self._phase == _LegacyPhase.OUTSIDE:
+      if char != "<":
+        self._outside_buffer.write(char)
+      else:
+        self._phase = _LegacyPhase.LEFT_BRACKET
+        self._tag_buffer.write(char)
+        self._tag = Tag(
+          kind=TagKind.OPENING,
+          name="",
+          proto="",
+          attributes=[],
+        )
+    else:
+      self._tag_buffer.write(char)
+
+      if self._phase == _LegacyPhase.LEFT_BRACKET:
+        if char == "/":
+          self._tag.kind = TagKind.CLOSING
+          self._phase = _LegacyPhase.LEFT_SLASH
+        elif is_valid_name_char(char):
+          self._tag.name += char
+          self._phase = _LegacyPhase.TAG_NAME
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.LEFT_SLASH:
+        if is_valid_name_char(char):
+          self._tag.name += char
+          self._phase = _LegacyPhase.TAG_NAME
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.TAG_NAME:
+        if char in _SPACES:
+          self._phase = _LegacyPhase.TAG_GAP
+        elif is_valid_name_char(char):
+          self._tag.name += char
+        elif char == ">":
+          parsed_result = _LegacyParsedResult.Success
+        elif char == "/" and self._tag.kind == TagKind.OPENING:
+          self._tag.kind = TagKind.SELF_CLOSING
+          self._phase = _LegacyPhase.MUST_CLOSING_SIGN
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.TAG_GAP:
+        if char in _SPACES:
+          pass
+        elif is_valid_name_char(char):
+          self._tag.attributes.append((char, ""))
+          self._phase = _LegacyPhase.ATTRIBUTE_NAME
+        elif char == ">":
+          parsed_result = _LegacyParsedResult.Success
+        elif char == "/" and self._tag.kind == TagKind.OPENING:
+          self._tag.kind = TagKind.SELF_CLOSING
+          self._phase = _LegacyPhase.MUST_CLOSING_SIGN
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.ATTRIBUTE_NAME:
+        if is_valid_name_char(char):
+          attr_name, attr_value = self._tag.attributes[-1]
+          attr_name = attr_name + char
+          self._tag.attributes[-1] = (attr_name, attr_value)
+        elif char == "=":
+          self._phase = _LegacyPhase.ATTRIBUTE_NAME_EQUAL
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.ATTRIBUTE_NAME_EQUAL:
+        if char == "\"":
+          self._phase = _LegacyPhase.ATTRIBUTE_VALUE
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.ATTRIBUTE_VALUE:
+        if is_valid_value_char(char):
+          attr_name, attr_value = self._tag.attributes[-1]
+          attr_value = attr_value + char
+          self._tag.attributes[-1] = (attr_name, attr_value)
+        elif char == "\"":
+          self._phase = _LegacyPhase.TAG_GAP
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+      elif self._phase == _LegacyPhase.MUST_CLOSING_SIGN:
+        if char == ">":
+          parsed_result = _LegacyParsedResult.Success
+        else:
+          parsed_result = _LegacyParsedResult.Failed
+
+    return parsed_result
+
+  def _generate_by_result(self, parsed_result: _LegacyParsedResult) -> Generator[str | Tag, None, None]:
+    if parsed_result == _LegacyParsedResult.Success:
+      assert self._tag is not None
+      if self._is_tag_valid(self._tag):
+        outside_text = self._outside_buffer.getvalue()
+        self._clear_buffer(self._outside_buffer)
+        self._clear_buffer(self._tag_buffer)
+        if outside_text != "":
+          yield outside_text
+        yield self._tag
+      else:
+        self._tag.proto = self._tag_buffer.getvalue()
+        self._outside_buffer.write(self._tag.proto)
+        self._clear_buffer(self._tag_buffer)
+      self._tag = None
+      self._phase = _LegacyPhase.OUTSIDE
+
+    elif parsed_result == _LegacyParsedResult.Failed:
+      self._outside_buffer.write(self._tag_buffer.getvalue())
+      self._clear_buffer(self._tag_buffer)
+      self._phase = _LegacyPhase.OUTSIDE
+
+  def _is_tag_valid(self, tag: Tag) -> bool:
+    if tag.kind == TagKind.CLOSING and len(tag.attributes) > 0:
+      return False
+    if tag.find_invalid_name() is not None:
+      return False
+    return True
+
+  def _clear_buffer(self, buffer: StringIO):
+    buffer.truncate(0)
+    buffer.seek(0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,46 @@
+import unittest
+
+from pdf_craft.analysers.utils import bisect_request
+
+
+class TextBisection(unittest.TestCase):
+
+  def test_bisect_failed_requests(self):
+    requested: list[tuple[tuple[int, ...], int | None, tuple[int, ...]]] = []
+
+    def request(items, retry_times, halves):
+      requested.append((tuple(items), retry_times, halves))
+      if len(items) > 2:
+        raise ValueError("too many items to respond")
+      return [item * 10 for item in items]
+
+    result = bisect_request(
+      items=[1, 2, 3, 4, 5],
+      request=request,
+      merge=lambda results: [item for result in results for item in result],
+      bisect_after=2,
+    )
+    self.assertListEqual(result, [10, 20, 30, 40, 50])
+    self.assertListEqual(requested, [
+      ((1, 2, 3, 4, 5), 1, ()),
+      ((1, 2), 1, (0,)),
+      ((3, 4, 5), 1, (1,)),
+      ((3,), None, (1, 0)),
+      ((4, 5), 1, (1, 1)),
+    ])
+
+  def test_item_alone(self):
+    def request(_items, retry_times, _halves):
+      self.assertIsNone(retry_times)
+      raise ValueError("failed to parse")
+
+    with self.assertRaises(ValueError):
+      bisect_request(items=[1], request=request, merge=sum, bisect_after=1)
+
+  def test_disabled(self):
+    def request(_items, retry_times, _halves):
+      self.assertIsNone(retry_times)
+      raise ValueError("failed to parse")
+
+    with self.assertRaises(ValueError):
+      bisect_request(items=[1, 2, 3], request=request, merge=sum, bisect_after=None)
@@ -0,0 +1,25 @@
+import unittest
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from pdf_craft.analysers.utils import Context
+
+
+class TextContext(unittest.TestCase):
+
+  def test_remove_temp_files(self):
+    with TemporaryDirectory() as temp_dir:
+      path = Path(temp_dir) / "context"
+      context = Context(path, lambda: { "pages": [] })
+      context.state = { "pages": [1] }
+      (path / "steps").mkdir()
+      context.atomic_write(path / "steps" / "page_1.xml", "<page/>")
+
+      # left by a crashed process
+      temp_path = path / "steps" / ".page_2.xml.999999999.1.tmp"
+      temp_path.write_text("<pa", encoding="utf-8")
+
+      context = Context(path, lambda: { "pages": [] })
+      self.assertEqual(context.state, { "pages": [1] })
+      self.assertFalse(temp_path.exists())
+      self.assertTrue((path / "steps" / "page_1.xml").exists())
@@ -0,0 +1,55 @@
+import unittest
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from xml.etree.ElementTree import fromstring, Element
+from pdf_craft.analysers.utils import Context
+from pdf_craft.analysers.correction.repeater import repeat_correct
+
+
+class TextCorrectionEdits(unittest.TestCase):
+
+  def test_apply_edits(self):
+    request = fromstring(
+      "<request>"
+      "<text id=\"1/1\"><line id=\"1\">Tlie quick brown fox</line><line id=\"2\">jumps over</line></text>"
+      "<text id=\"1/2\"><line id=\"1\">the lazy dog.</line></text>"
+      "</request>"
+    )
+    llm = _FakeLLM(fromstring(
+      "<response>"
+      "<overview remain=\"false\" quality=\"good\"/>"
+      "<edit layout=\"1/1\" line=\"1\">The quick brown fox</edit>"
+      "<edit layout=\"1/1\" line=\"3\">a line not requested</edit>"
+      "<edit layout=\"9/9\" line=\"1\">a layout not requested</edit>"
+      "</response>"
+    ))
+    with TemporaryDirectory() as temp_dir:
+      context = Context(Path(temp_dir) / "correction", lambda: {})
+      resp = repeat_correct(
+        llm=llm,
+        context=context,
+        save_path=Path(temp_dir) / "steps",
+        raw_request=request,
+        is_footnote=False,
+        edits=True,
+      )
+    self.assertTrue(llm.params["edits"])
+    self.assertListEqual(
+      [(layout.get("id"), [line.text for line in layout]) for layout in resp],
+      [
+        ("1/1", ["The quick brown fox", "jumps over"]),
+        ("1/2", ["the lazy dog."]),
+      ],
+    )
+
+class _FakeLLM:
+  def __init__(self, resp: Element):
+    self._resp: Element = resp
+    self.params: dict | None = None
+
+  def request_xml(self, params: dict, **_) -> Element:
+    self.params = params
+    resp = self._resp
+    self._resp = fromstring("<response><overview remain=\"false\" quality=\"perfect\"/></response>")
+    return resp
@@ -0,0 +1,64 @@
+import unittest
+
+from pdf_craft.analysers.data import Paragraph, ParagraphType, Layout, LayoutKind, Caption, Line
+from pdf_craft.analysers.correction.gate import score_paragraphs
+
+
+class TextCorrectionGate(unittest.TestCase):
+
+  def test_clean_text(self):
+    score = score_paragraphs([_paragraph(
+      ("The quick brown fox jumps over the lazy dog.", 0.99),
+      ("It was the best of times, it was the worst of times.", 0.98),
+    )])
+    self.assertGreater(score, 0.97)
+
+  def test_low_confidence(self):
+    score = score_paragraphs([_paragraph(
+      ("The quick brown fox jumps over the lazy dog.", 0.99),
+      ("It was the best of times, it was the worst of times.", 0.40),
+    )])
+    self.assertLess(score, 0.8)
+
+  def test_clean_hyphenated_text(self):
+    # line end hyphens and long words are normal in scanned books
+    score = score_paragraphs([_paragraph(
+      ("The quick brown fox jumps over the philo-", 0.99),
+      ("sophy of the lazy dog, a well-known Donaudampfschifffahrtsgesellschaft.", 0.99),
+    )])
+    self.assertGreater(score, 0.95)
+
+  def test_defects(self):
+    for lines in (
+      (("The quick brown fox jumps over the lazy d�g.", 0.99),),
+      (("The quick brown fox jumps over the cafÃ© dog.", 0.99),),
+      (("The quick brown fox jumps over the ¦azy dog.", 0.99),),
+    ):
+      self.assertLess(score_paragraphs([_paragraph(*lines)]), 0.95, lines)
+
+  def test_minor_defects(self):
+    clean_score = score_paragraphs([_paragraph(("The quick brown fox jumps over the lazy dog.", 0.99))])
+    for text in (
+      "The quick brown fox jumps over the la- zy dog.",
+      "The quick brown fox jumps over the lazy d0g.",
+    ):
+      score = score_paragraphs([_paragraph((text, 0.99))])
+      self.assertLess(score, clean_score, text)
+      self.assertGreater(score, 0.95, text)
+
+  def test_unknown_confidence(self):
+    self.assertEqual(score_paragraphs([_paragraph(("The quick brown fox.", None))]), 0.0)
+
+def _paragraph(*lines: tuple[str, float | None]) -> Paragraph:
+  return Paragraph(
+    type=ParagraphType.TEXT,
+    page_index=1,
+    order_index=1,
+    layouts=[Layout(
+      kind=LayoutKind.TEXT,
+      page_index=1,
+      order_index=1,
+      caption=Caption(lines=[]),
+      lines=[Line(text=text, confidence=confidence) for text, confidence in lines],
+    )],
+  )
@@ -99,6 +99,10 @@ class TextFramework(unittest.TestCase):
       check_texts_matching_rate("围点Foobar打援", "围点打援"),
       (4 / 5, 5),
     )
+    self.assertEqual(
+      check_texts_matching_rate("a b a c", "a a b d a"),
+      (0.4, 5),
+    )
 
   def test_splitting_into_words(self):
     self.assertEqual(
@@ -117,6 +121,10 @@ class TextFramework(unittest.TestCase):
       list(split_into_words("获取class 的意义")),
       ["获", "取", "class", "的", "意", "义"]
     )
+    self.assertEqual(
+      list(split_into_words("Page 36b, §12")),
+      ["Page", "3", "6b", ",", "§", "1", "2"]
+    )
 
 def _layout(rect: _Rect, fragments: Iterable[tuple[_Rect, str]]):
   origin = (rect[0], rect[1])
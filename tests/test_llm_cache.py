@@ -0,0 +1,77 @@
+import os
+import unittest
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from importlib.resources import files
+from pdf_craft.llm import LLM
+from pdf_craft.llm.cache import LLMCache
+from pdf_craft.template import create_env
+
+
+class TextLLMCache(unittest.TestCase):
+
+  def test_hit_and_miss(self):
+    with TemporaryDirectory() as temp_dir:
+      cache = LLMCache(temp_dir)
+      key = cache.key(model="m", prompt="p", data="d")
+      self.assertEqual(key, cache.key(data="d", prompt="p", model="m"))
+      self.assertNotEqual(key, cache.key(model="m", prompt="p", data="e"))
+      self.assertIsNone(cache.get(key))
+
+      cache.put(key, "response")
+      self.assertEqual(cache.get(key), "response")
+      self.assertEqual(LLMCache(temp_dir).get(key), "response")
+
+      stats = cache.stats
+      self.assertEqual(stats.hits, 1)
+      self.assertEqual(stats.misses, 1)
+      self.assertEqual(stats.entries, 1)
+
+  def test_lru_eviction(self):
+    with TemporaryDirectory() as temp_dir:
+      cache = LLMCache(temp_dir, max_bytes=25)
+      cache.put("a0", "0123456789")
+      cache.put("b0", "0123456789")
+      cache.get("a0")
+      cache.put("c0", "0123456789")
+
+      self.assertIsNone(cache.get("b0"))
+      self.assertEqual(cache.get("a0"), "0123456789")
+      self.assertEqual(cache.get("c0"), "0123456789")
+      self.assertEqual(cache.stats.bytes, 20)
+
+      # 重新打开时根据文件的修改时间恢复使用顺序
+      os.utime(Path(temp_dir) / "c0" / "c0.txt", (0, 0))
+      cache = LLMCache(temp_dir, max_bytes=10)
+      self.assertIsNone(cache.get("c0"))
+      self.assertEqual(cache.get("a0"), "0123456789")
+
+  def test_repeated_attempts(self):
+    with TemporaryDirectory() as temp_dir:
+      llm = _create_llm(LLMCache(temp_dir))
+      self.assertEqual(llm.request_markdown("correction", "data"), "response 1")
+      self.assertEqual(llm.request_markdown("correction", "data"), "response 1")
+      # a request repeated on purpose isn't answered by the cache of the last attempt
+      self.assertEqual(llm.request_markdown("correction", "data", attempt=1), "response 2")
+      self.assertEqual(llm.request_markdown("correction", "data", attempt=1), "response 2")
+
+def _create_llm(cache: LLMCache) -> LLM:
+  # pylint: disable=protected-access
+  llm = LLM.__new__(LLM)
+  llm._templates = {}
+  llm._env = create_env(files("pdf_craft").joinpath("data/prompts"))
+  llm._model = "model"
+  llm._top_p = None
+  llm._temperature = None
+  llm._cache = cache
+  llm._executor = _FakeExecutor()
+  return llm
+
+class _FakeExecutor:
+  def __init__(self) -> None:
+    self._requests_count: int = 0
+
+  def request(self, parser, **_):
+    self._requests_count += 1
+    return parser(f"```Markdown\nresponse {self._requests_count}\n```")
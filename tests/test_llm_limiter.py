@@ -0,0 +1,51 @@
+import unittest
+
+import httpx
+import openai
+
+from pdf_craft.llm.limiter import RateLimiter
+from pdf_craft.llm.error import is_retry_error, retry_after_seconds
+
+
+class TextLLMLimiter(unittest.TestCase):
+
+  def test_rate_limit_errors(self):
+    err = _rate_limit_error({"retry-after": "3"})
+    self.assertTrue(is_retry_error(err))
+    self.assertEqual(retry_after_seconds(err), 3.0)
+    self.assertEqual(retry_after_seconds(_rate_limit_error({"retry-after-ms": "250"})), 0.25)
+
+    err = _rate_limit_error({}, code="insufficient_quota")
+    self.assertFalse(is_retry_error(err))
+    self.assertIsNone(retry_after_seconds(err))
+
+  def test_aimd_concurrency(self):
+    limiter = RateLimiter(None, None, max_concurrent_requests=8)
+    started = [limiter.acquire(0) for _ in range(8)]
+
+    # 429 of requests in the same window only halve concurrency once
+    limiter.release(started[0], error=_rate_limit_error({}))
+    limiter.release(started[1], error=_rate_limit_error({}))
+    self.assertEqual(limiter.concurrency, 4.0)
+
+    for started_at in started[2:]:
+      limiter.release(started_at)
+    self.assertGreater(limiter.concurrency, 5.0)
+    self.assertLessEqual(limiter.concurrency, 8.0)
+
+  def test_tokens_per_minute(self):
+    limiter = RateLimiter(None, max_tokens_per_minute=6000, max_concurrent_requests=None)
+    # pylint: disable=protected-access
+    self.assertEqual(limiter._try_acquire(4000), 0.0)
+    wait_seconds = limiter._try_acquire(4000)
+    self.assertIsNotNone(wait_seconds)
+    self.assertAlmostEqual(wait_seconds, 20.0, delta=0.5)
+
+def _rate_limit_error(headers: dict[str, str], code: str | None = None) -> openai.RateLimitError:
+  request = httpx.Request("POST", "https://example.com/v1/chat/completions")
+  response = httpx.Response(429, headers=headers, request=request)
+  return openai.RateLimitError(
+    message="rate limited",
+    response=response,
+    body={"code": code},
+  )
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from pdf_craft.llm import LLM
+from pdf_craft.llm.repair import close_xml_tags, split_xml_tail, close_json
+
+
+class TextLLMRepair(unittest.TestCase):
+
+  def test_close_xml_tags(self):
+    self.assertEqual(
+      close_xml_tags("```XML\n<response><page id=\"1\"><line>a</line>\n</page>\n</respon\n```"),
+      "```XML\n<response><page id=\"1\"><line>a</line>\n</page></response>",
+    )
+    self.assertEqual(
+      close_xml_tags("<response><page><line>a</line>\n```"),
+      "<response><page><line>a</line></page></response>",
+    )
+    self.assertEqual(
+      close_xml_tags("<response><page><line>a</line></pa"),
+      "<response><page><line>a</line></page></response>",
+    )
+    # content is cut off
+    self.assertIsNone(close_xml_tags("<response><page><line>a</line><line>b"))
+    # cut off after a tag, with no proof that the rest is only closing tags
+    self.assertIsNone(close_xml_tags("```XML\n<response><page><line>a</line>\n"))
+    # nothing to close
+    self.assertIsNone(close_xml_tags("<response><page/></response>"))
+
+  def test_split_xml_tail(self):
+    self.assertEqual(
+      split_xml_tail("text <response>\n<page>a</page>\n<page>b<line id=3>c</page"),
+      ("text <response>\n<page>a</page>", "\n<page>b<line id=3>c</page", ["response"]),
+    )
+    self.assertIsNone(split_xml_tail("<response><page/></response>"))
+
+  def test_close_json(self):
+    self.assertEqual(json.loads(close_json("{\"a\": [1, 2]")), {"a": [1, 2]})
+    self.assertEqual(json.loads(close_json("{\"a\": \"b\\\"c\"")), {"a": "b\"c"})
+    # truncated
+    self.assertIsNone(close_json("{\"a\": [1, 2,"))
+    self.assertIsNone(close_json("{\"a\": \"b"))
+    # nothing to close
+    self.assertIsNone(close_json("{\"a\": 1}"))
+
+  def test_encode_json(self):
+    # pylint: disable=protected-access
+    llm = LLM.__new__(LLM)
+    llm._repair_responses = True
+    self.assertEqual(llm._encode_json("```JSON\n{\"items\": [\"a\"]\n```"), {"items": ["a"]})
+    for response in (
+      "```JSON\n{\"items\": [\"a\", \"b\", \"c", # without the closing fence
+      "```JSON\n{\"items\": [\"a\"]", # without the closing fence
+      "```JSON\n{\"items\": [\"a\", \"b\", \"c\n```", # truncated in the block
+    ):
+      with self.assertRaises(ValueError, msg=response):
+        llm._encode_json(response)
@@ -0,0 +1,102 @@
+import unittest
+
+from typing import cast
+from pydantic import SecretStr
+from langchain_core.messages import AIMessageChunk
+from pdf_craft.llm.executor import LLMExecutor
+from pdf_craft.llm.increasable import Increasable
+from pdf_craft.llm.limiter import RateLimiter
+from pdf_craft.llm.watcher import XMLResponseWatcher
+
+
+class TextLLMStream(unittest.TestCase):
+
+  def test_abort_and_finish_early(self):
+    model = _FakeModel([
+      "```XML\n<page page-index=\"1\">" + "<line id=\"1\"/>" * 100 + "</page>\n```",
+      "```XML\n<response><page page-index=\"1\"/></response>\n```\n" + "explanation " * 100,
+    ])
+    executor = _create_executor(model)
+    response = executor.request(
+      input="request",
+      parser=lambda r: r,
+      create_watcher=lambda: XMLResponseWatcher(strict=True),
+    )
+    # both stop at the chunk where the response is decided
+    self.assertEqual(response, "```XML\n<response><page page-index=\"1\"/></response>\n```\ne")
+    self.assertListEqual(model.read_chunks, [4, 7])
+    self.assertEqual(model.closed_streams, 2)
+
+  def test_retry_times_of_request(self):
+    def parse(response: str) -> str:
+      if response != "ok":
+        raise ValueError(f"Unexpected response: {response}")
+      return response
+
+    model = _FakeModel(["bad", "ok"])
+    with self.assertRaises(ValueError):
+      _create_executor(model).request(input="request", parser=parse, retry_times=0)
+    self.assertEqual(len(model.read_chunks), 1)
+
+    model = _FakeModel(["bad", "ok"])
+    self.assertEqual(_create_executor(model).request(input="request", parser=parse), "ok")
+
+  def test_repair_before_regenerating(self):
+    def parse(response: str) -> str:
+      if not response.endswith("</response>"):
+        raise ValueError(f"Unexpected response: {response}")
+      return response
+
+    model = _FakeModel(["<response><page/></resp", "<response/>"])
+    response = _create_executor(model).request(
+      input="request",
+      parser=parse,
+      repair=lambda r: r[:r.rindex("<")] + "</response>",
+    )
+    self.assertEqual(response, "<response><page/></response>")
+    self.assertEqual(len(model.read_chunks), 1)
+
+    # regenerated when it can't be repaired
+    model = _FakeModel(["<response><page/></resp", "<response/></response>"])
+    response = _create_executor(model).request(
+      input="request",
+      parser=parse,
+      repair=lambda _: None,
+    )
+    self.assertEqual(response, "<response/></response>")
+    self.assertEqual(len(model.read_chunks), 2)
+
+def _create_executor(model: "_FakeModel") -> LLMExecutor:
+  executor = LLMExecutor(
+    api_key=cast(SecretStr, "key"),
+    url="http://localhost",
+    model="model",
+    timeout=None,
+    top_p=Increasable(None),
+    temperature=Increasable(None),
+    retry_times=1,
+    retry_interval_seconds=0.0,
+    max_connections=1,
+    limiter=RateLimiter(None, None, None),
+    count_tokens=len,
+    create_logger=lambda: None,
+  )
+  # pylint: disable=protected-access
+  executor._model = model
+  return executor
+
+class _FakeModel:
+  def __init__(self, responses: list[str]) -> None:
+    self._responses: list[str] = responses
+    self.read_chunks: list[int] = []
+    self.closed_streams: int = 0
+
+  def stream(self, **_):
+    response = self._responses[len(self.read_chunks)]
+    self.read_chunks.append(0)
+    try:
+      for i in range(0, len(response), 8):
+        self.read_chunks[-1] += 1
+        yield AIMessageChunk(content=response[i:i + 8])
+    finally:
+      self.closed_streams += 1
@@ -0,0 +1,48 @@
+import unittest
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from pdf_craft.llm.tokens import TokensCounter
+
+
+class TextLLMTokens(unittest.TestCase):
+
+  def test_counts_kept_in_file(self):
+    with TemporaryDirectory() as temp_dir:
+      file_path = Path(temp_dir) / "tokens.sqlite3"
+      encoding = _FakeEncoding()
+      counter = TokensCounter(encoding)
+      counter.open_store(file_path)
+      self.assertListEqual(counter.count_many(["a b", "c", "a b", "d e f"]), [2, 1, 2, 3])
+      self.assertEqual(counter.count("a b"), 2)
+      self.assertListEqual(encoding.encoded, ["a b", "c", "d e f"])
+      counter.close_store(file_path)
+
+      # counted before restarting
+      encoding = _FakeEncoding()
+      counter = TokensCounter(encoding)
+      counter.open_store(file_path)
+      self.assertListEqual(counter.count_many(["d e f", "g h"]), [3, 2])
+      self.assertListEqual(encoding.encoded, ["g h"])
+      counter.close_store(file_path)
+
+      # another encoding doesn't share counts
+      encoding = _FakeEncoding("other")
+      counter = TokensCounter(encoding)
+      counter.open_store(file_path)
+      self.assertEqual(counter.count("g h"), 2)
+      self.assertListEqual(encoding.encoded, ["g h"])
+      counter.close_store(file_path)
+
+class _FakeEncoding:
+  def __init__(self, name: str = "fake") -> None:
+    self.name: str = name
+    self.encoded: list[str] = []
+
+  def encode(self, text: str) -> list[int]:
+    self.encoded.append(text)
+    return list(range(len(text.split())))
+
+  def encode_batch(self, texts: list[str], num_threads: int) -> list[list[int]]:
+    assert num_threads > 1
+    return [self.encode(text) for text in texts]
@@ -0,0 +1,77 @@
+import unittest
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from pdf_craft.analysers.utils import Context, is_packed
+from pdf_craft.analysers.sequence import read_paragraphs, ParagraphWriter, paragraphs_cache_stats
+from pdf_craft.analysers.data import Paragraph, ParagraphType, Layout, LayoutKind, Caption, Line
+
+
+class TextPackedParagraphs(unittest.TestCase):
+
+  def test_packed_and_files(self):
+    paragraphs = [
+      _paragraph(page_index, order_index)
+      for page_index in (3, 1, 12, 2)
+      for order_index in (2, 1)
+    ]
+    results: list[list[Paragraph]] = []
+
+    with TemporaryDirectory() as temp_dir:
+      context = Context(Path(temp_dir) / "workspace", lambda: {})
+      for packed in (False, True):
+        dir_path = context.path / f"output_{packed}"
+        with ParagraphWriter(context, dir_path, packed=packed) as writer:
+          for paragraph in paragraphs:
+            writer.write(paragraph)
+
+        self.assertEqual(is_packed(dir_path), packed)
+        self.assertListEqual(
+          [p.layouts[0].lines[0].text for p in read_paragraphs(dir_path, begin=(2, 2), end=(3, 1))],
+          ["2/2", "3/1"],
+        )
+        results.append(list(read_paragraphs(dir_path)))
+
+      # the packed file left by a previous run is removed when writing files
+      dir_path = context.path / "output_True"
+      with ParagraphWriter(context, dir_path) as writer:
+        writer.write(paragraphs[0])
+      self.assertFalse(is_packed(dir_path))
+
+    self.assertListEqual(results[0], results[1])
+    self.assertListEqual(
+      [(p.page_index, p.order_index) for p in results[0]],
+      sorted((p.page_index, p.order_index) for p in paragraphs),
+    )
+
+  def test_cached_paragraphs(self):
+    with TemporaryDirectory() as temp_dir:
+      context = Context(Path(temp_dir) / "workspace", lambda: {})
+      dir_path = context.path / "output"
+      with ParagraphWriter(context, dir_path) as writer:
+        writer.write(_paragraph(1, 1))
+
+      paragraph = next(read_paragraphs(dir_path))
+      paragraph.layouts[0].lines[0].text = "modified"
+      hits = paragraphs_cache_stats().hits
+      self.assertEqual(next(read_paragraphs(dir_path)).layouts[0].lines[0].text, "1/1")
+      self.assertEqual(paragraphs_cache_stats().hits, hits + 1)
+
+      # rewritten files are decoded again
+      with ParagraphWriter(context, dir_path) as writer:
+        writer.write(_paragraph(1, 1, "rewritten"))
+      self.assertEqual(next(read_paragraphs(dir_path)).layouts[0].lines[0].text, "rewritten")
+
+def _paragraph(page_index: int, order_index: int, text: str | None = None) -> Paragraph:
+  return Paragraph(
+    type=ParagraphType.TEXT,
+    page_index=page_index,
+    order_index=order_index,
+    layouts=[Layout(
+      kind=LayoutKind.TEXT,
+      page_index=page_index,
+      order_index=order_index,
+      caption=Caption(lines=[]),
+      lines=[Line(text=text or f"{page_index}/{order_index}", confidence=0.9)],
+    )],
+  )
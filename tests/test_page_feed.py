@@ -0,0 +1,45 @@
+import unittest
+
+from threading import Thread
+from pdf_craft.analysers.utils import PageFeed
+
+
+class TextPageFeed(unittest.TestCase):
+
+  def test_consecutive_pages(self):
+    feed = PageFeed()
+    read_page_indexes: list[int] = []
+
+    def read():
+      for page_index in feed.consecutive_pages():
+        read_page_indexes.append(page_index)
+
+    thread = Thread(target=read)
+    thread.start()
+    for page_index in (3, 1, 2, 5, 6):
+      feed.put(page_index)
+    feed.finish()
+    thread.join(timeout=5.0)
+
+    # page 5 and 6 are left to be listed from the disk
+    self.assertFalse(thread.is_alive())
+    self.assertListEqual(read_page_indexes, [1, 2, 3])
+
+  def test_failed(self):
+    feed = PageFeed()
+    feed.put(1)
+    feed.finish(ValueError("OCR failed"))
+    pages = feed.consecutive_pages()
+    self.assertEqual(next(pages), 1)
+    with self.assertRaises(RuntimeError):
+      next(pages)
+
+
+  def test_closed_by_reader(self):
+    feed = PageFeed()
+    feed.put(1)
+    error = ValueError("LLM failed")
+    feed.close(error)
+    with self.assertRaises(RuntimeError) as context:
+      feed.put(2)
+    self.assertIs(context.exception.__cause__, error)
@@ -0,0 +1,107 @@
+import unittest
+
+from time import sleep
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Lock
+from pdf_craft.analysers.utils import run_partition_tasks, Context, Partition
+
+
+class TextPartition(unittest.TestCase):
+
+  def test_concurrent_tasks(self):
+    with TemporaryDirectory() as temp_dir:
+      context = _create_context(Path(temp_dir))
+      handled: list[int] = []
+      handled_lock = Lock()
+
+      def handle(task):
+        # later tasks finish first, so that ranges are completed out of order
+        sleep(0.01 * (10 - task.begin[0]))
+        with handled_lock:
+          handled.append(task.begin[0])
+
+      with _create_partition(context, 10) as partition:
+        run_partition_tasks(partition, handle, max_concurrency=4)
+
+      self.assertListEqual(sorted(handled), list(range(10)))
+      self.assertListEqual(
+        context.state["completed_ranges"],
+        [[i, i] for i in range(10)],
+      )
+
+  def test_resume_after_failure(self):
+    with TemporaryDirectory() as temp_dir:
+      context = _create_context(Path(temp_dir))
+
+      def handle_and_fail(task):
+        if task.begin[0] == 5:
+          raise RuntimeError("failed")
+
+      with self.assertRaises(RuntimeError):
+        with _create_partition(context, 10) as partition:
+          run_partition_tasks(partition, handle_and_fail, max_concurrency=3)
+
+      completed = set(i for i, _ in _create_context(Path(temp_dir)).state["completed_ranges"])
+      self.assertNotIn(5, completed)
+
+      handled: list[int] = []
+      handled_lock = Lock()
+
+      def handle(task):
+        with handled_lock:
+          handled.append(task.begin[0])
+
+      context = _create_context(Path(temp_dir))
+      with _create_partition(context, 10) as partition:
+        run_partition_tasks(partition, handle, max_concurrency=3)
+
+      self.assertIn(5, handled)
+      self.assertSetEqual(set(handled) & completed, set())
+      self.assertListEqual(
+        context.state["completed_ranges"],
+        [[i, i] for i in range(10)],
+      )
+
+  def test_resume_from_journal(self):
+    with TemporaryDirectory() as temp_dir:
+      context = _create_context(Path(temp_dir))
+      partition = _create_partition(context, 10)
+      for task in partition.pop_tasks():
+        with task:
+          pass
+        if task.begin[0] == 6:
+          break # crashed before exiting the partition
+
+      # the last record was cut off by the crash
+      with open(Path(temp_dir) / "state.journal", "a", encoding="utf-8") as file:
+        file.write('{"seq": 99, "key": "completed')
+
+      context = _create_context(Path(temp_dir))
+      self.assertListEqual(
+        sorted(context.state["completed_ranges"]),
+        [[i, i] for i in range(7)],
+      )
+      handled: list[int] = []
+      with _create_partition(context, 10) as partition:
+        run_partition_tasks(partition, lambda task: handled.append(task.begin[0]), max_concurrency=1)
+
+      self.assertListEqual(handled, [7, 8, 9])
+      self.assertFalse((Path(temp_dir) / "state.journal").exists())
+      self.assertListEqual(
+        _create_context(Path(temp_dir)).state["completed_ranges"],
+        [[i, i] for i in range(10)],
+      )
+
+def _create_context(path: Path) -> Context:
+  return Context(path, lambda: {
+    "completed_ranges": [],
+  })
+
+def _create_partition(context: Context, count: int) -> Partition:
+  return Partition(
+    dimension=1,
+    context=context,
+    sequence=((i, i, None) for i in range(count)),
+    remove=lambda begin, end: None,
+  )
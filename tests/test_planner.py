@@ -0,0 +1,46 @@
+import unittest
+
+from pdf_craft.analysers.utils.planner import plan_chunks
+
+
+class TextPlanner(unittest.TestCase):
+
+  def test_balanced_chunks(self):
+    # no fewer chunks, and no lighter heaviest one
+    chunks = list(plan_chunks(_items([4, 4, 4, 4, 4]), 8))
+    self.assertListEqual(chunks, [[0, 1], [2, 3], [4]])
+
+    # greedily: (10, 5)
+    chunks = list(plan_chunks(_items([2, 2, 2, 2, 2, 2, 2, 1]), 10))
+    self.assertListEqual(chunks, [[0, 1, 2, 3], [4, 5, 6, 7]])
+
+  def test_heavy_item(self):
+    chunks = list(plan_chunks(_items([2, 20, 2, 2]), 8))
+    self.assertListEqual(chunks, [[0], [1], [2, 3]])
+
+  def test_groups(self):
+    items = _items([1, 1, 1, 1, 1])
+    groups = ["a", "a", "b", "b", "b"]
+    chunks = list(plan_chunks(items, 8, group=lambda i: groups[i]))
+    self.assertListEqual(chunks, [[0, 1], [2, 3, 4]])
+
+  def test_long_stream(self):
+    weights = [(i * 37) % 11 + 1 for i in range(2000)]
+    chunks = list(plan_chunks(_items(weights), 20))
+    self.assertListEqual([i for chunk in chunks for i in chunk], list(range(len(weights))))
+    for chunk in chunks:
+      self.assertLessEqual(sum(weights[i] for i in chunk), 20)
+    self.assertEqual(len(chunks), _count_greedily(weights, 20))
+
+def _items(weights: list[int]) -> list[tuple[int, int]]:
+  return list(enumerate(weights))
+
+def _count_greedily(weights: list[int], max_weight: int) -> int:
+  count = 0
+  chunk_weight = max_weight
+  for weight in weights:
+    if chunk_weight + weight > max_weight:
+      count += 1
+      chunk_weight = 0
+    chunk_weight += weight
+  return count
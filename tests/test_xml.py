@@ -4,7 +4,7 @@ from io import StringIO
 from xml.etree.ElementTree import tostring, Element
 from pdf_craft.xml.tag import Tag, TagKind
 from pdf_craft.xml.parser import parse_tags
-from pdf_craft.xml import decode_friendly, encode_friendly
+from pdf_craft.xml import decode_friendly, decode_friendly_by_priority, encode_friendly
 
 
 # pylint: disable=W1401
@@ -52,6 +52,15 @@ class TextXML(unittest.TestCase):
       '</response>',
     ])
 
+  def test_parse_chunks(self):
+    expected = [str(cell) for cell in parse_tags(_WIKI_XML_DESCRIPTION)]
+    for size in (1, 3, 7, 64):
+      chunks = [
+        _WIKI_XML_DESCRIPTION[i:i + size]
+        for i in range(0, len(_WIKI_XML_DESCRIPTION), size)
+      ]
+      self.assertListEqual([str(cell) for cell in parse_tags(chunks)], expected)
+
   def test_decode(self):
     encoded = list(decode_friendly(_WIKI_XML_DESCRIPTION, "response"))
     self.assertEqual(len(encoded), 1)
@@ -67,6 +76,18 @@ class TextXML(unittest.TestCase):
       second=expected_text.strip()
     )
 
+  def test_decode_by_priority(self):
+    tag, elements = decode_friendly_by_priority(_WIKI_XML_DESCRIPTION, ["request", "fragment", "response"])
+    self.assertEqual(tag, "fragment")
+    self.assertListEqual([e.text for e in elements], ["hello world"])
+
+    tag, elements = decode_friendly_by_priority(_WIKI_XML_DESCRIPTION, ["request"])
+    self.assertIsNone(tag)
+    self.assertListEqual(
+      [e.tag for e in elements],
+      [e.tag for e in decode_friendly(_WIKI_XML_DESCRIPTION)],
+    )
+
   def test_encode(self):
     root = Element("response", {
       "foobar": "hello",